@@ -1,6 +1,8 @@
+import atexit
 import config
 
-from observer.observer_client import logger
+from observer.observer_client import logger, observer, caches
+from observer.journal import EventJournal
 
 from bot.bot_server import dbot
 from pathlib import Path
@@ -26,6 +28,22 @@ def read_app_version() -> str:
     return "0.0.0"
 
 
+def install_event_journal() -> None:
+  journal_path = getattr(config, "EVENT_JOURNAL_PATH", "")
+  if not journal_path:
+    return
+
+  journal = EventJournal(
+    journal_path,
+    max_bytes=int(getattr(config, "EVENT_JOURNAL_MAX_MB", 50)) * 1024 * 1024,
+    backup_count=int(getattr(config, "EVENT_JOURNAL_BACKUPS", 3)),
+  )
+  observer.add_tap(journal.record)
+  # Строки пишет фоновый поток: при выходе дописываем остаток
+  atexit.register(journal.close)
+  logger.info(f"Observer: журнал событий включён: {journal_path}")
+
+
 app_info = {
   'name': 'Ultra disBot',
   'version': read_app_version(),
@@ -38,5 +56,7 @@ if __name__ == "__main__":
   logger.info(f"=== {app_info['name']} v{app_info['version']} by {app_info['author']} ===")
   logger.info("==================================")
 
+  install_event_journal()
+  caches.configure(getattr(config, "CACHE_REGIONS", {}))
 
   dbot.run()
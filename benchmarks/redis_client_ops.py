@@ -0,0 +1,158 @@
+"""Бенчмарк AsyncRedisClient (data_server/redis_client.py): общий клиент против старой схемы.
+
+Запуск из корня репозитория:
+  python -m benchmarks.redis_client_ops                      # встроенный мини-сервер RESP
+  python -m benchmarks.redis_client_ops --url 127.0.0.1:6379  # настоящий Redis (ключ bench:* перезаписывается)
+
+Измеряется один и тот же запрос автодополнения (LRANGE списка карт):
+  per-call (before)  — как было до общего клиента: PING из require_connection и
+                       Redis.from_pool() на каждую команду (закрывает пул при выходе);
+  shared (after)     — require_connection по rc.connected и list_get общего клиента.
+
+Встроенный сервер отвечает из памяти и понимает только нужные команды; он показывает
+цену лишних round trip и переподключений, но не заменяет замер на настоящем Redis.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from redis import asyncio as aioredis
+
+BENCH_KEY = "bench:map_list_all"
+
+
+# SECTION Встроенный RESP-сервер
+class _MiniRedis:
+  """Минимальный сервер RESP: HELLO, PING, CLIENT, SELECT, DEL, RPUSH, LRANGE."""
+
+  def __init__(self) -> None:
+    self.lists: Dict[bytes, List[bytes]] = {}
+    self.connections: int = 0
+
+  async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    self.connections += 1
+    try:
+      while True:
+        command = await self._read_command(reader)
+        if command is None:
+          break
+        writer.write(self._execute(command))
+        await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+      pass
+    finally:
+      writer.close()
+
+  async def _read_command(self, reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+    header = await reader.readline()
+    if not header:
+      return None
+    parts = []
+    for _ in range(int(header[1:])):
+      size = int((await reader.readline())[1:])
+      parts.append((await reader.readexactly(size + 2))[:-2])
+    return parts
+
+  def _execute(self, command: List[bytes]) -> bytes:
+    name, args = command[0].upper(), command[1:]
+    if name == b"HELLO":
+      # redis-py 8 по умолчанию договаривается о RESP3; остальные ответы ниже одинаковы в RESP2 и RESP3
+      return b"%3\r\n$6\r\nserver\r\n$5\r\nredis\r\n$7\r\nversion\r\n$5\r\n7.2.0\r\n$5\r\nproto\r\n:3\r\n"
+    if name == b"PING":
+      return b"+PONG\r\n"
+    if name in (b"CLIENT", b"SELECT"):
+      return b"+OK\r\n"
+    if name == b"DEL":
+      return b":%d\r\n" % sum(self.lists.pop(key, None) is not None for key in args)
+    if name == b"RPUSH":
+      values = self.lists.setdefault(args[0], [])
+      values.extend(args[1:])
+      return b":%d\r\n" % len(values)
+    if name == b"LRANGE":
+      values = self.lists.get(args[0], [])
+      start, stop = int(args[1]), int(args[2])
+      selected = values[start:] if stop == -1 else values[start:stop + 1]
+      return b"*%d\r\n" % len(selected) + b"".join(b"$%d\r\n%s\r\n" % (len(value), value) for value in selected)
+    return b"-ERR unknown command\r\n"
+
+# !SECTION
+
+
+async def _measure(name: str, operations: int, step: Callable[[], Awaitable]) -> Tuple[str, float]:
+  started = time.perf_counter()
+  for _ in range(operations):
+    await step()
+  elapsed = time.perf_counter() - started
+  per_op_us = elapsed / operations * 1_000_000
+  ops_per_sec = operations / elapsed
+  return f"{name:<18} {operations:>8} ops  {elapsed:8.3f}s  {per_op_us:10.1f} us/op  {ops_per_sec:10.0f} ops/s", ops_per_sec
+
+
+async def run(host: Optional[str], port: int, operations: int, maps: int) -> List[str]:
+  from data_server.redis_client import AsyncRedisClient
+
+  server = None
+  mini = None
+  if host is None:
+    mini = _MiniRedis()
+    server = await asyncio.start_server(mini.handle, "127.0.0.1", 0)
+    host, port = "127.0.0.1", server.sockets[0].getsockname()[1]
+
+  rc = AsyncRedisClient(host=host, port=port)
+  await rc.connect()
+  try:
+    await rc.client.delete(BENCH_KEY)
+    await rc.client.rpush(BENCH_KEY, *[f"de_map{index}" for index in range(maps)])
+    url = f"redis://{host}:{port}/0"
+    legacy_pool = aioredis.ConnectionPool.from_url(url)
+
+    async def per_call():
+      # require_connection: rc.is_connected() делал PING через новый Redis поверх пула
+      async with aioredis.Redis.from_pool(legacy_pool) as conn:
+        await conn.ping()
+      async with aioredis.Redis.from_pool(legacy_pool) as conn:
+        return await conn.lrange(BENCH_KEY, 0, -1)
+
+    async def shared():
+      if not rc.connected:
+        return None
+      return await rc.list_get(BENCH_KEY, 0)
+
+    connections_before = mini.connections if mini else 0
+    before, before_ops = await _measure("per-call (before)", operations, per_call)
+    connections_legacy = (mini.connections - connections_before) if mini else None
+    after, after_ops = await _measure("shared (after)", operations, shared)
+
+    lines = [f"redis {host}:{port}, LRANGE of {maps} items", before, after, f"speedup: x{after_ops / before_ops:.1f}"]
+    if mini is not None:
+      lines.append(f"connections opened: per-call {connections_legacy}, shared {mini.connections - connections_before - connections_legacy}")
+    await rc.client.delete(BENCH_KEY)
+    return lines
+  finally:
+    await rc.close()
+    if server is not None:
+      server.close()
+      await server.wait_closed()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+  parser = argparse.ArgumentParser(description="Benchmark AsyncRedisClient: shared client vs per-call wrappers")
+  parser.add_argument("--url", default=None, help="host:port of a real Redis (default: embedded RESP server)")
+  parser.add_argument("--ops", type=int, default=5_000, help="operations per measured path")
+  parser.add_argument("--maps", type=int, default=50, help="items in the benchmark list")
+  options = parser.parse_args(argv)
+
+  host, port = None, 0
+  if options.url:
+    host, _, raw_port = options.url.partition(":")
+    port = int(raw_port or 6379)
+
+  print("\n".join(asyncio.run(run(host, port, max(1, options.ops), max(1, options.maps)))))
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,138 @@
+"""Бенчмарк горячих путей data_server/sql_server.py на локальном SQLite (data_server/sqlite_backend.py).
+
+Запуск из корня репозитория:
+  python -m benchmarks.sql_server_hot_paths --users 100000
+
+Измеряется:
+  /check_user (hit)   — ответ из кеша steam_discord_cache через nsroute;
+  /check_user (miss)  — кеш пуст, поиск DISCORD_BY_STEAM_QUERY в базе;
+  map_record_exist    — MAP_EXISTS_QUERY, половина имён отсутствует;
+  cache refresh       — полный пересбор кеша ассоциаций (UserAssociationSync._full_sync).
+
+Абсолютные числа SQLite не равны MySQL (нет сети и пула), но относительная цена
+путей и регрессии в Python-части (маршрутизация, пересборка словарей) видны.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import types
+from typing import Awaitable, Callable, List, Optional
+
+
+def _install_config(db_path: str) -> None:
+  # config.py в репозитории — шаблон; бенчмарку нужен только выбор бэкенда
+  sys.modules["config"] = types.SimpleNamespace(
+    DB_BACKEND="sqlite",
+    DB_SQLITE_PATH=db_path,
+    DB_HOST="",
+    DB_PORT=0,
+    DB_USER="",
+    DB_PASSWORD="",
+    DB_NAME="",
+  )
+
+
+def _steam_id(index: int) -> str:
+  return f"STEAM_0:{index % 2}:{index // 2 + 1}"
+
+
+async def _seed(mysql, users: int, maps: int) -> None:
+  from data_server.steamid import to_steamid64
+
+  rows = [
+    (100000000000000000 + index, f"user{index}", f"User {index}", _steam_id(index), to_steamid64(_steam_id(index)))
+    for index in range(users)
+  ]
+  await mysql.exec_many(
+    "INSERT INTO users (discord_id, ds_name, ds_display_name, steam_id, steam_id64) VALUES (%s, %s, %s, %s, %s)",
+    rows,
+  )
+  await mysql.exec_many(
+    "INSERT INTO maps (map_name, activated, min_players, max_players, priority) VALUES (%s, %s, %s, %s, %s)",
+    [(f"de_map{index}", 1, 0, 32, 100) for index in range(maps)],
+  )
+
+
+async def _measure(name: str, operations: int, step: Callable[[int], Awaitable]) -> str:
+  started = time.perf_counter()
+  for index in range(operations):
+    await step(index)
+  elapsed = time.perf_counter() - started
+  per_op_us = elapsed / operations * 1_000_000
+  return f"{name:<22} {operations:>8} ops  {elapsed:8.3f}s  {per_op_us:10.1f} us/op  {operations / elapsed:10.0f} ops/s"
+
+
+async def run(users: int, maps: int, operations: int, refreshes: int) -> List[str]:
+  from data_server import sql_server
+  from data_server.user_sync import UserAssociationSync
+  from observer.observer_client import nsroute
+
+  mysql = sql_server.mysql
+  await mysql.connect()
+  try:
+    seed_started = time.perf_counter()
+    await _seed(mysql, users, maps)
+    lines = [f"seed: {users} users, {maps} maps in {time.perf_counter() - seed_started:.2f}s"]
+
+    # cache refresh: каждый прогон — новый UserAssociationSync, то есть полный пересбор
+    refresh_times = []
+    for _ in range(refreshes):
+      sql_server.users_sync = UserAssociationSync(mysql)
+      sql_server.steam_discord_cache.clear(); sql_server.discord_steam_cache.clear()
+      started = time.perf_counter()
+      await sql_server.update_user_associations_cache()
+      refresh_times.append(time.perf_counter() - started)
+    assert len(sql_server.steam_discord_cache) == users, "кеш ассоциаций собран не полностью"
+    lines.append(
+      f"{'cache refresh':<22} {refreshes:>8} runs {min(refresh_times):8.3f}s min  "
+      f"{sum(refresh_times) / refreshes:8.3f}s avg  ({users} users)"
+    )
+
+    lookups = min(operations, users)
+
+    async def check_user(index: int):
+      return await nsroute.call_route("/check_user", _steam_id(index * 7919 % users))
+
+    lines.append(await _measure("/check_user (hit)", operations, check_user))
+
+    sql_server.steam_discord_cache.clear(); sql_server.discord_steam_cache.clear()
+
+    async def check_user_miss(index: int):
+      # Каждый steam_id запрашивается один раз, поэтому все обращения идут в базу
+      return await nsroute.call_route("/check_user", _steam_id(index))
+
+    lines.append(await _measure("/check_user (miss)", lookups, check_user_miss))
+
+    async def map_exists(index: int):
+      return await sql_server.map_record_exist(f"de_map{index % (maps * 2)}")
+
+    lines.append(await _measure("map_record_exist", operations, map_exists))
+    return lines
+  finally:
+    await mysql.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+  parser = argparse.ArgumentParser(description="Benchmark sql_server hot paths on the SQLite backend")
+  parser.add_argument("--users", type=int, default=100_000, help="rows in users")
+  parser.add_argument("--maps", type=int, default=500, help="rows in maps")
+  parser.add_argument("--ops", type=int, default=20_000, help="lookups per measured path")
+  parser.add_argument("--refreshes", type=int, default=3, help="full cache refresh runs")
+  parser.add_argument("--db", default=None, help="SQLite file (default: temporary file)")
+  options = parser.parse_args(argv)
+
+  with tempfile.TemporaryDirectory() as tmp:
+    db_path = options.db or os.path.join(tmp, "bench.sqlite3")
+    _install_config(db_path)
+    lines = asyncio.run(run(max(1, options.users), max(1, options.maps), max(1, options.ops), max(1, options.refreshes)))
+
+  print("\n".join(lines))
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
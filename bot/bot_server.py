@@ -1,5 +1,8 @@
 from bot.dbot import DBot
 from observer.observer_client import observer, Event, logger, nsroute
+from data_server.write_behind import WriteBehindBuffer
+from bot.chat_flusher import ChatFlusher
+from bot.outbound import Priority, outbound
 from bot.wow_moments import (
   HltvDemoResolver,
   MomentCluster,
@@ -15,9 +18,9 @@ from bot.wow_moments import (
 import discord
 import asyncio
 from collections import deque
+import json
 import os
 from pathlib import Path
-import time
 
 import config
 
@@ -98,9 +101,10 @@ dbot: DBot = DBot(_cfg_or_env_str("BOT_TOKEN", ""))
 
 cs_chat_duser_msg: bool = False
 cs_chat_max_chars: int = 1000
-cs_chat_last_message: discord.Message = None
+cs_chat_last_message: discord.Message | discord.PartialMessage = None
+cs_chat_last_content: str = ""  # текст cs_chat_last_message: у восстановленного PartialMessage его нет
 
-cs_status_message: discord.Message = None
+cs_status_message: discord.Message | discord.PartialMessage = None
 moment_messages: dict[int, discord.Message] = {}
 moments_channel_id = _cfg_or_env_int("MOMENTS_CHANNEL_ID", 0)
 moment_state = MomentState(
@@ -128,9 +132,111 @@ WOW_VOTERS_PREVIEW_LIMIT = 10
 # Буфер для накопления сообщений из CS
 cs_message_buffer = deque()
 cs_buffer_lock = asyncio.Lock()  # Блокировка для безопасного доступа к буферу
-cs_last_flush_time = time.time()  # Время последней отправки сообщений - сразу инициализируем текущим временем
-cs_flush_interval = 1.5  # Интервал отправки буфера (в секундах)
-cs_buffer_task = None  # Задача для периодической обработки буфера
+cs_flush_interval = 1.5  # Пауза после последнего сообщения перед отправкой (в секундах)
+cs_flush_max_latency = 5.0  # При непрерывном чате пакет уходит не позже этого срока от первого сообщения
+cs_flush_max_chars = 1500  # Столько символов в буфере — отправляем сразу (лимит сообщения с запасом)
+# Поток Redis для чата (см. redis_server, «Ретрансляция чата»): пусто — только буфер в памяти
+cs_relay_enabled = bool(getattr(config, "CHAT_RELAY_STREAM", ""))
+cs_relay_poll_task = None  # Редкий опрос потока: подхват чужих неподтверждённых сообщений
+
+# SECTION Runtime state
+
+# Без этого состояния перезапуск чистит канал статуса, начинает новое сообщение чата и дублирует WOW-моменты.
+# Секции пишутся в Redis примерно через секунду после изменения (повторные изменения схлопываются)
+# и читаются один раз — перед первой обработкой события; сообщения восстанавливаются как PartialMessage без запросов к Discord.
+runtime_state_loaded: bool = False
+runtime_state_lock = asyncio.Lock()
+
+async def _save_runtime_state(rows: list) -> bool:
+  # Пока Redis недоступен, маршрут возвращает None: секции ждут в буфере и уходят после восстановления
+  return bool(await nsroute.call_route("/redis/runtime_state/save", dict(rows)))
+
+runtime_state_buffer = WriteBehindBuffer("runtime_state", _save_runtime_state, flush_interval=1.0)
+
+def _runtime_section(name: str) -> dict:
+  if name == "status":
+    return {"channel_id": config.INFO_CHANNEL_ID, "message_id": cs_status_message.id if cs_status_message else None}
+  if name == "chat":
+    return {
+      "channel_id": config.CS_CHAT_CHNL_ID,
+      "message_id": cs_chat_last_message.id if cs_chat_last_message else None,
+      "content": cs_chat_last_content,
+      "discord_user_message": cs_chat_duser_msg,
+    }
+  return {"channel_id": moments_channel_id, **moment_state.snapshot()}
+
+def _load_section(sections: dict, name: str, channel_id: int) -> dict | None:
+  try:
+    data = json.loads(sections.get(name) or "null")
+  except ValueError:
+    return None
+  # Снимок другого канала (сменили конфиг) не подходит
+  if not isinstance(data, dict) or data.get("channel_id") != channel_id:
+    return None
+  return data
+
+def _partial_message(channel_id: int, message_id: int) -> discord.PartialMessage:
+  return dbot.bot.get_partial_messageable(int(channel_id)).get_partial_message(int(message_id))
+
+# -- persist_runtime_state
+def persist_runtime_state(*sections: str) -> None:
+  # До восстановления не пишем: иначе пустое состояние затрёт сохранённое
+  if not runtime_state_loaded:
+    return
+  for name in sections:
+    runtime_state_buffer.put(name, (name, json.dumps(_runtime_section(name), ensure_ascii=False)))
+
+# -- ensure_runtime_state
+async def ensure_runtime_state() -> None:
+  global runtime_state_loaded, cs_status_message, cs_chat_last_message, cs_chat_last_content, cs_chat_duser_msg
+  if runtime_state_loaded:
+    return
+
+  async with runtime_state_lock:
+    if runtime_state_loaded:
+      return
+    try:
+      sections = await nsroute.call_route("/redis/runtime_state/load")
+    except Exception as err:
+      logger.error(f"DBot: не удалось прочитать сохранённое состояние: {err}")
+      sections = None
+    if sections is None:
+      # Redis недоступен: состояние не помечается загруженным, иначе сброс буфера затрёт сохранённое пустым.
+      # Повтор — при следующем событии
+      return
+    runtime_state_loaded = True
+
+    # Пока Redis был недоступен, бот мог создать новые сообщения: такие секции не восстанавливаются,
+    # а записываются поверх сохранённых
+    restored, newer = [], []
+    status = _load_section(sections, "status", config.INFO_CHANNEL_ID)
+    if cs_status_message is not None:
+      newer.append("status")
+    elif status and status.get("message_id"):
+      cs_status_message = _partial_message(config.INFO_CHANNEL_ID, status["message_id"])
+      restored.append("status")
+
+    chat = _load_section(sections, "chat", config.CS_CHAT_CHNL_ID)
+    if cs_chat_last_message is not None:
+      newer.append("chat")
+    elif chat and chat.get("message_id"):
+      cs_chat_last_message = _partial_message(config.CS_CHAT_CHNL_ID, chat["message_id"])
+      cs_chat_last_content = str(chat.get("content") or "")
+      cs_chat_duser_msg = bool(chat.get("discord_user_message"))
+      restored.append("chat")
+
+    moments = _load_section(sections, "moments", moments_channel_id)
+    if moment_state.snapshot()["clusters"]:
+      newer.append("moments")
+    elif moments and moment_state.restore(moments):
+      restored.append("moments")
+
+    if restored:
+      logger.info(f"DBot: восстановлено состояние после перезапуска: {', '.join(restored)}")
+    if newer:
+      persist_runtime_state(*newer)
+
+# !SECTION
 
 # SECTION Utilities
 
@@ -141,20 +247,24 @@ def concat_message(old_message: str, new_message: str) -> str:
   return delete_closing + new_message + '```'
 
 # -- send_message
-async def send_message(message: str, channel: discord.TextChannel) -> None:
-  global cs_chat_last_message, cs_chat_duser_msg
+async def send_message(message: str, channel: discord.TextChannel) -> bool:
+  global cs_chat_last_message, cs_chat_last_content, cs_chat_duser_msg
 
   try:
-    cs_chat_last_message = await channel.send(f"```ansi\n{message}```")
+    cs_chat_last_message = await outbound.send(channel, f"```ansi\n{message}```", priority=Priority.CHAT)
+    cs_chat_last_content = cs_chat_last_message.content
     cs_chat_duser_msg = False
+    persist_runtime_state("chat")
+    return True
   except Exception as e:
     logger.error(f"Ошибка при отправке сообщения в Discord: {e}")
+    return False
 
 # -- edit_message
-async def edit_message(message: str, channel: discord.TextChannel, skip_size_check: bool = False) -> None:
-  global cs_chat_last_message, cs_chat_max_chars
+async def edit_message(message: str, channel: discord.TextChannel, skip_size_check: bool = False) -> bool:
+  global cs_chat_last_message, cs_chat_last_content, cs_chat_max_chars
 
-  formatted_message = concat_message(cs_chat_last_message.content, message)
+  formatted_message = concat_message(cs_chat_last_content, message)
 
   # Проверка размера только если не указано пропустить
   if not skip_size_check and len(formatted_message) > cs_chat_max_chars:
@@ -165,33 +275,31 @@ async def edit_message(message: str, channel: discord.TextChannel, skip_size_che
     if content.startswith(prefix) and content.endswith(suffix):
       content = content[len(prefix):-len(suffix)]
 
-    await send_message(content, channel)
-    return
+    return await send_message(content, channel)
   
   try:
-    cs_chat_last_message = await cs_chat_last_message.edit(content=formatted_message)
+    cs_chat_last_message = await outbound.edit(cs_chat_last_message, content=formatted_message, priority=Priority.CHAT)
+    cs_chat_last_content = cs_chat_last_message.content
+    persist_runtime_state("chat")
+    return True
+  except discord.NotFound:
+    # Сообщение удалили (или восстановленный id устарел) — продолжаем новым
+    return await send_message(message, channel)
   except Exception as e:
     logger.error(f"Dbot: Ошибка при обновлении CS_CHAT в Discord: {e}")
+    return False
 
 # -- edit_status_message
 async def edit_status_message(message: str, channel: discord.TextChannel):
   global cs_status_message
 
-  # Проверка на существование сообщения
+  # Правка по id без предварительного fetch_message: удалённое сообщение вернёт NotFound
   try:
-    cs_status_message = await channel.fetch_message(cs_status_message.id)
-  except discord.NotFound as err:
+    # Несколько обновлений статуса, ждущих в очереди, схлопываются в одну правку
+    cs_status_message = await outbound.edit(channel.get_partial_message(cs_status_message.id), content=f"```ansi\n{message}```", priority=Priority.STATUS)
+  except discord.NotFound:
     cs_status_message = None
     await send_status_message(message, channel)
-    return
-  except discord.HTTPException as err:
-    logger.error(f"Dbot: Ошибка HTTP при получении CS_STATUS в Discord: {err}")
-    cs_status_message = None
-    await send_status_message(message, channel)
-    return
-
-  try:
-    cs_status_message = await cs_status_message.edit(content=f"```ansi\n{message}```")
   except discord.Forbidden as err:
     logger.error(f"Dbot: Нет прав для обновления CS_STATUS в Discord: {err}")
     cs_status_message = None
@@ -211,7 +319,7 @@ def is_bot(message: discord.Message):
 async def send_status_message(message: str, channel: discord.TextChannel):
   global cs_status_message
   try:
-    await channel.purge(limit=10)
+    await outbound.purge(channel, limit=10, priority=Priority.STATUS)
   except discord.Forbidden as err:
     logger.error(f"Dbot: Нет прав для очистки сообщений перед отправкой статуса: {err}")
   except discord.HTTPException as err:
@@ -220,7 +328,7 @@ async def send_status_message(message: str, channel: discord.TextChannel):
     logger.error(f"Dbot: Неизвестная ошибка при очистке сообщений перед отправкой статуса: {err}")
 
   try:
-    cs_status_message = await channel.send(f"```ansi\n{message}```")
+    cs_status_message = await outbound.send(channel, f"```ansi\n{message}```", priority=Priority.STATUS)
   except discord.Forbidden as err:
     logger.error(f"Dbot: Нет прав для отправки CS_STATUS в Discord: {err}")
     cs_status_message = None
@@ -231,6 +339,8 @@ async def send_status_message(message: str, channel: discord.TextChannel):
     logger.error(f"Dbot: Ошибка при отправке CS_STATUS в Discord: {err}")
     cs_status_message = None
 
+  persist_runtime_state("status")
+
 # -- get_moments_channel
 async def get_moments_channel() -> MomentChannel | None:
   channel_id = moments_channel_id
@@ -430,33 +540,34 @@ async def upsert_moment_message(cluster: MomentCluster) -> None:
   cached_message = moment_messages.get(cluster.cluster_id)
 
   if cached_message is None and cluster.discord_message_id:
-    try:
-      cached_message = await channel.fetch_message(cluster.discord_message_id)
-      moment_messages[cluster.cluster_id] = cached_message
-    except (discord.NotFound, discord.Forbidden, discord.HTTPException):
-      cached_message = None
+    # Без fetch_message: id известен (в том числе после перезапуска), правим сразу
+    cached_message = channel.get_partial_message(cluster.discord_message_id)
 
-  if cached_message is None:
+  if cached_message is not None:
     try:
-      created = await channel.send(content)
-      cluster.discord_message_id = created.id
-      moment_messages[cluster.cluster_id] = created
+      edited = await outbound.edit(cached_message, content=content, priority=Priority.MOMENTS)
+      moment_messages[cluster.cluster_id] = edited
+      cluster.discord_message_id = edited.id
+      persist_runtime_state("moments")
       return
+    except discord.NotFound:
+      moment_messages.pop(cluster.cluster_id, None)
     except (discord.Forbidden, discord.HTTPException) as err:
-      logger.error(f"DBot: не удалось отправить WOW-момент в Discord: {err}")
+      logger.error(f"DBot: не удалось обновить WOW-момент в Discord: {err}")
       return
 
   try:
-    edited = await cached_message.edit(content=content)
-    moment_messages[cluster.cluster_id] = edited
-    cluster.discord_message_id = edited.id
+    created = await outbound.send(channel, content, priority=Priority.MOMENTS)
+    cluster.discord_message_id = created.id
+    moment_messages[cluster.cluster_id] = created
+    persist_runtime_state("moments")
   except (discord.Forbidden, discord.HTTPException) as err:
-    logger.error(f"DBot: не удалось обновить WOW-момент в Discord: {err}")
+    logger.error(f"DBot: не удалось отправить WOW-момент в Discord: {err}")
 
 # !SECTION
 
 # -- (route) get_member
-@nsroute.create_route("/GetMember")
+@nsroute.create_route("/GetMember", timeout=1.0, max_concurrency=8, failure_threshold=5, reset_timeout=30)
 async def get_member(discord_id: int) -> discord.Member:
   guild = dbot.bot.get_guild(config.GUILD_ID)
   member: discord.Member 
@@ -492,10 +603,12 @@ async def ev_info(data) -> None:
   info_message = data['info_message']
   map_name = data.get("map_name")
   round_number = data.get("round_number", 0)
+  await ensure_runtime_state()
 
   if map_name:
     if moment_state.touch_info(map_name, round_number):
       moment_messages.clear()
+      persist_runtime_state("moments")
       logger.info(
         "DBot: WOW moments session reset by info snapshot (map=%s round=%s)",
         map_name,
@@ -522,6 +635,7 @@ async def ev_moment_vote(data) -> None:
     logger.error("DBot: moment payload rejected: %r", payload)
     return
 
+  await ensure_runtime_state()
   result = moment_state.process_vote(vote)
   if result.session_reset:
     moment_messages.clear()
@@ -547,67 +661,80 @@ async def ev_moment_vote(data) -> None:
     result.cluster.stars,
   )
 
+# -- ev_close
+@observer.subscribe(Event.BE_CLOSE)
+async def ev_close() -> None:
+  # До BE_CLOSED: Redis ещё открыт. Порядок важен: последний пакет чата уходит через outbound
+  # и меняет секцию chat, поэтому состояние сбрасывается последним
+  if cs_relay_poll_task is not None:
+    cs_relay_poll_task.cancel()
+  await cs_flusher.close()
+  await outbound.close()
+  await runtime_state_buffer.close()
+
 # -- ev_message_from_dis
 @observer.subscribe(Event.BE_MESSAGE)
 async def ev_message_from_dis(data) -> None:
   global cs_chat_duser_msg
-  cs_chat_duser_msg = True
+  await ensure_runtime_state()
+  if not cs_chat_duser_msg:
+    cs_chat_duser_msg = True
+    persist_runtime_state("chat")
 
 # -- ev_message_from_cs
 @observer.subscribe(Event.WBH_MESSAGE)
 async def ev_message_from_cs(data) -> None:
-  global cs_last_flush_time, cs_buffer_task
   message = data['message']
-  
-  # Добавляем сообщение в буфер
-  async with cs_buffer_lock:
-    cs_message_buffer.append(message)
-  
-  # Убедимся, что обработчик буфера запущен
-  if cs_buffer_task is None or cs_buffer_task.done():
-    await start_buffer_processor()
-
-# -- Функция для запуска таймера обработки буфера
-async def start_buffer_processor():
-  global cs_buffer_task
-  
-  if cs_buffer_task is None or cs_buffer_task.done():
-    cs_buffer_task = asyncio.create_task(buffer_processor())
-    logger.info("DBot: Запущен обработчик буфера сообщений")
 
-# -- Периодическая обработка буфера сообщений
-async def buffer_processor():
-  global cs_last_flush_time
-  
+  # С потоком Redis сообщение переживает перезапуск и может быть отправлено резервным процессом;
+  # если Redis недоступен — кладём в буфер в памяти, как без потока
+  if not cs_relay_enabled or not await nsroute.call_route("/redis/chat_relay/append", message):
+    async with cs_buffer_lock:
+      cs_message_buffer.append(message)
+
+  # Отправка по таймеру пакета (или сразу, если буфер набрал лимит символов)
+  cs_flusher.put(len(message))
+
+# -- ev_relay_ready
+@observer.subscribe(Event.BE_READY)
+async def ev_relay_ready() -> None:
+  global cs_relay_poll_task
+  # Неподтверждённые сообщения потока (свои после перезапуска или чужие при подхвате) отправляются без нового вебхука
+  if cs_relay_enabled and (cs_relay_poll_task is None or cs_relay_poll_task.done()):
+    cs_relay_poll_task = asyncio.create_task(relay_poller())
+
+# -- relay_poller
+async def relay_poller():
+  interval = getattr(config, "CHAT_RELAY_CLAIM_IDLE_SEC", 30)
   while True:
     try:
-      # Проверяем, прошло ли достаточно времени для следующей обработки
-      current_time = time.time()
-      if current_time - cs_last_flush_time >= cs_flush_interval:
-        await flush_message_buffer()
-        cs_last_flush_time = current_time
-      
-      # Ждем небольшой интервал перед следующей проверкой
-      await asyncio.sleep(0.1)  # Проверяем буфер 10 раз в секунду
+      if not cs_flusher.pending:
+        await cs_flusher.flush("relay_poll")
     except Exception as e:
-      logger.error(f"DBot: Ошибка в обработчике буфера: {e}")
-      await asyncio.sleep(1)  # Пауза при ошибке
+      logger.error(f"DBot: Ошибка при опросе потока чата: {e}")
+    await asyncio.sleep(interval)
 
 # -- Обработка буфера сообщений
-async def flush_message_buffer():
+async def flush_message_buffer() -> bool | None:
+  """Отправляет накопленный чат; False — отправка не удалась, неподтверждённые записи потока нужно повторить."""
   global cs_chat_last_message, cs_chat_duser_msg
   
   channel = dbot.bot.get_channel(config.CS_CHAT_CHNL_ID)
   if not channel:
     logger.error("DBot: CS_CHAT_CHANNEL Не найден при обработке буфера")
     return
-  
+
+  await ensure_runtime_state()
   async with cs_buffer_lock:
-    if not cs_message_buffer:  # Если буфер пуст, ничего не делаем
+    relay_entries = []
+    if cs_relay_enabled:
+      relay_entries = await nsroute.call_route("/redis/chat_relay/read", 100) or []
+
+    if not cs_message_buffer and not relay_entries:  # Если буфер пуст, ничего не делаем
       return
     
     # Собираем все сообщения из буфера, сохраняя построчное форматирование
-    messages = []
+    messages = [message for _, message in relay_entries]
     while cs_message_buffer:
       messages.append(cs_message_buffer.popleft())
     
@@ -615,7 +742,7 @@ async def flush_message_buffer():
     combined_message = "".join(messages)
     
     # Проверка на превышение максимального размера сообщения
-    max_discord_message_length = 1500  # Уменьшаем лимит для большего запаса
+    max_discord_message_length = cs_flush_max_chars  # Уменьшаем лимит для большего запаса
     formatted_message = f"```ansi\n{combined_message}```"  # оцениваем размер с учетом форматирования
     
     # Должны отправить новое сообщение в следующих случаях:
@@ -633,7 +760,7 @@ async def flush_message_buffer():
     # 3. Если последнее сообщение уже достаточно большое
     if not send_new_message and cs_chat_last_message:
       # Проверяем максимальный размер после редактирования
-      current_content = cs_chat_last_message.content
+      current_content = cs_chat_last_content
       potential_content = concat_message(current_content, combined_message)
       
       if len(potential_content) > max_discord_message_length:
@@ -642,14 +769,22 @@ async def flush_message_buffer():
     
     # Отправляем или редактируем сообщение в зависимости от ситуации
     if send_new_message:
-      await send_message(combined_message, channel)
+      sent = await send_message(combined_message, channel)
     else:
       try:
         # Используем skip_size_check=True, т.к. проверка размера уже сделана выше
-        await edit_message(combined_message, channel, skip_size_check=True)
+        sent = await edit_message(combined_message, channel, skip_size_check=True)
       except Exception as e:
         # Если редактирование не удалось, отправляем новое сообщение
         logger.error(f"DBot: Ошибка при редактировании, отправляем новое сообщение: {e}")
-        await send_message(combined_message, channel)
+        sent = await send_message(combined_message, channel)
+
+    # Подтверждаем только доставленное: остальное поток вернёт при следующей обработке
+    if sent and relay_entries:
+      await nsroute.call_route("/redis/chat_relay/ack", [entry_id for entry_id, _ in relay_entries])
     
     cs_chat_duser_msg = False
+    return sent or not relay_entries
+
+# Без сообщений ничего не просыпается; первое сообщение взводит таймер пакета
+cs_flusher = ChatFlusher("cs_chat", flush_message_buffer, delay=cs_flush_interval, max_latency=cs_flush_max_latency, max_size=cs_flush_max_chars)
@@ -0,0 +1,118 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from observer.observer_client import logger, metrics
+
+FlushFn = Callable[[], Awaitable[Any]]
+
+
+# SECTION ChatFlusher
+class ChatFlusher:
+  """Пакетная отправка чата по событиям вместо периодического опроса.
+
+  Первое сообщение пакета взводит таймер на delay секунд, каждое следующее переносит его ещё на delay,
+  но не дальше max_latency от первого сообщения. Когда в пакете набирается max_size символов,
+  отправка начинается сразу. Без сообщений таймеров и задач нет.
+  flush_fn сама забирает накопленное; если она вернула False или упала, отправка повторяется через delay.
+  """
+
+  def __init__(self, name: str, flush_fn: FlushFn, *, delay: float = 1.5, max_latency: float = 5.0, max_size: int = 1500) -> None:
+    self.name: str = name
+    self.flush_fn: FlushFn = flush_fn
+    self.delay: float = max(0.0, float(delay))
+    self.max_latency: float = max(self.delay, float(max_latency))
+    self.max_size: int = max(1, int(max_size))
+    self._messages: int = 0
+    self._size: int = 0
+    self._first_at: Optional[float] = None
+    self._deadline: Optional[float] = None
+    self._lock: asyncio.Lock = asyncio.Lock()
+    self._timer: Optional[asyncio.TimerHandle] = None
+    self._flush_task: Optional[asyncio.Task] = None
+
+  @property
+  def pending(self) -> int:
+    return self._messages
+
+  # -- put()
+  def put(self, size: int = 0) -> None:
+    """Отмечает новое сообщение длиной size символов (само сообщение хранит вызывающий)."""
+    now = time.monotonic()
+    if self._first_at is None:
+      self._first_at = now
+    self._messages += 1
+    self._size += max(0, size)
+
+    if self._size >= self.max_size:
+      self._arm(now, "size")
+      return
+    limit = self._first_at + self.max_latency
+    if now + self.delay >= limit:
+      self._arm(limit, "max_latency")
+    else:
+      self._arm(now + self.delay, "deadline")
+
+  # -- flush()
+  async def flush(self, reason: str = "manual") -> bool:
+    """Отправляет накопленное сейчас. Возвращает False, если отправка не удалась и будет повторена."""
+    async with self._lock:
+      self._cancel_timer()
+      messages, first_at = self._messages, self._first_at
+      self._messages, self._size, self._first_at, self._deadline = 0, 0, None, None
+
+      try:
+        ok = await self.flush_fn() is not False
+      except Exception as err:
+        logger.error(f"DBot: ChatFlusher[{self.name}]: ошибка отправки: {err}")
+        ok = False
+
+      if not ok:
+        metrics.inc("chat_flush_failures_total", flusher=self.name)
+        # Неотправленное (например, неподтверждённые записи потока Redis) ждёт повтора, а не следующего сообщения
+        if first_at is not None:
+          self._first_at = first_at
+        elif self._first_at is None:
+          self._first_at = time.monotonic()
+        self._messages += messages
+        self._arm(time.monotonic() + self.delay, "retry")
+        return False
+
+      metrics.inc("chat_flushes_total", flusher=self.name, reason=reason)
+      if messages:
+        metrics.inc("chat_flush_messages_total", messages, flusher=self.name)
+        metrics.observe("chat_flush_batch_messages", messages, flusher=self.name)
+      if first_at is not None:
+        metrics.observe("chat_flush_latency_seconds", time.monotonic() - first_at, flusher=self.name)
+      return True
+
+  # -- close()
+  async def close(self) -> None:
+    """Финальная отправка при остановке."""
+    self._cancel_timer()
+    if self._messages:
+      await self.flush("close")
+
+  def _arm(self, deadline: float, reason: str) -> None:
+    if self._timer is not None and self._deadline == deadline:
+      return
+    self._cancel_timer()
+    self._deadline = deadline
+    self._timer = asyncio.get_running_loop().call_later(max(0.0, deadline - time.monotonic()), self._on_timer, reason)
+
+  def _on_timer(self, reason: str) -> None:
+    self._timer = None
+    self._deadline = None
+    if self._flush_task is None or self._flush_task.done():
+      self._flush_task = asyncio.create_task(self.flush(reason), name=f"chat_flusher:{self.name}")
+    else:
+      # Предыдущая отправка ещё идёт — новые сообщения уйдут следующим пакетом
+      self._arm(time.monotonic() + self.delay, reason)
+
+  def _cancel_timer(self) -> None:
+    if self._timer is not None:
+      self._timer.cancel()
+      self._timer = None
+    self._deadline = None
+
+# !SECTION
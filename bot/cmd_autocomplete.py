@@ -1,30 +1,37 @@
-from observer.observer_client import nsroute, observer, Event, logger
+from observer.observer_client import nsroute, observer, caches, Event, logger
 import discord
 
-cache_online_players: set = {}
+# Ники игроков онлайн из последнего WBH_INFO; TTL — чтобы не подсказывать устаревший список, если сервер замолчал
+online_players = caches.region("online_players", ttl=600)
 
 @observer.subscribe(Event.WBH_INFO)
 async def ev_online_players(data):
-  global cache_online_players
-  cache_online_players = set(player['name'] for player in data['current_players'])
+  online_players.set("names", set(player['name'] for player in data['current_players']))
+
+def _online_names() -> set:
+  return online_players.get("names") or set()
 
 async def players_online(interaction: discord.Interaction, current: str) -> list[discord.app_commands.Choice[str]]:
-  global cache_online_players
-  filter_players: list = [player_name for player_name in cache_online_players if current.lower() in player_name.lower()][:25]
+  filter_players: list = [player_name for player_name in _online_names() if current.lower() in player_name.lower()][:25]
   return [discord.app_commands.Choice(name=player, value=player) for player in filter_players]
 
 async def ban_online(interaction: discord.Interaction, current: str) -> list[discord.app_commands.Choice[str]]:
-  global cache_online_players
-  filter_players: list = [player_name for player_name in cache_online_players if current.lower() in player_name.lower()][:25] 
+  filter_players: list = [player_name for player_name in _online_names() if current.lower() in player_name.lower()][:25] 
   return [discord.app_commands.Choice(name=player, value=player) for player in filter_players]
 
+# Не больше 25 вариантов — столько Discord показывает в автодополнении
+AUTOCOMPLETE_LIMIT = 25
+
+async def _redis_autocomplete(dataset: str, current: str, limit: int = AUTOCOMPLETE_LIMIT) -> list:
+  # Redis сам отбирает кандидатов по :lex-индексу, весь набор в бота не выгружается
+  return await nsroute.call_route("/redis/autocomplete", dataset, current, limit) or []
+
 async def ban_offline(interaction: discord.Interaction, current: str) -> list[discord.app_commands.Choice[str]]:
-  global cache_online_players
-  offline_players: list = await nsroute.call_route("/redis/get_offline_players") or []
+  online: set = _online_names()
+  # Запас на игроков онлайн: они отсеиваются уже после выборки
+  offline_players: list = await _redis_autocomplete("last_players", current, AUTOCOMPLETE_LIMIT + len(online))
 
-  offline_set: set = set(offline_players)
-  filtered_offline_players: list = list(offline_set - cache_online_players)
-  filter_players: list = [player_name for player_name in filtered_offline_players if current.lower() in player_name.lower()][:25] 
+  filter_players: list = [player_name for player_name in offline_players if player_name not in online][:AUTOCOMPLETE_LIMIT]
   return [discord.app_commands.Choice(name=player, value=player) for player in filter_players]
 
 async def ban_minutes(interaction: discord.Interaction, current: str) -> list[discord.app_commands.Choice[str]]:
@@ -38,20 +45,14 @@ async def ban_minutes(interaction: discord.Interaction, current: str) -> list[di
 				]
 
 async def unban(interaction: discord.Interaction, current: str) -> list[discord.app_commands.Choice[str]]:
-  banned_players: list = await nsroute.call_route("/redis/get_banned_players") or []
-
-  filter_players: list = [player_name for player_name in banned_players if current.lower() in player_name.lower()][:25] 
+  filter_players: list = await _redis_autocomplete("bans", current)
   return [discord.app_commands.Choice(name=player, value=player) for player in filter_players]
 
 async def maps_active(interaction: discord.Interaction, current: str) -> list[discord.app_commands.Choice[str]]:
-  map_list: list = await nsroute.call_route("/redis/get_map_list_active") or []
-
-  filter_maps: list = [map_name for map_name in map_list if current.lower() in map_name.lower()][:25]
+  filter_maps: list = await _redis_autocomplete("maps_active", current)
   return [discord.app_commands.Choice(name=map, value=map) for map in filter_maps]
 
 async def maps_all(interaction: discord.Interaction, current: str) -> list[discord.app_commands.Choice[str]]:
-  map_list: list = await nsroute.call_route("/redis/get_map_list_all") or []
-
-  filter_maps: list = [map_name for map_name in map_list if current.lower() in map_name.lower()][:25]
+  filter_maps: list = await _redis_autocomplete("maps_all", current)
   return [discord.app_commands.Choice(name=map, value=map) for map in filter_maps]
 
@@ -46,6 +46,7 @@ async def cmd_help(interaction: discord.Interaction):
         False,
       ),
       ("map_add", " <map_name> [activated] [min_players] [max_players] [priority]", "Добавляет карту в базу данных (нужны права manage_messages).", False),
+      ("map_import", " <file> [activated] [min_players] [max_players] [priority]", "Массово добавляет карты из mapcycle.txt или CSV (нужны права manage_messages).", False),
       ("map_delete", " <map_name>", "Удаляет карту из базы данных (нужны права manage_messages).", False),
       ("map_update", " <map_name> [activated] [min_players] [max_players] [priority]", "Обновляет параметры карты в базе данных (нужны права manage_messages).", False),
     ]),
@@ -310,6 +311,26 @@ async def cmd_map_add(interaction: discord.Interaction, map_name: str, activated
     "priority": priority
   })
 
+# -- /map_import
+@bot.tree.command(name="map_import", description="Массово добавляет карты в БД из mapcycle.txt или CSV")
+@discord.app_commands.describe(file="mapcycle.txt (карта в строке) или CSV: map_name,activated,min_players,max_players,priority",
+                               activated="Активность по умолчанию (для строк без значения)",
+                               min_players="Минимум игроков по умолчанию",
+                               max_players="Максимум игроков по умолчанию",
+                               priority="Приоритет по умолчанию")
+@commands.has_permissions(manage_messages=True)
+async def cmd_map_import(interaction: discord.Interaction, file: discord.Attachment, activated: int=1, min_players: int=0, max_players: int=32, priority: int=100):
+  await interaction.response.defer(thinking=True, ephemeral=True)
+
+  await observer.notify(Event.BC_DB_MAP_IMPORT, {
+    Param.Interaction: interaction,
+    "file": file,
+    "activated": activated,
+    "min_players": min_players,
+    "max_players": max_players,
+    "priority": priority
+  })
+
 # -- /map_delete
 @bot.tree.command(name="map_delete", description="Удаляет карту из БД")
 @discord.app_commands.describe(map_name="Название карты")
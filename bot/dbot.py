@@ -1,6 +1,29 @@
+import logging
+from typing import Awaitable, Callable
+
 import discord
 from discord.ext import commands
 
+# SECTION ClosableBot
+class ClosableBot(commands.Bot):
+  """commands.Bot, который перед закрытием соединения с Discord выполняет хуки остановки (финальные сбросы буферов и т.п.)."""
+
+  def __init__(self, *args, **kwargs):
+    super().__init__(*args, **kwargs)
+    self.close_hooks: list[Callable[[], Awaitable[None]]] = []
+
+  # -- close()
+  async def close(self) -> None:
+    hooks, self.close_hooks = self.close_hooks, []
+    for hook in hooks:
+      try:
+        await hook()
+      except Exception as err:
+        logging.getLogger(__name__).error(f"DBot: ошибка в хуке остановки {hook!r}: {err}")
+    await super().close()
+
+# !SECTION
+
 # SECTION DBot
 class DBot:
   # -- __init__()
@@ -16,7 +39,7 @@ class DBot:
     self.intents.members = True  # Позволяет получать информацию о членах сервера
 
     # Создание экземпляра бота с заданным префиксом команд и интентами
-    self.bot: commands.Bot = commands.Bot(command_prefix='/', intents=self.intents)
+    self.bot: ClosableBot = ClosableBot(command_prefix='/', intents=self.intents)
 
     # -- on_command_error()
     @self.bot.event
@@ -34,6 +57,13 @@ class DBot:
       else:
         await ctx.send("Произошла ошибка при выполнении команды.")
 
+  # -- add_close_hook()
+  def add_close_hook(self, hook: Callable[[], Awaitable[None]]) -> None:
+    """
+    Регистрирует корутину, которая выполнится при остановке бота до закрытия соединения.
+    """
+    self.bot.close_hooks.append(hook)
+
   # -- run()
   def run(self) -> None:
     """
@@ -1,6 +1,8 @@
 import discord.ext.tasks
-from observer.observer_client import logger, observer, Event, Param, nsroute
+from observer.observer_client import logger, metrics, observer, Event, Param, nsroute
+from observer.startup import StartupReport, run_startup
 
+import asyncio
 import discord
 import discord.ext
 
@@ -9,11 +11,19 @@ from bot.bot_server import dbot
 import config
 
 from bot import utilities as bot_utilities
+from bot.outbound import Priority, outbound
 
 
 bot = dbot.bot
 _startup_ready_sent: bool = False
 
+# -- on_close
+async def on_close():
+  await observer.notify(Event.BE_CLOSE)
+  await observer.notify(Event.BE_CLOSED)
+
+dbot.add_close_hook(on_close)
+
 # -- on_ready
 @bot.event
 async def on_ready():
@@ -46,7 +56,7 @@ async def on_ready():
       )
 
       try:
-        await admin_channel.send(startup_message)
+        await outbound.send(admin_channel, startup_message, priority=Priority.MODERATION)
       except (discord.Forbidden, discord.HTTPException) as send_error:
         logger.warning(
           "Не удалось отправить сообщение о запуске в канал %s: %s",
@@ -83,8 +93,18 @@ async def on_member_update(before: discord.Member, after: discord.Member):
 # -- setup_hook
 @bot.event
 async def setup_hook():
+  # Вызывается до подключения к gateway: прогрев (BE_STARTUP) идёт параллельно с синхронизацией команд,
+  # и к BE_READY, когда стартует веб-сервер, соединения и кеши уже готовы
   guild = bot.get_guild(config.GUILD_ID)
-  await bot.tree.sync(guild=guild)
+  report = StartupReport(metrics=metrics)
+  await asyncio.gather(
+    run_startup(observer, report, timeout=getattr(config, "STARTUP_WARMUP_TIMEOUT_SEC", 30)),
+    report.run("discord.tree_sync", bot.tree.sync(guild=guild)),
+  )
+  if report.timed_out or report.failed:
+    logger.warning(f"DBot: {report.summary()}")
+  else:
+    logger.info(f"DBot: {report.summary()}")
 
 # -- (task) cs_connect_task
 @discord.ext.tasks.loop(seconds=config.CS_RECONNECT_INTERVAL)
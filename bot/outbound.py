@@ -0,0 +1,336 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+import discord
+
+from observer.observer_client import logger, metrics
+
+
+# SECTION Priority
+class Priority(IntEnum):
+  """Порядок отправки при очереди: меньше — раньше."""
+  MODERATION = 0  # модерация и ответы администраторам (кик/бан, результаты установки карт)
+  CHAT = 1
+  STATUS = 2
+  MOMENTS = 3
+
+# !SECTION
+
+# Лимиты Discord на канал (запросов, за сек): отправка и правка сообщений — 5 за 5 с, массовое удаление — 1 в сек;
+# на всё приложение — 50 запросов в секунду
+ROUTE_LIMITS: Dict[str, Tuple[int, float]] = {
+  "send": (5, 5.0),
+  "edit": (5, 5.0),
+  "purge": (1, 1.0),
+}
+GLOBAL_LIMIT: Tuple[int, float] = (50, 1.0)
+MAX_ATTEMPTS = 3
+
+
+# SECTION _Bucket
+class _Bucket:
+  """Скользящее окно: не больше limit запросов за per секунд; после 429 — пауза retry_after."""
+
+  def __init__(self, limit: int, per: float) -> None:
+    self.limit: int = max(1, int(limit))
+    self.per: float = float(per)
+    self.sent: Deque[float] = deque()
+    self.blocked_until: float = 0.0
+
+  def delay(self, now: float) -> float:
+    while self.sent and now - self.sent[0] >= self.per:
+      self.sent.popleft()
+    wait = self.blocked_until - now
+    if len(self.sent) >= self.limit:
+      wait = max(wait, self.per - (now - self.sent[0]))
+    return max(0.0, wait)
+
+  def take(self, now: float) -> None:
+    self.sent.append(now)
+
+  def block(self, now: float, seconds: float) -> None:
+    self.blocked_until = max(self.blocked_until, now + seconds)
+
+# !SECTION
+
+
+@dataclass
+class _Job:
+  priority: Priority
+  seq: int
+  route: str
+  channel_id: int
+  call: Callable[[], Awaitable[Any]]
+  future: asyncio.Future
+  queued_at: float
+  merge_key: Optional[Hashable] = None
+  attempts: int = 0
+  sort_key: Tuple[int, int] = field(init=False)
+
+  def __post_init__(self) -> None:
+    self.sort_key = (int(self.priority), self.seq)
+
+
+# SECTION _RateLimitLogCounter
+class _RateLimitLogCounter(logging.Filter):
+  """Считает 429, которые discord.py обработал сам (он пишет о каждом предупреждение и повторяет запрос)."""
+
+  def filter(self, record: logging.LogRecord) -> bool:
+    if isinstance(record.msg, str) and record.msg.startswith("We are being rate limited"):
+      method = record.args[0] if isinstance(record.args, tuple) and record.args else "-"
+      metrics.inc("discord_429_total", source="http", method=method)
+    return True
+
+# !SECTION
+
+
+# SECTION OutboundScheduler
+class OutboundScheduler:
+  """Единая очередь исходящих запросов бота к Discord.
+
+  Запрос уходит, когда свободны его корзина (маршрут + канал) и общая корзина приложения;
+  из готовых первым идёт запрос с большим приоритетом (Priority), при равном — более ранний.
+  Правки одного сообщения, ещё стоящие в очереди, схлопываются: уходит только последнее содержимое,
+  а все ожидающие получают его результат. Без запросов очередь ничего не делает.
+  """
+
+  def __init__(
+    self,
+    *,
+    max_in_flight: int = 4,
+    route_limits: Optional[Dict[str, Tuple[int, float]]] = None,
+    global_limit: Tuple[int, float] = GLOBAL_LIMIT,
+    clock: Callable[[], float] = time.monotonic,
+  ) -> None:
+    self.route_limits: Dict[str, Tuple[int, float]] = dict(route_limits or ROUTE_LIMITS)
+    self.clock = clock
+    self.max_in_flight: int = max(1, int(max_in_flight))
+    self._global: _Bucket = _Bucket(*global_limit)
+    self._buckets: Dict[Tuple[str, int], _Bucket] = {}
+    self._queue: List[_Job] = []
+    self._merge: Dict[Hashable, _Job] = {}
+    self._in_flight_keys: set = set()
+    self._in_flight: int = 0
+    self._seq = itertools.count()
+    self._wakeup: Optional[asyncio.Event] = None
+    self._task: Optional[asyncio.Task] = None
+    # Ссылки на выполняемые запросы: иначе задачу может собрать сборщик мусора, а close() не сможет её отменить
+    self._executing: set = set()
+    self._log_filter: Optional[_RateLimitLogCounter] = None
+
+  def __len__(self) -> int:
+    return len(self._queue)
+
+  # -- send()
+  async def send(self, channel, content: Optional[str] = None, *, priority: Priority, **kwargs) -> discord.Message:
+    return await asyncio.shield(self.submit("send", channel.id, priority, lambda: channel.send(content, **kwargs)))
+
+  # -- edit()
+  async def edit(self, message, *, priority: Priority, **kwargs) -> discord.Message:
+    """Правка сообщения (Message или PartialMessage); более новая правка того же сообщения заменяет ждущую."""
+    merge_key = ("edit", message.channel.id, message.id)
+    # shield: отмена одного ожидающего не должна отменять общую правку для остальных
+    return await asyncio.shield(self.submit("edit", message.channel.id, priority, lambda: message.edit(**kwargs), merge_key=merge_key))
+
+  # -- purge()
+  async def purge(self, channel, *, priority: Priority, **kwargs) -> list:
+    return await asyncio.shield(self.submit("purge", channel.id, priority, lambda: channel.purge(**kwargs)))
+
+  # -- submit()
+  def submit(
+    self,
+    route: str,
+    channel_id: int,
+    priority: Priority,
+    call: Callable[[], Awaitable[Any]],
+    *,
+    merge_key: Optional[Hashable] = None,
+  ) -> asyncio.Future:
+    """Ставит запрос в очередь. Возвращает future с результатом call() (или её исключением)."""
+    self._ensure_started()
+    priority = Priority(priority)
+
+    queued = self._merge.get(merge_key) if merge_key is not None else None
+    if queued is not None:
+      # Ждущая правка ещё не ушла: отправим только новое содержимое с наибольшим из приоритетов
+      queued.call = call
+      if priority < queued.priority:
+        queued.priority = priority
+        queued.sort_key = (int(priority), queued.seq)
+      metrics.inc("discord_outbound_merged_total", priority=priority.name.lower())
+      return queued.future
+
+    job = _Job(priority, next(self._seq), route, int(channel_id), call, asyncio.get_running_loop().create_future(), self.clock(), merge_key)
+    self._enqueue(job)
+    return job.future
+
+  # -- close()
+  async def close(self) -> None:
+    if self._task is not None:
+      self._task.cancel()
+      try:
+        await self._task
+      except asyncio.CancelledError:
+        pass
+      self._task = None
+    executing = list(self._executing)
+    for task in executing:
+      task.cancel()
+    await asyncio.gather(*executing, return_exceptions=True)
+    for job in self._queue:
+      if not job.future.done():
+        job.future.cancel()
+    self._queue.clear()
+    self._merge.clear()
+    self._report_depth()
+    if self._log_filter is not None:
+      logging.getLogger("discord.http").removeFilter(self._log_filter)
+      self._log_filter = None
+
+  def _ensure_started(self) -> None:
+    if self._task is not None and not self._task.done():
+      return
+    self._wakeup = asyncio.Event()
+    self._task = asyncio.create_task(self._run(), name="discord_outbound")
+    if self._log_filter is None:
+      self._log_filter = _RateLimitLogCounter()
+      logging.getLogger("discord.http").addFilter(self._log_filter)
+
+  def _enqueue(self, job: _Job) -> None:
+    self._queue.append(job)
+    if job.merge_key is not None:
+      self._merge[job.merge_key] = job
+    self._report_depth()
+    self._wakeup.set()
+
+  def _bucket(self, route: str, channel_id: int) -> _Bucket:
+    key = (route, channel_id)
+    bucket = self._buckets.get(key)
+    if bucket is None:
+      bucket = self._buckets[key] = _Bucket(*self.route_limits.get(route, ROUTE_LIMITS["send"]))
+    return bucket
+
+  def _next_job(self) -> Tuple[Optional[_Job], Optional[float]]:
+    """Готовый запрос с наибольшим приоритетом либо (None, сколько ждать до ближайшего)."""
+    now = self.clock()
+    global_delay = self._global.delay(now)
+    soonest: Optional[float] = None
+    for job in sorted(self._queue, key=lambda queued: queued.sort_key):
+      # Правки одного сообщения не обгоняют друг друга
+      if job.merge_key is not None and job.merge_key in self._in_flight_keys:
+        continue
+      delay = max(global_delay, self._bucket(job.route, job.channel_id).delay(now))
+      if delay <= 0:
+        return job, None
+      soonest = delay if soonest is None else min(soonest, delay)
+    return None, soonest
+
+  async def _run(self) -> None:
+    while True:
+      job = None
+      if self._in_flight < self.max_in_flight:
+        job, wait = self._next_job()
+      else:
+        wait = None
+      if job is None:
+        self._wakeup.clear()
+        try:
+          await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+        except asyncio.TimeoutError:
+          pass
+        continue
+
+      now = self.clock()
+      self._queue.remove(job)
+      if job.merge_key is not None:
+        self._merge.pop(job.merge_key, None)
+        self._in_flight_keys.add(job.merge_key)
+      self._global.take(now)
+      self._bucket(job.route, job.channel_id).take(now)
+      self._in_flight += 1
+      self._report_depth()
+      task = asyncio.create_task(self._execute(job), name=f"discord_outbound:{job.route}")
+      self._executing.add(task)
+      task.add_done_callback(self._executing.discard)
+
+  async def _execute(self, job: _Job) -> None:
+    label = job.priority.name.lower()
+    metrics.observe("discord_outbound_wait_seconds", self.clock() - job.queued_at, priority=label)
+    try:
+      result = await job.call()
+    except asyncio.CancelledError:
+      # close(): ожидающие получают отмену, а не висят на future
+      self._in_flight -= 1
+      if job.merge_key is not None:
+        self._in_flight_keys.discard(job.merge_key)
+      job.future.cancel()
+      raise
+    except (discord.RateLimited, discord.HTTPException) as err:
+      if isinstance(err, discord.HTTPException) and err.status != 429:
+        self._finish(job, error=err)
+        return
+      # 429, который discord.py не смог переждать сам: придерживаем корзину и повторяем позже
+      retry_after = float(getattr(err, "retry_after", 0) or 1.0)
+      metrics.inc("discord_429_total", source="outbound", route=job.route)
+      self._bucket(job.route, job.channel_id).block(self.clock(), retry_after)
+      job.attempts += 1
+      if job.attempts >= MAX_ATTEMPTS:
+        self._finish(job, error=err)
+        return
+      logger.warning(f"DBot: Discord 429 ({job.route}, канал {job.channel_id}), повтор через {retry_after:.2f} сек")
+      self._finish(job, requeue=True)
+      return
+    except Exception as err:
+      self._finish(job, error=err)
+      return
+    metrics.inc("discord_outbound_requests_total", route=job.route, priority=label)
+    self._finish(job, result=result)
+
+  def _finish(self, job: _Job, *, result: Any = None, error: Optional[BaseException] = None, requeue: bool = False) -> None:
+    self._in_flight -= 1
+    if job.merge_key is not None:
+      self._in_flight_keys.discard(job.merge_key)
+
+    if requeue:
+      merged = self._merge.get(job.merge_key) if job.merge_key is not None else None
+      if merged is None:
+        self._enqueue(job)
+      else:
+        # Пока ждали, пришла новая правка того же сообщения — её результат получат и прежние ожидающие
+        merged.future.add_done_callback(lambda done: _copy_result(done, job.future))
+        self._wakeup.set()
+      return
+
+    if not job.future.done():
+      if error is not None:
+        metrics.inc("discord_outbound_failures_total", route=job.route)
+        job.future.set_exception(error)
+      else:
+        job.future.set_result(result)
+    self._wakeup.set()
+
+  def _report_depth(self) -> None:
+    metrics.set_gauge("discord_outbound_queue_depth", len(self._queue))
+
+# !SECTION
+
+
+def _copy_result(source: asyncio.Future, target: asyncio.Future) -> None:
+  if target.done():
+    return
+  if source.cancelled():
+    target.cancel()
+  elif source.exception() is not None:
+    target.set_exception(source.exception())
+  else:
+    target.set_result(source.result())
+
+
+# Общий планировщик процесса бота
+outbound = OutboundScheduler()
@@ -6,7 +6,7 @@ from ftplib import FTP
 import logging
 import re
 import time
-from dataclasses import dataclass, field
+from dataclasses import asdict, dataclass, field, fields
 from typing import Optional, Set
 from urllib.parse import quote, unquote
 
@@ -334,6 +334,49 @@ class MomentState:
     self._clusters = []
     self._next_cluster_id = 1
 
+  def snapshot(self) -> dict:
+    """JSON-совместимый снимок сессии (кластеры вместе с discord_message_id) для восстановления после перезапуска."""
+    clusters = []
+    for cluster in self._clusters:
+      data = asdict(cluster)
+      data["voters"] = sorted(cluster.voters)
+      clusters.append(data)
+    return {
+      "map_name": self._map_name,
+      "last_round_number": self._last_round_number,
+      "last_event_unix": self._last_event_unix,
+      "next_cluster_id": self._next_cluster_id,
+      "clusters": clusters,
+    }
+
+  def restore(self, data: dict) -> bool:
+    """Восстанавливает сессию из snapshot(); при несовместимом снимке оставляет пустую сессию."""
+    self.reset()
+    if not isinstance(data, dict) or not _safe_str(data.get("map_name")).strip():
+      return False
+
+    names = {item.name for item in fields(MomentCluster)}
+    try:
+      clusters = []
+      for raw in data.get("clusters") or []:
+        cluster = MomentCluster(**{key: value for key, value in raw.items() if key in names})
+        cluster.voters = set(cluster.voters)
+        cluster.voter_names = list(cluster.voter_names)
+        clusters.append(cluster)
+    except (TypeError, AttributeError):
+      return False
+
+    self._map_name = _safe_str(data.get("map_name")).strip()
+    self._map_norm_name = normalize_map_name_for_match(self._map_name)
+    self._last_round_number = max(0, _safe_int(data.get("last_round_number"), 0))
+    self._last_event_unix = max(0, _safe_int(data.get("last_event_unix"), 0))
+    self._clusters = clusters
+    self._next_cluster_id = max(
+      _safe_int(data.get("next_cluster_id"), 1),
+      max((cluster.cluster_id for cluster in clusters), default=0) + 1,
+    )
+    return True
+
   def touch_info(self, map_name: str, round_number: int, event_unix: Optional[int] = None) -> bool:
     now = int(event_unix or time.time())
     map_name = _safe_str(map_name).strip()
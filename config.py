@@ -98,6 +98,22 @@ DB_PORT = 3306  # Порт базы данных, по дефолту MySQL = 33
 DB_USER = ''  # Имя пользователя базы данных
 DB_PASSWORD = ''  # Пароль пользователя базы данных
 DB_NAME = ''  # Имя базы данных
+DB_BACKEND = 'mysql'  # 'mysql' или 'sqlite' — локальная замена MySQL для разработки и бенчмарков
+DB_SQLITE_PATH = 'local.sqlite3'  # файл базы при DB_BACKEND = 'sqlite'
+DB_BREAKER_FAILURE_THRESHOLD = 3  # сбоев подряд до открытия автомата MySQL (запросы сразу отклоняются)
+DB_BREAKER_RESET_SEC = 15  # через сколько секунд пропустить пробный запрос
+DB_POOL_MINSIZE = 1  # соединений в пуле MySQL всегда открыто
+DB_POOL_MAXSIZE = 10  # верхняя граница пула под нагрузкой
+DB_POOL_RECYCLE_SEC = 300  # соединения, простаивавшие дольше, закрываются (пул сжимается обратно к минимуму)
+USERS_FULL_SYNC_EVERY = 12  # полный пересбор кеша ассоциаций раз в N циклов (остальные — delta по updated_at)
+DB_AUTO_MIGRATE = True  # применять data_server/migrations/*.sql при старте
+DB_SLOW_QUERY_MS = 200  # запросы дольше N мс пишутся в лог (шаблон без параметров); 0 — выключено
+# Переопределение лимитов областей кеша (observer/cache_manager.py): имя -> maxsize / ttl / negative_ttl (сек)
+# пример: {'check_steam': {'maxsize': 256, 'ttl': 300, 'negative_ttl': 60}}
+CACHE_REGIONS = {}
+STARTUP_WARMUP_TIMEOUT_SEC = 30  # сколько ждать подключения к MySQL/Redis и прогрева кешей до входа в Discord; дальше — в фоне
+DISPLAY_NAME_FLUSH_MS = 500  # write-behind: сброс имён участников не реже, чем раз в N мс
+DISPLAY_NAME_FLUSH_ROWS = 200  # ... или сразу, когда накопилось столько участников
 
 
 # Порт веб-сервера, на котором будет работать приложение
@@ -108,3 +124,18 @@ WEB_ALLOWED_IPS = ['111.111.11.11']
 # redis (универсальные значения)
 REDIS_HOST = '127.0.0.1'
 REDIS_PORT = 6379
+REDIS_HEARTBEAT_SEC = 5  # фоновый PING: обрыв замечается не позже чем через N сек, без PING перед каждой командой
+REDIS_LAST_PLAYERS_LIMIT = 5000  # сколько последних игроков хранить для автодополнения /ban_offline
+REDIS_AUTOCOMPLETE_SCAN_PAGES = 10  # предел запросов ZSCAN при поиске подстроки в автодополнении (по 200 элементов)
+REDIS_CHECK_STEAM_TTL = 600  # второй уровень кеша CheckSteam: сколько сек Redis помнит найденную связь Steam -> Discord
+REDIS_CHECK_STEAM_NEGATIVE_TTL = 60  # ... и ответ «не зарегистрирован»
+REDIS_CACHE_CHANNEL = 'cache:invalidate'  # канал шины инвалидации кешей между процессами бота ('' — выключена)
+REDIS_CACHE_BUS_CHECK_SEC = 30  # как часто сверять номер последнего сообщения шины со счётчиком в Redis
+CHAT_RELAY_STREAM = ''  # поток Redis для чата CS -> Discord (например 'chat:relay'; '' — только буфер в памяти бота)
+CHAT_RELAY_MAXLEN = 10000  # примерная длина потока: старые сообщения вытесняются
+CHAT_RELAY_CLAIM_IDLE_SEC = 30  # через сколько сек неподтверждённые сообщения другого процесса забирает резервный
+
+# Журнал событий Observer для replay/нагрузочных тестов (пусто = выключен)
+EVENT_JOURNAL_PATH = ''  # пример: 'logs/events.jsonl'
+EVENT_JOURNAL_MAX_MB = 50  # размер одного файла до ротации
+EVENT_JOURNAL_BACKUPS = 3  # сколько ротированных файлов хранить
@@ -1,7 +1,9 @@
 from observer.observer_client import logger, observer, Event, Param, Color, nsroute
 from cs_server.csrcon import CSRCON, ConnectionError as CSConnectionError, CommandExecutionError
+from bot.outbound import Priority, outbound
 
 import discord
+import functools
 import asyncio
 import time
 from typing import List
@@ -54,6 +56,7 @@ def _validate_rcon_response(command: str, response: str) -> None:
 # -- @require_connection
 def require_connection(func) -> callable:
 
+  @functools.wraps(func)
   async def wrapper(*args, **kwargs) -> callable:
     if cs_server.connected:
       return await func(*args, **kwargs)
@@ -313,7 +316,7 @@ async def cmd_kick(data):
     logger.info(f"CS Server: {caller_name} кикнул игрока {target} по причине {reason}")
 
     snd = f"```ansi\n{Color.Blue}{caller_name}{Color.Default} кикнул игрока: {Color.Blue}{target}{Color.Default} по причине: {reason}```"
-    await interaction.channel.send(content=snd)
+    await outbound.send(interaction.channel, content=snd, priority=Priority.MODERATION)
     await interaction.delete_original_response()
   except CommandExecutionError as err:
     logger.error(f"CS Server: {err}")
@@ -339,7 +342,7 @@ async def cmd_ban(data):
     logger.info(f"CS Server: {caller_name} забанил игрока {target} на {minutes} минут по причине {reason}")
 
     snd = f"```ansi\n{Color.Blue}{caller_name}{Color.Default} забанил игрока: {Color.Blue}{target}{Color.Default} на {minutes} минут по причине: {reason}```"
-    await interaction.channel.send(content=snd)
+    await outbound.send(interaction.channel, content=snd, priority=Priority.MODERATION)
     await interaction.delete_original_response()
   except CommandExecutionError as err:
     logger.error(f"CS Server: {err}")
@@ -365,7 +368,7 @@ async def cmd_ban_offline(data):
     logger.info(f"CS Server: {caller_name} забанил игрока {target} на {minutes} минут по причине {reason}")
 
     snd = f"```ansi\n{Color.Blue}{caller_name}{Color.Default} забанил игрока: {Color.Blue}{target}{Color.Default} на {minutes} минут по причине: {reason}```"
-    await interaction.channel.send(content=snd)
+    await outbound.send(interaction.channel, content=snd, priority=Priority.MODERATION)
     await interaction.delete_original_response()
   except CommandExecutionError as err:
     logger.error(f"CS Server: {err}")
@@ -387,7 +390,7 @@ async def cmd_unban(data):
     logger.info(f"CS Server: {caller_name} разбанил игрока {target}")
 
     snd = f"```ansi\n{Color.Blue}{caller_name}{Color.Default} разбанил игрока: {Color.Blue}{target}{Color.Default}```"
-    await interaction.channel.send(content=snd)
+    await outbound.send(interaction.channel, content=snd, priority=Priority.MODERATION)
     await interaction.delete_original_response()
   except CommandExecutionError as err:
     logger.error(f"CS Server: {err}")
@@ -459,7 +462,7 @@ async def cmd_map_change(data):
     logger.info(f"CS Server: {caller_name} сменил карту на {mapname}")
 
     snd = f"```ansi\n{Color.Blue}{caller_name}{Color.Default} сменил карту на {Color.Blue}{mapname}{Color.Default}```"
-    await interaction.channel.send(content=snd)
+    await outbound.send(interaction.channel, content=snd, priority=Priority.MODERATION)
     await interaction.delete_original_response()
   except CommandExecutionError as err:
     logger.error(f"CS Server: {err}")
@@ -467,7 +470,13 @@ async def cmd_map_change(data):
 
 # !SECTION
 
-@nsroute.create_route("/cs/reload_map_list")
+@nsroute.create_route(
+  "/cs/reload_map_list",
+  timeout=10.0,
+  failure_threshold=3,
+  reset_timeout=30,
+  fallback={"status": "error", "error": "route_unavailable"},
+)
 async def route_cs_reload_map_list():
   if not cs_server.connected:
     return {"status": "not_connected"}
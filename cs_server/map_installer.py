@@ -7,6 +7,7 @@ import discord
 
 import config
 from bot.bot_server import dbot
+from bot.outbound import Priority, outbound
 from cs_server.map_deploy_service import (
   DeployResult,
   deploy_map_from_payload,
@@ -65,7 +66,7 @@ async def _send_background_response(interaction: discord.Interaction, text: str)
   mention = interaction.user.mention if interaction.user else ""
   prefix = f"{mention}\n" if mention else ""
   try:
-    await channel.send(f"{prefix}{text}")
+    await outbound.send(channel, f"{prefix}{text}", priority=Priority.MODERATION)
   except Exception as err:
     logger.error(f"Map installer: не удалось отправить background-результат в канал: {err}")
 
@@ -2,7 +2,13 @@ import aiomysql
 from typing import Any, List, Optional, Tuple, Dict, AsyncIterator, Iterator, Callable
 import logging
 import asyncio
-from observer.observer_client import logger
+import re
+import time
+import weakref
+from contextlib import asynccontextmanager
+from observer.circuit_breaker import BREAKER_STATE_VALUES, BreakerState, CircuitBreaker
+from observer.observer_client import logger, metrics
+from data_server.query_stats import QuerySample, QueryStats, normalize_query
 
 # SECTION AioMysqlError
 class AioMysqlError(Exception):
@@ -19,6 +25,11 @@ class QueryError(AioMysqlError):
   """Исключение для ошибок выполнения SQL-запросов."""
   pass
 
+# -- CircuitOpenError
+class CircuitOpenError(QueryError, ConnectionError):
+  """Запрос отклонён без обращения к БД: автомат MySQL открыт."""
+  pass
+
 # -- MultipleQueryError
 class MultipleQueryError(AioMysqlError):
   """Исключение для ошибок выполнения нескольких SQL-запросов."""
@@ -31,10 +42,38 @@ class TransactionError(AioMysqlError):
 
 # !SECTION
 
+# Имя колонки, которое можно безопасно подставить в SQL (fetch_keyset)
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# -- describe_query
+def describe_query(template: str, args: Any) -> str:
+  """Текст запроса для исключений: шаблон без значений и число параметров (значения не логируются)."""
+  return f"Запрос: {template}, параметров: {len(args or ())}"
+
+# -- describe_batch
+def describe_batch(template: str, args_list: Any) -> str:
+  return f"Запрос: {template}, наборов параметров: {len(args_list or ())}"
+
 # SECTION AioMysql
 class AioMysql:
+  dialect: str = "mysql"
+
   # -- __init__()
-  def __init__(self, host: str, port: int, user: str, password: str, db: str) -> None:
+  def __init__(
+    self,
+    host: str,
+    port: int,
+    user: str,
+    password: str,
+    db: str,
+    *,
+    failure_threshold: int = 3,
+    reset_timeout: float = 15.0,
+    minsize: int = 1,
+    maxsize: int = 10,
+    pool_recycle: int = 300,
+    slow_query_ms: float = 200.0,
+  ) -> None:
     self.host: str = host
     self.port: int = port
     self.user: str = user
@@ -49,19 +88,97 @@ class AioMysql:
     self._is_healthy: bool = False
     self._monitoring_task: Optional[asyncio.Task] = None
     self._monitor_interval: int = 30  # Interval in seconds for monitoring
-    
+    # Пул растёт под нагрузкой до maxsize; соединения, простоявшие дольше pool_recycle, закрываются при следующем acquire
+    self.minsize: int = max(0, int(minsize))
+    self.maxsize: int = max(1, self.minsize, int(maxsize))
+    self.pool_recycle: int = int(pool_recycle)
+    self._last_success: float = 0.0  # monotonic-время последнего успешного запроса
+    self._seen_connections: "weakref.WeakSet[aiomysql.Connection]" = weakref.WeakSet()
+    self._connections_opened: int = 0
+    self._queries_served: int = 0
+    # Автомат: после failure_threshold сбоев запросы сразу получают CircuitOpenError,
+    # через reset_timeout пропускается один пробный запрос (half-open)
+    self.breaker: CircuitBreaker = CircuitBreaker(
+      "mysql",
+      failure_threshold=failure_threshold,
+      reset_timeout=reset_timeout,
+      on_transition=self._on_breaker_transition,
+    )
+    metrics.set_gauge("mysql_breaker_state", BREAKER_STATE_VALUES[BreakerState.CLOSED])
+    # Время, строки и повторы по шаблонам запросов; медленные (>= slow_query_ms) пишутся в лог
+    self.stats: QueryStats = QueryStats("mysql", slow_ms=slow_query_ms)
+
   # -- is_connected
   def is_connected(self) -> bool:
     """Проверяет, существует ли соединение с базой данных и оно здорово."""
-    return self.pool is not None and not self.pool.closed and self._is_healthy
+    return self.pool is not None and not self.pool.closed and self._is_healthy and self.breaker.state is not BreakerState.OPEN
+
+  # -- _on_breaker_transition()
+  def _on_breaker_transition(self, breaker: CircuitBreaker, old: BreakerState, new: BreakerState) -> None:
+    metrics.set_gauge("mysql_breaker_state", BREAKER_STATE_VALUES[new])
+    metrics.inc("mysql_breaker_transitions_total", to=new.value)
+    if new is BreakerState.OPEN:
+      logger.warning(f"AioMysql: circuit breaker {old.value} -> open, запросы отклоняются {breaker.reset_timeout:.0f}s")
+    else:
+      logger.info(f"AioMysql: circuit breaker {old.value} -> {new.value}")
+
+  # -- _reject()
+  def _reject(self, operation: str) -> CircuitOpenError:
+    metrics.inc("mysql_fail_fast_total")
+    return CircuitOpenError(f"AioMysql: MySQL недоступен (circuit {self.breaker.state.value}), {operation} отклонён")
+
+  # -- _acquire()
+  @asynccontextmanager
+  async def _acquire(self) -> AsyncIterator[aiomysql.Connection]:
+    """pool.acquire() с телеметрией: ожидание соединения, занятость пула, новые соединения."""
+    started = time.perf_counter()
+    conn = await self.pool.acquire()
+    metrics.observe("mysql_pool_acquire_seconds", time.perf_counter() - started)
+
+    if conn not in self._seen_connections:
+      self._seen_connections.add(conn)
+      self._connections_opened += 1
+      metrics.inc("mysql_pool_connections_opened_total")
+    self._queries_served += 1
+    self._report_pool()
+
+    try:
+      yield conn
+    finally:
+      await self.pool.release(conn)
+      self._report_pool()
+
+  # -- _report_pool()
+  def _report_pool(self) -> None:
+    pool = self.pool
+    if pool is None:
+      return
+    metrics.set_gauge("mysql_pool_size", pool.size)
+    metrics.set_gauge("mysql_pool_idle", pool.freesize)
+    metrics.set_gauge("mysql_pool_in_use", pool.size - pool.freesize)
+    metrics.set_gauge("mysql_pool_max", pool.maxsize)
+    if self._connections_opened:
+      metrics.set_gauge("mysql_pool_queries_per_connection", round(self._queries_served / self._connections_opened, 2))
+
+  # -- _mark_success()
+  def _mark_success(self) -> None:
+    self._is_healthy = True
+    self._last_success = time.monotonic()
+    self.breaker.record_success()
 
   # -- _monitor_connection_loop()
   async def _monitor_connection_loop(self) -> None:
     """Periodically checks connection health and attempts to restore if unhealthy."""
     while True:
       await asyncio.sleep(self._monitor_interval)
+      self._report_pool()
+      # Недавний успешный запрос уже подтвердил соединение — отдельный SELECT 1 не нужен
+      if self._is_healthy and (time.monotonic() - self._last_success) < self._monitor_interval:
+        metrics.inc("mysql_health_checks_total", result="skipped")
+        continue
       # check_connection will update _is_healthy
       is_currently_healthy = await self.check_connection() 
+      metrics.inc("mysql_health_checks_total", result="ok" if is_currently_healthy else "failed")
       if not is_currently_healthy:
         logger.warning("AioMysql: Monitoring detected unhealthy connection. Attempting to restore...")
         try:
@@ -114,29 +231,32 @@ class AioMysql:
           password=self.password,
           db=self.db,
           autocommit=True,  # Автоматический коммит для операций
-          maxsize=10,  # Максимальное количество соединений в пуле
-          minsize=1,  # Минимальное количество соединений в пуле
+          maxsize=self.maxsize,  # Максимальное количество соединений в пуле
+          minsize=self.minsize,  # Минимальное количество соединений в пуле
+          pool_recycle=self.pool_recycle,
           loop=asyncio.get_event_loop()
         )
         
         # Проверка соединения
-        async with self.pool.acquire() as conn:
+        async with self._acquire() as conn:
           async with conn.cursor() as cursor:
             await cursor.execute('SELECT 1')  # Простой запрос для проверки
         
-        self._is_healthy = True
         self._connecting = False
+        self._mark_success()
         self._start_monitoring_task() # Start monitoring after successful connection
         return
         
       except aiomysql.Error as e:
         self._is_healthy = False # Ensure unhealthy on connect failure
+        self.breaker.trip()
         self._connection_attempts += 1
         wait_time = min(60, self._reconnect_backoff_time * (2 ** (self._connection_attempts - 1)))  # Exponential backoff
         logger.error(f"Ошибка при подключении к MySQL ({self._connection_attempts}/{self._max_reconnect_attempts}): {e}. Повторная попытка через {wait_time} сек.")
         await asyncio.sleep(wait_time)
       except Exception as e:
         self._is_healthy = False # Ensure unhealthy on connect failure
+        self.breaker.trip()
         logger.error(f"Неожиданная ошибка при подключении к MySQL: {e}")
         self._connection_attempts += 1
         await asyncio.sleep(self._reconnect_backoff_time)
@@ -148,7 +268,7 @@ class AioMysql:
     
   # -- _execute_one_internal
   async def _execute_one_internal(self, query: str, args: Optional[Tuple[Any, ...]] = ()) -> Tuple[int, Optional[List[Tuple[Any, ...]]]]:
-    async with self.pool.acquire() as conn:
+    async with self._acquire() as conn:
       async with conn.cursor() as cursor:
         await cursor.execute(query, args)
         affected_rows = cursor.rowcount  # Получаем количество затронутых строк
@@ -163,16 +283,21 @@ class AioMysql:
   # -- execute_one()
   async def execute_one(self, query: str, args: Optional[Tuple[Any, ...]] = ()) -> Tuple[int, Optional[List[Tuple[Any, ...]]]]:
     """Выполняет SQL-запрос и возвращает количество затронутых строк и результат."""
-    try:
-      return await self.execute_with_retry(self._execute_one_internal, query, args)
-    except aiomysql.Error as e:
-      raise QueryError(f"Ошибка при выполнении запроса: {e}. Запрос: {query}, Параметры: {args}")
-    except Exception as e:
-      raise QueryError(f"Неожиданная ошибка: {e}. Запрос: {query}, Параметры: {args}")
+    with self.stats.measure("one", query) as sample:
+      try:
+        affected_rows, result = await self._retry(self._execute_one_internal, (query, args), sample=sample)
+      except CircuitOpenError:
+        raise
+      except aiomysql.Error as e:
+        raise QueryError(f"Ошибка при выполнении запроса: {e}. {describe_query(sample.template, args)}") from e
+      except Exception as e:
+        raise QueryError(f"Неожиданная ошибка: {e}. {describe_query(sample.template, args)}") from e
+      sample.rows = len(result) if result is not None else affected_rows
+      return affected_rows, result
 
   # -- _execute_change_internal
   async def _execute_change_internal(self, query: str, args: Optional[Tuple[Any, ...]] = ()) -> int:
-    async with self.pool.acquire() as conn:
+    async with self._acquire() as conn:
       async with conn.cursor() as cursor:
         await cursor.execute(query, args)
         affected_rows = cursor.rowcount
@@ -182,12 +307,16 @@ class AioMysql:
   # -- execute_change()
   async def execute_change(self, query: str, args: Optional[Tuple[Any, ...]] = ()) -> int:
     """Выполняет SQL-запрос, изменяющий данные, и возвращает количество затронутых строк."""
-    try:
-      return await self.execute_with_retry(self._execute_change_internal, query, args)
-    except aiomysql.Error as e:
-      raise QueryError(f"Ошибка при выполнении запроса: {e}. Запрос: {query}, Параметры: {args}")
-    except Exception as e:
-      raise QueryError(f"Неожиданная ошибка: {e}. Запрос: {query}, Параметры: {args}")
+    with self.stats.measure("change", query) as sample:
+      try:
+        sample.rows = await self._retry(self._execute_change_internal, (query, args), sample=sample)
+      except CircuitOpenError:
+        raise
+      except aiomysql.Error as e:
+        raise QueryError(f"Ошибка при выполнении запроса: {e}. {describe_query(sample.template, args)}") from e
+      except Exception as e:
+        raise QueryError(f"Неожиданная ошибка: {e}. {describe_query(sample.template, args)}") from e
+      return sample.rows
 
   # -- check_connection
   async def check_connection(self) -> bool:
@@ -195,64 +324,70 @@ class AioMysql:
     if not self.pool or self.pool.closed:
         logger.warning("AioMysql: Connection check failed - pool is None or closed.")
         self._is_healthy = False
+        self.breaker.trip()
         return False
     try:
-        async with self.pool.acquire() as conn:
+        async with self._acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute('SELECT 1')
-        self._is_healthy = True
+        self._mark_success()
         return True
     except Exception as e:
         logger.warning(f"AioMysql: Connection check failed: {e}")
         self._is_healthy = False
+        self.breaker.trip()
         # Do not try to connect here, let the monitor loop do it
         return False
 
   # -- execute_with_retry
   async def execute_with_retry(self, func: Callable, *args, **kwargs) -> Any:
-    """Executes a function with retries, considering connection health."""
+    """Executes a function with retries, guarded by the MySQL circuit breaker.
+
+    While the breaker is open the call fails immediately with CircuitOpenError
+    instead of waiting for the monitor task to recover the connection.
+    """
+    return await self._retry(func, args, kwargs)
+
+  # -- _retry
+  async def _retry(self, func: Callable, args: tuple, kwargs: Optional[dict] = None, sample: Optional[QuerySample] = None) -> Any:
+    kwargs = kwargs or {}
     max_retries = 3 # Retries for a specific operation, not for overall connection health
     retry_delay = 1 # seconds
 
     for attempt in range(max_retries):
-        if not self._is_healthy:
-            # If connection is not healthy, wait for the monitoring task to potentially recover
-            wait_duration = self._monitor_interval / 2 if self._monitor_interval > 2 else 1
-            logger.warning(
-                f"AioMysql: Connection unhealthy for {func.__name__}. "
-                f"Waiting up to {wait_duration}s for recovery before attempt {attempt + 1}/{max_retries}."
-            )
-            await asyncio.sleep(wait_duration) 
-            
-            # Re-check health after waiting. The monitor might have fixed it.
-            # Or, if an operation just failed and marked it unhealthy, this gives monitor a chance.
-            await self.check_connection() 
-            if not self._is_healthy:
-                if attempt == max_retries - 1:
-                    logger.error(f"AioMysql: Connection persistently unhealthy after {max_retries} checks for {func.__name__}.")
-                    raise ConnectionError(f"AioMysql: Connection persistently unhealthy after {max_retries} checks for {func.__name__}.")
-                logger.warning(f"AioMysql: Still unhealthy before attempt {attempt + 1}, retrying operation for {func.__name__}.")
-                continue # Go to next attempt if still not healthy
+        if not self.breaker.allow():
+            raise self._reject(func.__name__)
+
+        if not self.pool or self.pool.closed:
+            self._is_healthy = False
+            self.breaker.record_failure()
+            raise ConnectionError(f"AioMysql: Pool is not initialized for {func.__name__}.")
 
         try:
-            return await func(*args, **kwargs)
+            result = await func(*args, **kwargs)
         except (aiomysql.OperationalError, aiomysql.InterfaceError) as e:
             logger.error(f"AioMysql: Connection error during {func.__name__}: {e}. Attempt {attempt + 1}/{max_retries}.")
             self._is_healthy = False # Mark as unhealthy, monitor should pick it up
-            # Potentially trigger an immediate check/reconnect by monitor if possible,
-            # otherwise, wait for its natural cycle.
-            if attempt == max_retries - 1:
-                logger.error(f"AioMysql: Failed {func.__name__} after {max_retries} retries due to: {e}")
-                raise ConnectionError(f"AioMysql: Failed {func.__name__} after {max_retries} retries due to: {e}")
+            self.breaker.record_failure()
+            if attempt == max_retries - 1 or self.breaker.state is BreakerState.OPEN:
+                logger.error(f"AioMysql: Failed {func.__name__} after {attempt + 1} attempts due to: {e}")
+                raise ConnectionError(f"AioMysql: Failed {func.__name__} after {attempt + 1} attempts due to: {e}")
             await asyncio.sleep(retry_delay * (attempt + 1)) # Linear backoff for operation retry
+            if sample is not None:
+                sample.retries += 1
+            continue
         except Exception as e:
-            # Non-connection related errors
+            # Non-connection related errors: соединение живо, автомат их не считает
+            self.breaker.record_success()
             logger.error(f"AioMysql: Non-connection error during {func.__name__}: {e}")
             raise # Re-raise original error
 
+        self._mark_success()
+        return result
+
   # -- _execute_select_internal
   async def _execute_select_internal(self, query: str, args: Optional[Tuple[Any, ...]] = ()) -> List[Tuple[Any, ...]]:
-    async with self.pool.acquire() as conn:
+    async with self._acquire() as conn:
       async with conn.cursor() as cursor:
         await cursor.execute(query, args)
         result = await cursor.fetchall()  # Получаем результат
@@ -261,53 +396,60 @@ class AioMysql:
   # -- execute_select()
   async def execute_select(self, query: str, args: Optional[Tuple[Any, ...]] = ()) -> List[Tuple[Any, ...]]:
     """Выполняет SQL-запрос на выборку данных и возвращает результат."""
-    try:
-      return await self.execute_with_retry(self._execute_select_internal, query, args)
-    except aiomysql.Error as e:
-      raise QueryError(f"Ошибка при выполнении запроса: {e}. Запрос: {query}, Параметры: {args}")
-    except Exception as e:
-      raise QueryError(f"Неожиданная ошибка: {e}. Запрос: {query}, Параметры: {args}")
+    with self.stats.measure("select", query) as sample:
+      try:
+        result = await self._retry(self._execute_select_internal, (query, args), sample=sample)
+      except CircuitOpenError:
+        raise
+      except aiomysql.Error as e:
+        raise QueryError(f"Ошибка при выполнении запроса: {e}. {describe_query(sample.template, args)}") from e
+      except Exception as e:
+        raise QueryError(f"Неожиданная ошибка: {e}. {describe_query(sample.template, args)}") from e
+      sample.rows = len(result)
+      return result
 
 
   # -- _exec_many_internal
   async def _exec_many_internal(self, query: str, args_list: List[Tuple[Any, ...]]) -> None:
-    async with self.pool.acquire() as conn:
-      async with conn.cursor() as cursor:
-        await cursor.executemany(query, args_list)
+    async with self._acquire() as conn:
+      # Пул работает в autocommit: явная транзакция делает пакет атомарным и экономит коммит на каждую строку
+      await conn.begin()
+      try:
+        async with conn.cursor() as cursor:
+          await cursor.executemany(query, args_list)
         await conn.commit()
+      except BaseException:
+        await conn.rollback()
+        raise
   
   # -- exec_many()
   async def exec_many(self, query: str, args_list: List[Tuple[Any, ...]]) -> None:
     """Выполняет один и тот же SQL-запрос несколько раз с разными наборами параметров."""
-    try:
-      return await self.execute_with_retry(self._exec_many_internal, query, args_list)
-    except aiomysql.Error as e:
-      raise MultipleQueryError(f"Ошибка при выполнении нескольких запросов: {e}. Запрос: {query}, Параметры: {args_list}")
-    except Exception as e:
-      raise MultipleQueryError(f"Неожиданная ошибка: {e}. Запрос: {query}, Параметры: {args_list}")
+    with self.stats.measure("many", query) as sample:
+      try:
+        await self._retry(self._exec_many_internal, (query, args_list), sample=sample)
+      except CircuitOpenError:
+        raise
+      except aiomysql.Error as e:
+        raise MultipleQueryError(f"Ошибка при выполнении нескольких запросов: {e}. {describe_batch(sample.template, args_list)}") from e
+      except Exception as e:
+        raise MultipleQueryError(f"Неожиданная ошибка: {e}. {describe_batch(sample.template, args_list)}") from e
+      sample.rows = len(args_list)
 
   # -- fetch_iter()
   async def fetch_iter(self, query: str, *, args: Optional[Tuple[Any, ...]] = (), batch_size: int = 100) -> AsyncIterator[Tuple[Any, ...]]:
     """Асинхронный итератор для выборки данных по частям."""
     # The execute_with_retry logic is complex for true async iterators.
-    # A simpler approach for iterators is to ensure connection is healthy at start,
-    # and rely on the monitor for long-term health. Short-lived errors might still break iteration.
-    # For robust iteration over flaky connections, a more complex iterator wrapper would be needed.
-    
-    # Initial health check
-    if not self._is_healthy:
-        logger.warning(f"AioMysql: Connection unhealthy before starting fetch_iter for query: {query[:100]}...")
-        await self.check_connection() # Attempt a quick check
-        if not self._is_healthy:
-             # Try to wait for monitor to recover
-            logger.warning(f"AioMysql: Waiting for monitor to recover before fetch_iter for query: {query[:100]}...")
-            await asyncio.sleep(self._monitor_interval / 2 if self._monitor_interval > 2 else 1)
-            await self.check_connection() # Final check
-            if not self._is_healthy:
-                raise ConnectionError(f"AioMysql: Connection unhealthy, cannot start fetch_iter for query: {query[:100]}...")
+    # The breaker is checked once at start; short-lived errors might still break iteration.
+    # Для больших выгрузок, переживающих обрыв соединения, используйте fetch_keyset().
+    if not self.breaker.allow():
+        raise self._reject("fetch_iter")
+    if not self.pool or self.pool.closed:
+        self.breaker.record_failure()
+        raise ConnectionError(f"AioMysql: Connection unhealthy, cannot start fetch_iter for query: {query[:100]}...")
 
     try:
-      async with self.pool.acquire() as conn:
+      async with self._acquire() as conn:
         async with conn.cursor() as cursor:
           await cursor.execute(query, args)
           while True:
@@ -316,17 +458,71 @@ class AioMysql:
               break
             for row in rows:
               yield row
+      self._mark_success()
     except (aiomysql.OperationalError, aiomysql.InterfaceError) as e:
       self._is_healthy = False # Mark as unhealthy
+      self.breaker.record_failure()
       logger.error(f"AioMysql: Connection error during fetch_iter: {e}. Query: {query[:100]}...")
       # Iteration is likely broken. Rely on monitor for future, but this op fails.
-      raise QueryError(f"Ошибка при выборке данных (Operational/Interface Error): {e}. Запрос: {query}, Параметры: {args}")
+      raise QueryError(f"Ошибка при выборке данных (Operational/Interface Error): {e}. Запрос: {normalize_query(query)}") from e
     except aiomysql.Error as e:
       # Other aiomysql errors
-      raise QueryError(f"Ошибка при выборке данных: {e}. Запрос: {query}, Параметры: {args}")
+      raise QueryError(f"Ошибка при выборке данных: {e}. Запрос: {normalize_query(query)}") from e
     except Exception as e:
       # Other unexpected errors
-      raise QueryError(f"Неожиданная ошибка: {e}. Запрос: {query}, Параметры: {args}")
+      raise QueryError(f"Неожиданная ошибка: {e}. Запрос: {normalize_query(query)}") from e
+
+  # -- fetch_keyset()
+  async def fetch_keyset(
+    self,
+    query: str,
+    key_column: str,
+    *,
+    args: Optional[Tuple[Any, ...]] = (),
+    batch_size: int = 500,
+    start_after: Any = None,
+  ) -> AsyncIterator[Tuple[Any, ...]]:
+    """Постраничная выборка по ключу (keyset pagination) без удержания соединения между страницами.
+
+    Каждая страница — отдельный execute_select (retry + автомат), поэтому обрыв соединения
+    посреди выборки не теряет позицию: следующая попытка продолжает с последнего ключа.
+
+    Args:
+      query (str): SELECT без ORDER BY/LIMIT; должен возвращать колонку key_column.
+      key_column (str): Уникальная упорядоченная колонка (желательно с индексом).
+      start_after: Продолжить после этого значения ключа (например, после прерванной выгрузки).
+    """
+    if not _IDENTIFIER.match(key_column):
+      raise ValueError(f"AioMysql: недопустимое имя колонки для keyset: {key_column!r}")
+
+    batch_size = max(1, int(batch_size))
+    # Ключ добавляется последней колонкой, чтобы знать его значение независимо от списка полей в query
+    page_query = (
+      f"SELECT keyset_src.*, keyset_src.{key_column} FROM ({query}) AS keyset_src "
+      "{where}"
+      f"ORDER BY keyset_src.{key_column} LIMIT %s"
+    )
+    first_page = page_query.format(where="")
+    next_page = page_query.format(where=f"WHERE keyset_src.{key_column} > %s ")
+
+    last_key = start_after
+    while True:
+      if last_key is None:
+        rows = await self.execute_select(first_page, tuple(args or ()) + (batch_size,))
+      else:
+        rows = await self.execute_select(next_page, tuple(args or ()) + (last_key, batch_size))
+
+      for row in rows:
+        yield tuple(row[:-1])
+
+      if len(rows) < batch_size:
+        return
+      last_key = rows[-1][-1]
+
+  # -- transaction()
+  def transaction(self) -> "Transaction":
+    """Транзакция на отдельном соединении пула (см. Transaction)."""
+    return Transaction(self.pool)
 
   # -- close()
   async def close(self) -> None:
@@ -395,7 +591,19 @@ class Transaction:
         result = await cursor.fetchall()  # Возвращаем результаты
         return affected_rows, result
     except aiomysql.Error as e:
-      raise TransactionError(f"Ошибка при выполнении запроса: {e}. Запрос: {query}, Параметры: {args}")
+      raise TransactionError(f"Ошибка при выполнении запроса: {e}. {describe_query(normalize_query(query), args)}")
+  
+  # -- execute_many()
+  async def execute_many(self, query: str, args_list: List[Tuple[Any, ...]]) -> int:
+    """Выполняет один запрос для каждого набора параметров в рамках текущей транзакции."""
+    if not self.conn:
+      raise TransactionError("Нет активной транзакции.")
+    try:
+      async with self.conn.cursor() as cursor:
+        await cursor.executemany(query, args_list)
+        return cursor.rowcount
+    except aiomysql.Error as e:
+      raise TransactionError(f"Ошибка при выполнении пакета запросов: {e}. {describe_batch(normalize_query(query), args_list)}")
   
   # -- commit()
   async def commit(self) -> None:
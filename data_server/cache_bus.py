@@ -0,0 +1,166 @@
+import asyncio
+import json
+import uuid
+from typing import Any, Dict, Iterable, Optional
+
+from observer.observer_client import Event, logger, metrics
+
+# Номер сообщения и публикация одним шагом: получатели видят номера строго по порядку, пропуск номера — потерянное сообщение
+PUBLISH_SCRIPT = """
+local version = redis.call('INCR', KEYS[1])
+redis.call('PUBLISH', ARGV[1], version .. '|' .. ARGV[2])
+return version
+"""
+
+
+# SECTION CacheBus
+class CacheBus:
+  """Шина инвалидации кешей между процессами бота через Redis pub/sub.
+
+  Локальные события events (например, DB_USER_CHANGED) публикуются в канал; другие процессы
+  повторяют их у себя с data["remote"] = True, и их подписчики сбрасывают свои кеши.
+  Сообщения нумеруются счётчиком "<канал>:version". Пропуск номера, отставание от счётчика
+  дольше check_interval или переподключение подписки означают потерянные сообщения:
+  тогда каждое событие рассылается локально с {"remote": True, "resync": True} — подписчики
+  сбрасывают области целиком.
+  """
+
+  def __init__(self, rc, observer, channel: str, events: Iterable[Event], *, check_interval: float = 30.0, retry_interval: float = 5.0) -> None:
+    self.rc = rc
+    self.observer = observer
+    self.channel: str = channel
+    self.version_key: str = f"{channel}:version"
+    self.events = tuple(events)
+    self.check_interval: float = check_interval
+    self.retry_interval: float = retry_interval
+    self.origin: str = uuid.uuid4().hex[:12]
+    self.last_version: Optional[int] = None
+    self._suspect: Optional[int] = None
+    self._task: Optional[asyncio.Task] = None
+
+    for event in self.events:
+      self.observer.subscribe(event)(self._publisher(event))
+
+  @property
+  def enabled(self) -> bool:
+    return bool(self.channel)
+
+  def _publisher(self, event: Event):
+    async def _publish(data: Optional[Dict[str, Any]] = None, *args, **kwargs) -> None:
+      await self.publish(event, data or {})
+
+    _publish.__qualname__ = f"cache_bus_publish:{event.value}"
+    return _publish
+
+  # -- publish()
+  async def publish(self, event: Event, data: Dict[str, Any]) -> Optional[int]:
+    """Публикует событие для других процессов; события, пришедшие из шины, не переотправляются."""
+    if not self.enabled or data.get("remote") or not self.rc.connected:
+      return None
+
+    payload = json.dumps({"o": self.origin, "e": event.value, "d": data}, ensure_ascii=False, default=str)
+    try:
+      version = int(await self.rc.eval_script(PUBLISH_SCRIPT, [self.version_key], [self.channel, payload]))
+    except Exception as err:
+      metrics.inc("cache_bus_publish_failures_total", event=event.value)
+      logger.warning(f"Redis: шина кешей: не удалось опубликовать {event.value}: {err}")
+      return None
+    metrics.inc("cache_bus_published_total", event=event.value)
+    return version
+
+  # -- handle()
+  async def handle(self, raw) -> None:
+    """Обрабатывает сообщение канала "<номер>|<json>"."""
+    text = raw.decode('utf-8') if isinstance(raw, bytes) else str(raw)
+    version_text, _, body = text.partition("|")
+    version = int(version_text)
+
+    gap = self.last_version is not None and version > self.last_version + 1
+    if self.last_version is None or version > self.last_version:
+      self.last_version = version
+    if gap:
+      await self.resync("gap")
+
+    message = json.loads(body)
+    if message.get("o") == self.origin:
+      return
+    metrics.inc("cache_bus_received_total", event=message["e"])
+    await self.observer.notify(Event(message["e"]), {**message.get("d", {}), "remote": True})
+
+  # -- resync()
+  async def resync(self, reason: str) -> None:
+    metrics.inc("cache_bus_resyncs_total", reason=reason)
+    logger.warning(f"Redis: шина кешей: возможны пропущенные сообщения ({reason}), кеши сбрасываются целиком")
+    for event in self.events:
+      await self.observer.notify(event, {"remote": True, "resync": True})
+
+  # -- check_version()
+  async def check_version(self, force: bool = False) -> None:
+    """Сверяет последний полученный номер со счётчиком в Redis.
+
+    Отставание, которое не исчезло к следующей проверке (или force — после переподключения), считается потерей.
+    """
+    remote = await self._remote_version()
+    last = self.last_version or 0
+    if remote <= last:
+      self._suspect = None
+      return
+    if force or (self._suspect is not None and last < self._suspect):
+      self.last_version = remote
+      self._suspect = None
+      await self.resync("reconnect" if force else "version")
+      return
+    self._suspect = remote
+
+  async def _remote_version(self) -> int:
+    value = await self.rc.value_get(self.version_key)
+    return int(value) if value else 0
+
+  # -- start()
+  def start(self) -> None:
+    if self.enabled and self._task is None:
+      self._task = asyncio.create_task(self._listen())
+
+  # -- stop()
+  async def stop(self) -> None:
+    if self._task is None:
+      return
+    self._task.cancel()
+    try:
+      await self._task
+    except asyncio.CancelledError:
+      pass
+    self._task = None
+
+  async def _listen(self) -> None:
+    while True:
+      pubsub = None
+      try:
+        pubsub = self.rc.pubsub()
+        await pubsub.subscribe(self.channel)
+        if self.last_version is None:
+          self.last_version = await self._remote_version()
+        else:
+          # Пока подписки не было, сообщения могли уйти мимо
+          await self.check_version(force=True)
+        logger.info(f"Redis: шина кешей: подписка на {self.channel} (процесс {self.origin})")
+
+        while True:
+          message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=self.check_interval)
+          if message is None:
+            await self.check_version()
+          elif message.get("type") == "message":
+            await self.handle(message["data"])
+      except asyncio.CancelledError:
+        raise
+      except Exception as err:
+        logger.warning(f"Redis: шина кешей: {err}; повтор через {self.retry_interval} сек")
+        await asyncio.sleep(self.retry_interval)
+      finally:
+        if pubsub is not None:
+          try:
+            await pubsub.aclose()
+          except Exception:
+            pass
+
+# !SECTION
@@ -0,0 +1,168 @@
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from observer.observer_client import logger, metrics
+
+# Те же символы, что оставляет sanitize_name при установке карт (cs_server/map_deploy_service.py)
+MAP_NAME_RE = re.compile(r"^[A-Za-z0-9_\-]{1,64}$")
+MAX_IMPORT_BYTES = 256 * 1024
+CSV_FIELDS = ("map_name", "activated", "min_players", "max_players", "priority")
+
+INSERT_MAP_QUERY = "INSERT INTO maps (map_name, activated, min_players, max_players, priority) VALUES (%s, %s, %s, %s, %s)"
+
+
+# -- MapImportRow
+@dataclass
+class MapImportRow:
+  map_name: str
+  activated: int = 1
+  min_players: int = 0
+  max_players: int = 32
+  priority: int = 100
+
+  def as_tuple(self) -> Tuple[str, int, int, int, int]:
+    return (self.map_name, self.activated, self.min_players, self.max_players, self.priority)
+
+
+# -- MapImportReport
+@dataclass
+class MapImportReport:
+  inserted: List[str] = field(default_factory=list)
+  skipped: List[str] = field(default_factory=list)  # уже есть в БД или повтор в файле
+  invalid: List[Tuple[int, str]] = field(default_factory=list)  # (номер строки, причина)
+
+  # -- summary()
+  def summary(self, limit: int = 10) -> str:
+    lines = [f"Добавлено: {len(self.inserted)}, пропущено (уже есть): {len(self.skipped)}, с ошибками: {len(self.invalid)}"]
+    if self.invalid:
+      lines.append("Ошибки:")
+      lines.extend(f"• строка {line_no}: {reason}" for line_no, reason in self.invalid[:limit])
+      if len(self.invalid) > limit:
+        lines.append(f"• ... и ещё {len(self.invalid) - limit}")
+    return "\n".join(lines)
+
+
+def _strip_comment(line: str) -> str:
+  for marker in ("//", "#"):
+    position = line.find(marker)
+    if position != -1:
+      line = line[:position]
+  return line.strip()
+
+
+def _parse_int(value: str, name: str, default: int) -> int:
+  value = value.strip()
+  if not value:
+    return default
+  try:
+    return int(value)
+  except ValueError:
+    raise ValueError(f"{name} должно быть целым числом: {value!r}")
+
+
+# -- parse_map_list
+def parse_map_list(text: str, defaults: Optional[MapImportRow] = None) -> Tuple[List[MapImportRow], MapImportReport]:
+  """Разбирает mapcycle.txt (карта — первое слово строки) или CSV map_name,activated,min_players,max_players,priority.
+
+  Пустые поля CSV и строки mapcycle берут значения из defaults. Повторы внутри файла
+  попадают в report.skipped, ошибочные строки — в report.invalid.
+  """
+  defaults = defaults or MapImportRow("")
+  report = MapImportReport()
+  rows: List[MapImportRow] = []
+  seen = set()
+
+  for line_no, raw_line in enumerate(text.splitlines(), start=1):
+    line = _strip_comment(raw_line)
+    if not line:
+      continue
+
+    if "," in line or ";" in line:
+      cells = [cell.strip().strip('"') for cell in re.split(r"[,;]", line)]
+      if cells[0].lower() == "map_name":
+        continue  # заголовок CSV
+    else:
+      cells = [line.split()[0].strip('"')]
+
+    if len(cells) > len(CSV_FIELDS):
+      report.invalid.append((line_no, f"лишние колонки ({len(cells)} > {len(CSV_FIELDS)})"))
+      continue
+
+    map_name = cells[0]
+    if map_name.lower().endswith(".bsp"):
+      map_name = map_name[:-4]
+    if not MAP_NAME_RE.match(map_name):
+      report.invalid.append((line_no, f"недопустимое имя карты {map_name!r}"))
+      continue
+
+    cells += [""] * (len(CSV_FIELDS) - len(cells))
+    try:
+      row = MapImportRow(
+        map_name=map_name,
+        activated=_parse_int(cells[1], "activated", defaults.activated),
+        min_players=_parse_int(cells[2], "min_players", defaults.min_players),
+        max_players=_parse_int(cells[3], "max_players", defaults.max_players),
+        priority=_parse_int(cells[4], "priority", defaults.priority),
+      )
+    except ValueError as err:
+      report.invalid.append((line_no, str(err)))
+      continue
+
+    if row.activated not in (0, 1):
+      report.invalid.append((line_no, "activated должно быть 0 или 1"))
+      continue
+    if row.min_players < 0 or row.max_players < row.min_players:
+      report.invalid.append((line_no, f"неверный диапазон игроков {row.min_players}..{row.max_players}"))
+      continue
+
+    # Сравнение без учёта регистра, как у collation таблицы maps в MySQL
+    key = map_name.lower()
+    if key in seen:
+      report.skipped.append(map_name)
+      continue
+    seen.add(key)
+    rows.append(row)
+
+  return rows, report
+
+
+# -- import_maps
+async def import_maps(mysql, rows: List[MapImportRow], report: MapImportReport) -> MapImportReport:
+  """Вставляет отсутствующие карты одной транзакцией: один SELECT для сравнения и один пакет INSERT.
+
+  Ошибки БД (TransactionError) пробрасываются; транзакция при этом откатывается целиком.
+  """
+  new_rows: List[MapImportRow] = []
+  if rows:
+    transaction = mysql.transaction()
+    try:
+      await transaction.begin()
+      placeholders = ", ".join(["%s"] * len(rows))
+      _, existing_rows = await transaction.execute(
+        f"SELECT map_name FROM maps WHERE map_name IN ({placeholders})",
+        tuple(row.map_name for row in rows),
+      )
+      existing = {str(name).lower() for (name,) in existing_rows or ()}
+
+      new_rows = [row for row in rows if row.map_name.lower() not in existing]
+      report.skipped.extend(row.map_name for row in rows if row.map_name.lower() in existing)
+
+      if new_rows:
+        await transaction.execute_many(INSERT_MAP_QUERY, [row.as_tuple() for row in new_rows])
+      await transaction.commit()
+    except BaseException:
+      if transaction.conn is not None:
+        try:
+          await transaction.rollback()
+        except Exception as err:
+          logger.error(f"MySQL: откат импорта карт не удался: {err}")
+      raise
+    finally:
+      await transaction.close()
+
+  report.inserted.extend(row.map_name for row in new_rows)
+  metrics.inc("map_import_rows_total", len(report.inserted), result="inserted")
+  metrics.inc("map_import_rows_total", len(report.skipped), result="skipped")
+  metrics.inc("map_import_rows_total", len(report.invalid), result="invalid")
+  return report
@@ -0,0 +1,175 @@
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import aiomysql
+
+from data_server.asyncsql import AioMysql
+from observer.observer_client import logger, metrics
+
+MIGRATIONS_DIR = Path(__file__).resolve().with_name("migrations")
+
+# Ошибки «уже сделано»: миграция могла быть применена вручную или прервана посередине (DDL в MySQL не откатывается)
+#   1050 — таблица уже существует, 1060 — колонка уже существует, 1061 — индекс с таким именем уже есть
+IDEMPOTENT_ERROR_CODES = {1050, 1060, 1061}
+
+_MIGRATION_NAME = re.compile(r"^(\d+)_([\w\-]+)\.sql$")
+
+
+# -- Migration
+@dataclass
+class Migration:
+  version: int
+  name: str
+  statements: List[str]
+
+
+# -- split_statements
+def split_statements(sql: str) -> List[str]:
+  """Разбивает файл миграции на отдельные запросы по ';' в конце строки.
+
+  Комментарии '--' отбрасываются только вне кавычек: строковые литералы и имена в `...` не трогаются.
+  """
+  statements: List[str] = []
+  current: List[str] = []
+  quote: Optional[str] = None
+  for raw_line in sql.splitlines():
+    line, quote = _strip_comment(raw_line, quote)
+    line = line.rstrip()
+    if not line.strip():
+      continue
+    if line.endswith(";") and quote is None:
+      current.append(line[:-1])
+      statements.append("\n".join(current).strip())
+      current = []
+    else:
+      current.append(line)
+  if current and "\n".join(current).strip():
+    statements.append("\n".join(current).strip())
+  return statements
+
+
+def _strip_comment(line: str, quote: Optional[str]) -> Tuple[str, Optional[str]]:
+  """Обрезает '--' вне кавычек; quote — открытая кавычка, перешедшая с прошлой строки."""
+  index = 0
+  while index < len(line):
+    char = line[index]
+    if quote is not None:
+      if char == "\\" and quote != "`":
+        index += 1
+      elif char == quote:
+        quote = None
+    elif char in ("'", '"', "`"):
+      quote = char
+    elif line.startswith("--", index):
+      return line[:index], None
+    index += 1
+  return line, quote
+
+
+# -- load_migrations
+def load_migrations(directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+  migrations: List[Migration] = []
+  for path in sorted(directory.glob("*.sql")):
+    match = _MIGRATION_NAME.match(path.name)
+    if not match:
+      logger.warning(f"MySQL: файл миграции пропущен (ожидается NNNN_name.sql): {path.name}")
+      continue
+    migrations.append(
+      Migration(
+        version=int(match.group(1)),
+        name=match.group(2),
+        statements=split_statements(path.read_text(encoding="utf-8")),
+      )
+    )
+  migrations.sort(key=lambda migration: migration.version)
+  return migrations
+
+
+# -- mysql_error_code
+def mysql_error_code(err: BaseException) -> Optional[int]:
+  """Достаёт код ошибки MySQL из цепочки исключений (QueryError оборачивает aiomysql.Error)."""
+  current: Optional[BaseException] = err
+  while current is not None:
+    if isinstance(current, aiomysql.Error) and current.args and isinstance(current.args[0], int):
+      return current.args[0]
+    current = current.__cause__ or current.__context__
+  return None
+
+
+# -- apply_migrations
+async def apply_migrations(mysql: AioMysql, directory: Path = MIGRATIONS_DIR) -> List[int]:
+  """Применяет ещё не применённые миграции по порядку версий.
+
+  Версии фиксируются в schema_migrations после успешного выполнения всех запросов файла.
+  На первой неудачной миграции применение останавливается — остальные версии ждут исправления.
+
+  Returns:
+    List[int]: Версии, применённые в этом запуске.
+  """
+  await mysql.execute_change(
+    "CREATE TABLE IF NOT EXISTS schema_migrations ("
+    " version INT NOT NULL PRIMARY KEY,"
+    " name VARCHAR(255) NOT NULL,"
+    " applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP"
+    ")"
+  )
+  applied = {row[0] for row in await mysql.execute_select("SELECT version FROM schema_migrations")}
+
+  newly_applied: List[int] = []
+  for migration in load_migrations(directory):
+    if migration.version in applied:
+      continue
+
+    for statement in migration.statements:
+      try:
+        await mysql.execute_change(statement)
+      except Exception as err:
+        code = mysql_error_code(err)
+        if code in IDEMPOTENT_ERROR_CODES:
+          logger.info(f"MySQL: миграция {migration.version:04d}: пропущено (код {code}, уже применено)")
+          continue
+        logger.error(f"MySQL: миграция {migration.version:04d}_{migration.name} не применена (код {code}): {err}")
+        metrics.inc("db_migrations_total", result="failed")
+        return newly_applied
+
+    await mysql.execute_change(
+      "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+      (migration.version, migration.name),
+    )
+    newly_applied.append(migration.version)
+    metrics.inc("db_migrations_total", result="applied")
+    logger.info(f"MySQL: применена миграция {migration.version:04d}_{migration.name}")
+
+  return newly_applied
+
+
+# -- explain_lookups
+async def explain_lookups(mysql: AioMysql, lookups: Dict[str, Tuple[str, tuple]]) -> Dict[str, List[str]]:
+  """EXPLAIN-проверка горячих запросов: полный скан таблицы или индекса считается проблемой.
+
+  Returns:
+    Dict[str, List[str]]: Имя запроса -> список проблем (пустой — план использует индекс).
+  """
+  report: Dict[str, List[str]] = {}
+  for name, (query, args) in lookups.items():
+    problems: List[str] = []
+    try:
+      async with mysql.pool.acquire() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+          await cursor.execute(f"EXPLAIN {query}", args)
+          rows = await cursor.fetchall()
+    except Exception as err:
+      report[name] = [f"EXPLAIN failed: {err}"]
+      metrics.set_gauge("db_lookup_plan_ok", 0, query=name)
+      continue
+
+    for row in rows:
+      access_type = (row.get("type") or "").upper()
+      if row.get("table") and access_type in ("ALL", "INDEX"):
+        problems.append(f"{row.get('table')}: type={access_type} key={row.get('key')} rows={row.get('rows')}")
+
+    report[name] = problems
+    metrics.set_gauge("db_lookup_plan_ok", 0 if problems else 1, query=name)
+  return report
@@ -0,0 +1,17 @@
+-- Инкрементальная синхронизация кеша Steam ID <-> Discord ID (data_server/user_sync.py)
+-- updated_at: водяной знак для выборки изменённых строк
+-- users_tombstones: следы удалённых регистраций (/unreg), чтобы delta-sync видел удаления
+
+ALTER TABLE users
+  ADD COLUMN updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6);
+
+CREATE INDEX idx_users_updated_at ON users (updated_at);
+
+CREATE TABLE IF NOT EXISTS users_tombstones (
+  id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+  discord_id VARCHAR(32) NOT NULL,
+  steam_id VARCHAR(64) NOT NULL,
+  deleted_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+  PRIMARY KEY (id),
+  KEY idx_users_tombstones_deleted_at (deleted_at)
+);
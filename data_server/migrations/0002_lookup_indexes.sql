@@ -0,0 +1,8 @@
+-- Уникальные индексы для горячих проверок существования и поиска (steam_record_exist, map_record_exist, /check_user)
+-- Перед применением убедитесь, что в таблицах нет дублей: иначе MySQL вернёт ошибку 1062 и миграция остановится
+
+CREATE UNIQUE INDEX uq_users_steam_id ON users (steam_id);
+
+CREATE UNIQUE INDEX uq_users_discord_id ON users (discord_id);
+
+CREATE UNIQUE INDEX uq_maps_map_name ON maps (map_name);
@@ -0,0 +1,19 @@
+-- Нормализованный SteamID64 (data_server/steamid.py): STEAM_0:Y:Z и STEAM_1:Y:Z одного аккаунта дают одно число
+-- Поиск /check_user и проверка регистрации идут по steam_id64; текстовый steam_id остаётся для отображения
+-- Строки, которые не удалось разобрать, остаются с NULL (UNIQUE допускает несколько NULL)
+-- Перед применением проверьте дубли одного аккаунта в разных вселенных, иначе индекс не создастся (ошибка 1062):
+--   SELECT SUBSTRING(steam_id, 9), COUNT(*) FROM users WHERE steam_id REGEXP '^(STEAM|VALVE)_[0-5]:[01]:[0-9]+$' GROUP BY 1 HAVING COUNT(*) > 1
+
+ALTER TABLE users ADD COLUMN steam_id64 BIGINT UNSIGNED NULL;
+
+UPDATE users
+  SET steam_id64 = 76561197960265728
+    + CAST(SUBSTRING_INDEX(steam_id, ':', -1) AS UNSIGNED) * 2
+    + CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(steam_id, ':', 2), ':', -1) AS UNSIGNED)
+  WHERE steam_id64 IS NULL AND steam_id REGEXP '^(STEAM|VALVE)_[0-5]:[01]:[0-9]{1,10}$';
+
+UPDATE users
+  SET steam_id64 = CAST(steam_id AS UNSIGNED)
+  WHERE steam_id64 IS NULL AND steam_id REGEXP '^7656119[0-9]{10}$';
+
+CREATE UNIQUE INDEX uq_users_steam_id64 ON users (steam_id64);
@@ -0,0 +1,132 @@
+import re
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Iterator, List
+
+from observer.metrics import Histogram
+from observer.observer_client import logger, metrics
+
+# Все шаблоны сверх лимита учитываются под одним ключом, чтобы динамический SQL не раздувал память
+OTHER_TEMPLATE = "<other>"
+SORT_KEYS = ("total", "calls", "avg", "max", "rows", "errors", "retries")
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+# -- normalize_query
+@lru_cache(maxsize=1024)
+def normalize_query(query: str) -> str:
+  """Шаблон запроса без значений: литералы и плейсхолдеры -> ?, списки (?, ?, ...) -> (?+)."""
+  template = _STRING_LITERAL.sub("?", query)
+  template = _NUMBER.sub("?", template)
+  template = _PLACEHOLDER.sub("?", template)
+  template = _VALUE_LIST.sub("(?+)", template)
+  return _WHITESPACE.sub(" ", template).strip()
+
+
+# -- QuerySample
+@dataclass
+class QuerySample:
+  """Один вызов: заполняется во время выполнения и записывается в QueryStats по выходу из measure()."""
+  op: str
+  template: str
+  rows: int = 0
+  retries: int = 0
+
+
+# -- StatementStats
+@dataclass
+class StatementStats:
+  template: str
+  calls: int = 0
+  errors: int = 0
+  retries: int = 0
+  rows: int = 0
+  histogram: Histogram = field(default_factory=Histogram)
+
+  def snapshot(self) -> dict:
+    histogram = self.histogram
+    return {
+      "template": self.template,
+      "calls": self.calls,
+      "total": round(histogram.total, 6),
+      "avg": round(histogram.total / self.calls, 6) if self.calls else 0.0,
+      "p95": histogram.quantile(0.95),
+      "max": round(histogram.max, 6),
+      "rows": self.rows,
+      "errors": self.errors,
+      "retries": self.retries,
+    }
+
+
+# SECTION QueryStats
+class QueryStats:
+  """Статистика по шаблонам запросов и лог медленных запросов (без значений параметров).
+
+  Общие гистограммы пишутся в metrics: {name}_query_seconds{op}, {name}_slow_queries_total{op}.
+  """
+
+  def __init__(self, name: str = "mysql", *, slow_ms: float = 200.0, max_templates: int = 500) -> None:
+    self.name: str = name
+    self.slow_ms: float = float(slow_ms)
+    self.max_templates: int = max(1, int(max_templates))
+    self._statements: Dict[str, StatementStats] = {}
+
+  # -- measure()
+  @contextmanager
+  def measure(self, op: str, query: str) -> Iterator[QuerySample]:
+    sample = QuerySample(op=op, template=normalize_query(query))
+    started = time.perf_counter()
+    failed = True
+    try:
+      yield sample
+      failed = False
+    finally:
+      self.record(sample, time.perf_counter() - started, failed=failed)
+
+  # -- record()
+  def record(self, sample: QuerySample, seconds: float, *, failed: bool = False) -> None:
+    stats = self._statements.get(sample.template)
+    if stats is None:
+      key = sample.template if len(self._statements) < self.max_templates else OTHER_TEMPLATE
+      stats = self._statements.setdefault(key, StatementStats(key))
+
+    stats.calls += 1
+    stats.rows += sample.rows
+    stats.retries += sample.retries
+    stats.histogram.observe(seconds)
+    if failed:
+      stats.errors += 1
+
+    metrics.observe(f"{self.name}_query_seconds", seconds, op=sample.op)
+    if sample.retries:
+      metrics.inc(f"{self.name}_query_retries_total", sample.retries, op=sample.op)
+
+    elapsed_ms = seconds * 1000
+    if self.slow_ms > 0 and elapsed_ms >= self.slow_ms:
+      metrics.inc(f"{self.name}_slow_queries_total", op=sample.op)
+      logger.warning(
+        f"SlowQuery[{self.name}]: {elapsed_ms:.0f} мс ({sample.op}, строк {sample.rows}, "
+        f"повторов {sample.retries}{', ошибка' if failed else ''}): {sample.template}"
+      )
+
+  # -- top()
+  def top(self, limit: int = 10, sort: str = "total") -> List[dict]:
+    """Топ шаблонов по sort (см. SORT_KEYS), по убыванию."""
+    if sort not in SORT_KEYS:
+      raise ValueError(f"неизвестный ключ сортировки {sort!r}, допустимо: {', '.join(SORT_KEYS)}")
+    snapshots = [stats.snapshot() for stats in self._statements.values()]
+    snapshots.sort(key=lambda item: item[sort], reverse=True)
+    return snapshots[:max(0, int(limit))]
+
+  # -- reset()
+  def reset(self) -> None:
+    self._statements.clear()
+
+# !SECTION
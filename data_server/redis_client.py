@@ -1,6 +1,21 @@
+import asyncio
 from redis import asyncio as aioredis
-from typing import Optional, Union, List
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple, Union, List
 
+from observer.observer_client import logger, metrics
+
+# Ответ XREADGROUP по одному потоку: RESP2 — [[поток, записи]], RESP3 — {поток: [записи]} или {поток: записи}
+def _stream_entries(response) -> List[Tuple[bytes, Dict]]:
+  if not response:
+    return []
+  if isinstance(response, dict):
+    entries = next(iter(response.values()))
+    if entries and isinstance(entries[0], list):
+      entries = entries[0]
+  else:
+    entries = response[0][1]
+  return [entry for entry in entries or [] if entry[0] is not None]
+
 # SECTION RedisError
 class RedisError(Exception):
   """Базовый класс для исключений Redis."""
@@ -38,115 +53,189 @@ class RedisKeysError(RedisError):
 
 # SECTION Class AsyncRedisClient
 class AsyncRedisClient:
+  """Один долгоживущий клиент Redis на процесс.
+
+  Состояние соединения (connected) обновляется по результатам команд и фоновым PING
+  (start_heartbeat), поэтому отдельная проверка перед каждой командой не нужна.
+  """
+
   # -- __init__()
-  def __init__(self, host: str = '127.0.0.1', port: int = 6379, db: int = 0) -> None:
+  def __init__(self, host: str = '127.0.0.1', port: int = 6379, db: int = 0, connect_timeout: float = 2.0) -> None:
     """Инициализация клиента Redis."""
     self.host: str = host
     self.port: int = port
     self.db: int = db
+    self.connect_timeout: float = connect_timeout
     self.pool = None
+    self.client: Optional[aioredis.Redis] = None
 
     self.connected: bool = False
+    self._ever_connected: bool = False
+    self._heartbeat_task: Optional[asyncio.Task] = None
+    self._restore_hooks: List[Callable[[], Awaitable]] = []
+    self._restore_tasks: Set[asyncio.Task] = set()
 
   # -- connect()
   async def connect(self) -> None:
-    """Подключение к Redis с использованием пула соединений."""
-    try:
-      self.pool = aioredis.ConnectionPool.from_url(f"redis://{self.host}:{self.port}/{self.db}")
+    """Подключение к Redis: пул и клиент создаются один раз, повторный вызов только проверяет связь."""
+    if self.client is None:
+      self.pool = aioredis.ConnectionPool.from_url(
+        f"redis://{self.host}:{self.port}/{self.db}",
+        socket_connect_timeout=self.connect_timeout,
+      )
+      self.client = aioredis.Redis(connection_pool=self.pool)
 
-      async with aioredis.Redis.from_pool(self.pool) as conn:
-        await conn.ping()
-        self.connected = True
+    try:
+      await self.client.ping()
     except aioredis.RedisError as e:
-      self.connected = False
+      self._set_connected(False, e)
       raise RedisConnectionError(f"Ошибка подключения к Redis: {e}")
+    self._set_connected(True)
 
   # -- is_connected()
   async def is_connected(self) -> bool:
-    """Проверяет, подключен ли клиент к Redis."""
-    if not self.pool or not self.connected:
+    """Последнее известное состояние соединения (без запроса к Redis)."""
+    return self.client is not None and self.connected
+
+  # -- ping()
+  async def ping(self) -> bool:
+    """PING с обновлением состояния соединения."""
+    if self.client is None:
       return False
 
     try:
-      async with aioredis.Redis.from_pool(self.pool) as conn:
-        await conn.ping()
-        return True
-    except aioredis.RedisError:
+      await self.client.ping()
+    except aioredis.RedisError as e:
+      self._set_connected(False, e)
       return False
+    self._set_connected(True)
+    return True
+
+  # -- start_heartbeat()
+  def start_heartbeat(self, interval: float) -> None:
+    """Фоновый PING раз в interval секунд: замечает обрыв без запросов и возвращает connected после восстановления."""
+    if self._heartbeat_task is None or self._heartbeat_task.done():
+      self._heartbeat_task = asyncio.create_task(self._heartbeat(max(0.1, float(interval))), name="redis:heartbeat")
+
+  async def _heartbeat(self, interval: float) -> None:
+    while True:
+      await asyncio.sleep(interval)
+      await self.ping()
+
+  # -- add_restore_hook()
+  def add_restore_hook(self, hook: Callable[[], Awaitable]) -> None:
+    """hook() запускается фоновой задачей при каждом переходе connected из False в True."""
+    if hook not in self._restore_hooks:
+      self._restore_hooks.append(hook)
 
+  def _set_connected(self, connected: bool, err: Optional[Exception] = None) -> None:
+    if connected != self.connected:
+      if connected and self._ever_connected:
+        logger.info(f"Redis: соединение с {self.host}:{self.port} восстановлено")
+      elif not connected and self._ever_connected:
+        logger.warning(f"Redis: соединение с {self.host}:{self.port} потеряно: {err}")
+    restored = connected and not self.connected
+    self.connected = connected
+    self._ever_connected = self._ever_connected or connected
+    metrics.set_gauge("redis_up", 1 if connected else 0)
+    if restored:
+      for hook in self._restore_hooks:
+        task = asyncio.create_task(hook(), name="redis:restore")
+        self._restore_tasks.add(task)
+        task.add_done_callback(self._restore_tasks.discard)
+
+  # -- _redis()
+  def _redis(self) -> aioredis.Redis:
+    if self.client is None:
+      raise RedisConnectionError("Клиент Redis не инициализирован.")
+    return self.client
+
+  # -- _run()
+  async def _run(self, command: Awaitable):
+    """Выполняет команду; обрыв соединения сбрасывает connected, успех — восстанавливает."""
+    try:
+      result = await command
+    except (aioredis.ConnectionError, aioredis.TimeoutError) as e:
+      self._set_connected(False, e)
+      raise
+    if not self.connected:
+      self._set_connected(True)
+    return result
+
+  # -- pipeline()
+  def pipeline(self, transaction: bool = True):
+    """Pipeline общего клиента; выполнять через execute_pipeline(), чтобы учитывалось состояние соединения."""
+    return self._redis().pipeline(transaction=transaction)
+
+  # -- pubsub()
+  def pubsub(self):
+    """PubSub общего клиента: держит своё соединение из пула, пока не закрыт (aclose)."""
+    return self._redis().pubsub()
+
+  # -- execute_pipeline()
+  async def execute_pipeline(self, pipe) -> list:
+    return await self._run(pipe.execute())
 
   # -- set_hash()
   async def set_hash(self, table: str, key: str, value: Union[str, bytes]) -> None:
     """Устанавливает значение в хэш (таблицу) по ключу."""
-    if not self.pool:
-      raise RedisConnectionError("Клиент Redis не инициализирован.")
+    conn = self._redis()
 
     try:
-      async with aioredis.Redis.from_pool(self.pool) as conn:
-        await conn.hset(table, key, value)
+      await self._run(conn.hset(table, key, value))
     except aioredis.RedisError as e:
       raise RedisSetError(f"Ошибка при установке значения в таблицу '{table}': {e}")
 
   # -- get_hash()
   async def get_hash(self, table: str, key: str) -> Optional[Union[str, bytes]]:
     """Получает значение из хэша (таблицы) по ключу."""
-    if not self.pool:
-      raise RedisConnectionError("Клиент Redis не инициализирован.")
+    conn = self._redis()
 
     try:
-      async with aioredis.Redis.from_pool(self.pool) as conn:
-        value = await conn.hget(table, key)
-        return None if value is None else value.decode('utf-8')  # Декодируем значение, если оно не None
+      value = await self._run(conn.hget(table, key))
+      return None if value is None else value.decode('utf-8')  # Декодируем значение, если оно не None
     except aioredis.RedisError as e:
       raise RedisGetError(f"Ошибка при получении значения из таблицы '{table}': {e}")
 
   # -- delete_hash()
   async def delete_hash(self, table: str, key: str) -> int:
     """Удаляет ключ из хэша (таблицы)."""
-    if not self.pool:
-      raise RedisConnectionError("Клиент Redis не инициализирован.")
+    conn = self._redis()
 
     try:
-      async with aioredis.Redis.from_pool(self.pool) as conn:
-        return await conn.hdel(table, key)
+      return await self._run(conn.hdel(table, key))
     except aioredis.RedisError as e:
       raise RedisDeleteError(f"Ошибка при удалении ключа из таблицы '{table}': {e}")
 
   # -- exists_hash()
   async def exists_hash(self, table: str, key: str) -> bool:
     """Проверяет, существует ли ключ в хэше (таблице)."""
-    if not self.pool:
-      raise RedisConnectionError("Клиент Redis не инициализирован.")
+    conn = self._redis()
 
     try:
-      async with aioredis.Redis.from_pool(self.pool) as conn:
-        return await conn.hexists(table, key)
+      return await self._run(conn.hexists(table, key))
     except aioredis.RedisError as err:
       raise RedisExistsError(f"Ошибка при проверке существования ключа в таблице '{table}': {err}")
 
   # -- keys_hash()
   async def keys_hash(self, table: str) -> List[str]:
     """Возвращает список всех ключей в хэше (таблице)."""
-    if not self.pool:
-      raise RedisConnectionError("Клиент Redis не инициализирован.")
+    conn = self._redis()
 
     try:
-      async with aioredis.Redis.from_pool(self.pool) as conn:
-        return await conn.hkeys(table)
+      return await self._run(conn.hkeys(table))
     except aioredis.RedisError as e:
       raise RedisKeysError(f"Ошибка при получении ключей из таблицы '{table}': {e}")
 
   # -- list_add()
   async def list_add(self, table: str, value: str) -> None:
     """Добавляет значение в конец списка, связанного с таблицей."""
-    async with aioredis.Redis.from_pool(self.pool) as conn:
-      await conn.rpush(table, value)
+    await self._run(self._redis().rpush(table, value))
 
   # -- list_get()
   async def list_get(self, table: str, from_: int, to_: int=-1) -> List[str]:
     """Возвращает последние n значений из списка, связанного с таблицей."""
-    async with aioredis.Redis.from_pool(self.pool) as conn:
-      return await conn.lrange(table, from_, to_)  # Получаем последние n значений
+    return await self._run(self._redis().lrange(table, from_, to_))  # Получаем последние n значений
     
   # -- list_delete()
   async def list_delete(self, table: str, value: str, count: int = 0) -> None:
@@ -159,35 +248,160 @@ class AsyncRedisClient:
                   Если count < 0, удаляет только последние count вхождений.
                   Если count = 0, удаляет все вхождения.
     """
-    async with aioredis.Redis.from_pool(self.pool) as conn:
-      await conn.lrem(table, count, value)
+    await self._run(self._redis().lrem(table, count, value))
 
   #  -- list_clear()
   async def list_clear(self, table: str) -> None:
     """Очищает содержимое списка, оставляя сам ключ."""
-    if not self.pool:
-      raise RedisConnectionError("Клиент Redis не инициализирован.")
+    conn = self._redis()
 
     try:
-      async with aioredis.Redis.from_pool(self.pool) as conn:
-        await conn.ltrim(table, 1, 0) 
+      await self._run(conn.ltrim(table, 1, 0))
     except aioredis.RedisError as e:
       raise RedisError(f"Ошибка при очистке списка '{table}': {e}")
 
 
+  # -- zset_range()
+  async def zset_range(self, table: str, start: int = 0, stop: int = -1) -> List[bytes]:
+    """Элементы отсортированного множества по возрастанию score."""
+    return await self._run(self._redis().zrange(table, start, stop))
+
+  # -- zset_add()
+  async def zset_add(self, table: str, mapping: Dict[Union[str, bytes], float]) -> None:
+    """Добавляет элементы в отсортированное множество (или обновляет их score)."""
+    if mapping:
+      await self._run(self._redis().zadd(table, mapping))
+
+  # -- zset_remove()
+  async def zset_remove(self, table: str, *members: Union[str, bytes]) -> None:
+    """Удаляет элементы из отсортированного множества."""
+    if members:
+      await self._run(self._redis().zrem(table, *members))
+
+  # -- zset_range_by_lex()
+  async def zset_range_by_lex(self, table: str, min: bytes, max: bytes, start: int = 0, num: Optional[int] = None) -> List[bytes]:
+    """ZRANGEBYLEX: элементы множества с одинаковым score в лексикографическом интервале [min, max]."""
+    if num is None:
+      return await self._run(self._redis().zrangebylex(table, min, max))
+    return await self._run(self._redis().zrangebylex(table, min, max, start=start, num=num))
+
+  # -- zset_scan()
+  async def zset_scan(self, table: str, match: Optional[bytes] = None, count: int = 100, max_pages: Optional[int] = None):
+    """Обходит отсортированное множество курсором ZSCAN, отдавая элементы (без score) по мере чтения.
+
+    max_pages ограничивает число запросов ZSCAN: обход останавливается, даже если курсор не вернулся к 0.
+    """
+    cursor = 0
+    pages = 0
+    while True:
+      cursor, items = await self._run(self._redis().zscan(table, cursor, match=match, count=count))
+      pages += 1
+      for member, _score in items:
+        yield member
+      if not cursor or (max_pages is not None and pages >= max_pages):
+        break
+
+  # -- key_type()
+  async def key_type(self, table: str) -> str:
+    """Тип ключа: 'list', 'zset', 'hash', ... или 'none', если ключа нет."""
+    value = await self._run(self._redis().type(table))
+    return value.decode('utf-8') if isinstance(value, bytes) else str(value)
+
   # -- list_exists()
   async def list_exists(self, table: str, value: str) -> bool:
-    """Проверяет, существует ли значение в списке, связанном с таблицей."""
-    async with aioredis.Redis.from_pool(self.pool) as conn:
-      list_values = await conn.lrange(table, 0, -1)
-      return value.encode('utf-8') in list_values
+    """Проверяет, существует ли значение в списке, связанном с таблицей (LPOS на стороне Redis, без выгрузки списка)."""
+    return await self._run(self._redis().lpos(table, value)) is not None
+
+  # -- items_hash()
+  async def items_hash(self, table: str) -> Dict[str, str]:
+    """Все поля хэша (таблицы) с декодированными ключами и значениями."""
+    conn = self._redis()
+
+    try:
+      items = await self._run(conn.hgetall(table))
+    except aioredis.RedisError as e:
+      raise RedisGetError(f"Ошибка при получении значений из таблицы '{table}': {e}")
+    return {key.decode('utf-8'): value.decode('utf-8') for key, value in items.items()}
+
+  # -- value_get()
+  async def value_get(self, key: str) -> Optional[bytes]:
+    """Строковое значение ключа или None, если ключа нет (истёк)."""
+    return await self._run(self._redis().get(key))
+
+  # -- value_set()
+  async def value_set(self, key: str, value: Union[str, bytes], ttl: Optional[int] = None) -> None:
+    """Записывает строковое значение; ttl (сек) — время жизни ключа."""
+    await self._run(self._redis().set(key, value, ex=int(ttl) if ttl else None))
+
+  # -- delete_keys()
+  async def delete_keys(self, *keys: str) -> int:
+    """Удаляет ключи; возвращает число удалённых."""
+    if not keys:
+      return 0
+    return await self._run(self._redis().delete(*keys))
+
+  # -- stream_add()
+  async def stream_add(self, stream: str, fields: Dict[str, Union[str, bytes]], maxlen: Optional[int] = None) -> bytes:
+    """XADD; maxlen — приблизительный предел длины потока (MAXLEN ~), старые записи вытесняются."""
+    return await self._run(self._redis().xadd(stream, fields, maxlen=maxlen, approximate=True))
+
+  # -- stream_group_create()
+  async def stream_group_create(self, stream: str, group: str, start_id: str = "$") -> bool:
+    """Создаёт группу потребителей (и сам поток); False, если группа уже есть."""
+    try:
+      await self._run(self._redis().xgroup_create(stream, group, id=start_id, mkstream=True))
+    except aioredis.ResponseError as e:
+      if "BUSYGROUP" not in str(e):
+        raise
+      return False
+    return True
+
+  # -- stream_read_group()
+  async def stream_read_group(self, stream: str, group: str, consumer: str, start_id: str = ">", count: int = 100) -> List[Tuple[bytes, Dict]]:
+    """XREADGROUP: ">" — новые записи, "0" — выданные этому потребителю и ещё не подтверждённые."""
+    response = await self._run(self._redis().xreadgroup(group, consumer, {stream: start_id}, count=count))
+    return _stream_entries(response)
+
+  # -- stream_claim_idle()
+  async def stream_claim_idle(self, stream: str, group: str, consumer: str, min_idle_ms: int, count: int = 100) -> List[Tuple[bytes, Dict]]:
+    """XAUTOCLAIM: забирает записи, которые другие потребители не подтвердили дольше min_idle_ms."""
+    response = await self._run(self._redis().xautoclaim(stream, group, consumer, min_idle_ms, count=count))
+    return [entry for entry in response[1] if entry[0] is not None]
+
+  # -- stream_ack()
+  async def stream_ack(self, stream: str, group: str, *ids: Union[str, bytes]) -> int:
+    if not ids:
+      return 0
+    return await self._run(self._redis().xack(stream, group, *ids))
+
+  # -- stream_range_rev()
+  async def stream_range_rev(self, stream: str, count: int) -> List[Tuple[bytes, Dict]]:
+    """Последние count записей потока, от новых к старым."""
+    return await self._run(self._redis().xrevrange(stream, count=count)) or []
+
+  # -- counter_incr()
+  async def counter_incr(self, table: str) -> int:
+    """Атомарно увеличивает счётчик на 1 и возвращает новое значение."""
+    return int(await self._run(self._redis().incr(table)))
+
+  # -- eval_script()
+  async def eval_script(self, script: str, keys: List[str], args: List = ()):
+    """Выполняет Lua-скрипт атомарно на стороне Redis."""
+    return await self._run(self._redis().eval(script, len(keys), *keys, *args))
 
 
   # -- close()
   async def close(self) -> None:
-    """Закрывает соединение с Redis."""
+    """Останавливает heartbeat и закрывает соединения с Redis."""
+    if self._heartbeat_task is not None:
+      self._heartbeat_task.cancel()
+      self._heartbeat_task = None
+    for task in list(self._restore_tasks):
+      task.cancel()
+    if self.client is not None:
+      await self.client.aclose()
     if self.pool:
       await self.pool.disconnect()
-      self.connected = False
+    self.connected = False
       
 # !SECTION
@@ -1,12 +1,18 @@
-from observer.observer_client import observer, Event, logger, nsroute
+from observer.observer_client import observer, Event, Param, logger, metrics, nsroute, caches, MISS
 from data_server.redis_client import AsyncRedisClient as AsyncRC
+from observer.startup import StartupReport
+from data_server.steamid import to_steamid64
+from data_server.cache_bus import CacheBus
 
+import asyncio
 import config
-from cachetools import TTLCache
+import functools
+import json
+import os
+import socket
+import time
 
-from redis import asyncio as aioredis
-
-from typing import Dict
+from typing import Dict, Optional
 
 class RedisTable:
   MapListActive = "map_list_active"
@@ -16,27 +22,101 @@ class RedisTable:
   """Хранит все карты"""
 
   LastPlayers = "last_players"
-  """Хранит всех игроков ранее заходившие"""
+  """ZSET игроков, ранее заходивших на сервер: score — время последнего появления (unix)"""
 
   BannedPlayers = "banned_players"
-  """Хранит всех забаненных игроков"""
+  """HASH активных банов: цель (ник или steam_id) -> JSON {admin, reason, minutes, banned_at, expires_at}; expires_at 0 — навсегда"""
+
+  BannedExpiry = "banned_players:expiry"
+  """ZSET сроков временных банов: участник — цель бана, score — unix-время окончания"""
+
+  MapListVersion = "map_list:version"
+  """Счётчик пересборок списков карт: каждая пересборка получает номер INCR до чтения карт из SQL"""
+
+  MapListApplied = "map_list:applied"
+  """Номер последней пересборки, чьи staging-ключи переименованы в рабочие"""
+
+  RuntimeState = "bot:runtime_state"
+  """HASH снимков состояния бота для быстрого перезапуска: секция (status, chat, moments) -> JSON"""
+
+  CheckSteam = "check_steam"
+  """Префикс ключей второго уровня кеша CheckSteam: check_steam:<SteamID64> -> discord_id, "" — не зарегистрирован"""
+
+# Снимает истёкшие временные баны одним атомарным шагом: повторный бан между чтением и удалением не потеряется.
+# Возвращает снятые цели, чтобы вызывающий убрал их из :lex-индекса (string.lower в Lua не знает кириллицу)
+PURGE_EXPIRED_BANS_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1], 'LIMIT', 0, 1000)
+if #expired > 0 then
+  redis.call('HDEL', KEYS[1], unpack(expired))
+  redis.call('ZREM', KEYS[2], unpack(expired))
+end
+return expired
+"""
+
+# Подменяет рабочие списки карт staging-ключами пересборки, если её номер новее применённого.
+# KEYS[1] — map_list:applied, далее пары (рабочий ключ, staging-ключ); ARGV[1] — номер пересборки.
+# Пустой набор не создаёт staging-ключа — тогда рабочий ключ просто удаляется
+COMMIT_MAP_LISTS_SCRIPT = """
+local version = tonumber(ARGV[1])
+if version <= tonumber(redis.call('GET', KEYS[1]) or '0') then
+  for i = 3, #KEYS, 2 do
+    redis.call('DEL', KEYS[i])
+  end
+  return 0
+end
+for i = 2, #KEYS, 2 do
+  if redis.call('EXISTS', KEYS[i + 1]) == 1 then
+    redis.call('RENAME', KEYS[i + 1], KEYS[i])
+  else
+    redis.call('DEL', KEYS[i])
+  end
+end
+redis.call('SET', KEYS[1], ARGV[1])
+return 1
+"""
+
+# Наборы для автодополнения: у каждого есть ZSET "<ключ>:lex" (score 0, член "ник в нижнем регистре\0ник"),
+# который обновляется теми же функциями, что и сам набор
+AUTOCOMPLETE_DATASETS = {
+  "maps_all": RedisTable.MapListAll,
+  "maps_active": RedisTable.MapListActive,
+  "last_players": RedisTable.LastPlayers,
+  "bans": RedisTable.BannedPlayers,
+}
+# Поиск подстроки (ZSCAN) в /redis/autocomplete: элементов на запрос (подсказка Redis) и предел запросов по умолчанию
+AUTOCOMPLETE_SCAN_COUNT = 200
+
+# -- autocomplete_scan_pages
+def autocomplete_scan_pages() -> int:
+  return max(1, int(getattr(config, "REDIS_AUTOCOMPLETE_SCAN_PAGES", 10)))
 
 # -- init
 rc: AsyncRC = AsyncRC(host=config.REDIS_HOST,
                               port=config.REDIS_PORT)
 
-cache_players: TTLCache = TTLCache(maxsize=32, ttl=120)
+# Шина инвалидации кешей между процессами бота: изменения связей и карт, сделанные в одном процессе,
+# повторяются как события в остальных (см. data_server/cache_bus.py); пустой канал — шина выключена
+bus = CacheBus(
+  rc, observer, getattr(config, "REDIS_CACHE_CHANNEL", "cache:invalidate"),
+  (Event.DB_USER_CHANGED, Event.DB_MAPS_CHANGED),
+  check_interval=getattr(config, "REDIS_CACHE_BUS_CHECK_SEC", 30),
+)
+
+# Первый уровень кеша CheckSteam (в процессе): найденная связь живёт ttl, «не найдено» (None) — negative_ttl.
+# Второй уровень — ключи check_steam:<SteamID64> в Redis, см. check_steam()
+steam_cache = caches.region("check_steam", maxsize=1024, ttl=120, negative_ttl=30)
+
+restore_lock = asyncio.Lock()
 
 # SECTION
 
 def require_connection(func) -> callable:
+  # Без PING на каждый вызов: rc.connected обновляют результаты команд и фоновый heartbeat
   
+  @functools.wraps(func)
   async def wrapper(*args, **kwargs) -> callable:
     if not rc.connected:
       return None
-    
-    if not (await rc.is_connected()):
-      return None
 
     return await func(*args, **kwargs)
   
@@ -45,13 +125,64 @@ def require_connection(func) -> callable:
 # !SECTION
 
 # -- run_rc
-@observer.subscribe(Event.BE_READY)
-async def run_rc():
+@observer.subscribe(Event.BE_STARTUP)
+async def run_rc(report: StartupReport):
   try:
-    await rc.connect()
+    async with report.step("redis.connect"):
+      await rc.connect()
     logger.info(f"Redis: Сервер запущен на {rc.host}:{rc.port}, номер БД:{rc.db}")
+    await prepare_redis(report)
   except Exception as err:
     logger.error(err)
+  finally:
+    # Если Redis был недоступен при запуске или потом перезапустился, подготовка повторяется после восстановления
+    rc.add_restore_hook(ev_redis_restored)
+    # Heartbeat запускается и при неудачном подключении: он же вернёт connected, когда Redis поднимется
+    rc.start_heartbeat(getattr(config, "REDIS_HEARTBEAT_SEC", 5))
+    # Шина сама переподписывается, пока Redis недоступен
+    bus.start()
+
+# -- prepare_redis
+async def prepare_redis(report: StartupReport) -> None:
+  """Переводит наборы в актуальный формат и пересобирает :lex-индексы."""
+  async with report.step("redis.migrate_last_players"):
+    migrated = await migrate_last_players()
+  if migrated:
+    logger.info(f"Redis: {RedisTable.LastPlayers} переведён из списка в ZSET: {migrated} игроков")
+
+  async with report.step("redis.migrate_banned_players"):
+    migrated = await migrate_banned_players()
+  if migrated:
+    logger.info(f"Redis: {RedisTable.BannedPlayers} переведён из списка в HASH: {migrated} банов")
+
+  if chat_relay_stream():
+    async with report.step("redis.chat_relay"):
+      await rc.stream_group_create(chat_relay_stream(), CHAT_RELAY_GROUP)
+
+  # :lex-индексы пересобираются при каждом подключении: наборы небольшие, а индекс мог отстать (старая версия, сбой)
+  async with report.step("redis.lex_indexes"):
+    for table in AUTOCOMPLETE_DATASETS.values():
+      await rebuild_lex_index(table)
+
+# -- ev_redis_restored
+async def ev_redis_restored():
+  """Redis снова доступен: после перезапуска в нём могут быть данные старой версии, а :lex-индексы — отставать."""
+  report = StartupReport()
+  try:
+    # Соединение может мигать: подготовки не должны идти одновременно
+    async with restore_lock:
+      await prepare_redis(report)
+  except Exception as err:
+    logger.error(f"Redis: подготовка после восстановления соединения не удалась: {err}")
+    return
+  logger.info(f"Redis: наборы проверены после восстановления соединения ({report.finish():.3f}s)")
+
+# -- ev_close
+# BE_CLOSED, а не BE_CLOSE: подписчики одного события идут одновременно, а буферы сбрасываются в Redis
+@observer.subscribe(Event.BE_CLOSED)
+async def ev_close():
+  await bus.stop()
+  await rc.close()
 
 # -- ev_add_ban
 @observer.subscribe(Event.BC_CS_BAN)
@@ -59,33 +190,128 @@ async def run_rc():
 @require_connection
 async def ev_add_ban(data):
   """
-    Добавляет игрока в список забанненых
+    Записывает бан в реестр: повторный бан той же цели перезаписывает запись и срок
   """
-  await rc.list_add(RedisTable.BannedPlayers, data['target'])
+  target = data['target']
+  minutes = int(data.get('minutes') or 0)
+  now = time.time()
+  expires_at = now + minutes * 60 if minutes > 0 else 0
+  user = getattr(data.get(Param.Interaction), "user", None)
+  record = {
+    "admin": getattr(user, "display_name", "") or "",
+    "admin_id": getattr(user, "id", 0) or 0,
+    "reason": data.get('reason') or "",
+    "minutes": minutes,
+    "banned_at": int(now),
+    "expires_at": int(expires_at),
+  }
+
+  async with rc.pipeline(transaction=True) as pipe:
+    pipe.hset(RedisTable.BannedPlayers, target, json.dumps(record, ensure_ascii=False))
+    pipe.zadd(lex_key(RedisTable.BannedPlayers), {lex_member(target): 0})
+    if expires_at:
+      pipe.zadd(RedisTable.BannedExpiry, {target: expires_at})
+    else:
+      pipe.zrem(RedisTable.BannedExpiry, target)
+    await rc.execute_pipeline(pipe)
 
 # -- ev_unban_ban
 @observer.subscribe(Event.BC_CS_UNBAN)
 @require_connection
 async def ev_unban_ban(data):
   """
-    Убирает игрока из списка забанненых
+    Убирает игрока из реестра банов
+  """
+  async with rc.pipeline(transaction=True) as pipe:
+    pipe.hdel(RedisTable.BannedPlayers, data['target'])
+    pipe.zrem(RedisTable.BannedExpiry, data['target'])
+    pipe.zrem(lex_key(RedisTable.BannedPlayers), lex_member(data['target']))
+    await rc.execute_pipeline(pipe)
+
+# -- purge_expired_bans
+async def purge_expired_bans(now: Optional[float] = None) -> int:
+  """Удаляет из реестра временные баны, срок которых истёк; возвращает их число."""
+  expired = await rc.eval_script(
+    PURGE_EXPIRED_BANS_SCRIPT,
+    [RedisTable.BannedPlayers, RedisTable.BannedExpiry],
+    [time.time() if now is None else now],
+  )
+  if expired:
+    await rc.zset_remove(lex_key(RedisTable.BannedPlayers), *(lex_member(_decode(target)) for target in expired))
+  return len(expired or ())
+
+# -- migrate_banned_players
+async def migrate_banned_players() -> int:
   """
-  await rc.list_delete(RedisTable.BannedPlayers, data['target'])
+    Переводит реестр банов из старого списка в HASH. Срок и автор старых банов неизвестны,
+    поэтому они переносятся как бессрочные. Возвращает число перенесённых целей.
+  """
+  if await rc.key_type(RedisTable.BannedPlayers) != "list":
+    return 0
+
+  targets = [target.decode('utf-8') for target in await rc.list_get(RedisTable.BannedPlayers, 0)]
+  record = json.dumps({"admin": "", "admin_id": 0, "reason": "", "minutes": 0, "banned_at": 0, "expires_at": 0})
+
+  async with rc.pipeline(transaction=True) as pipe:
+    pipe.delete(RedisTable.BannedPlayers)
+    if targets:
+      pipe.hset(RedisTable.BannedPlayers, mapping=dict.fromkeys(targets, record))
+    await rc.execute_pipeline(pipe)
+  return len(set(targets))
 
 # -- ev_add_players_to_list
 @observer.subscribe(Event.WBH_INFO)
 @require_connection
 async def ev_add_players_to_list(data):
   """
-    Добавляет игроков в список LastPlayers
+    Обновляет время последнего появления игроков в LastPlayers (ZADD — O(log N) на игрока)
+    и обрезает набор до LAST_PLAYERS_LIMIT самых свежих
   """
-  async with aioredis.Redis.from_pool(rc.pool)  as conn:
-    async with conn.pipeline() as pipe:
-      for player in data['current_players']:
-        pipe.lrem(RedisTable.LastPlayers, 0, player["name"])
-        pipe.rpush(RedisTable.LastPlayers, player["name"])
+  names = [player["name"] for player in data['current_players']]
+  if not names:
+    return
 
-      await pipe.execute()
+  now = time.time()
+  trim_stop = -(last_players_limit() + 1)
+  async with rc.pipeline(transaction=True) as pipe:
+    pipe.zadd(RedisTable.LastPlayers, {name: now for name in names})
+    pipe.zadd(lex_key(RedisTable.LastPlayers), {lex_member(name): 0 for name in names})
+    # В MULTI ZRANGE возвращает ровно тех, кого следующая команда обрежет
+    pipe.zrange(RedisTable.LastPlayers, 0, trim_stop)
+    pipe.zremrangebyrank(RedisTable.LastPlayers, 0, trim_stop)
+    trimmed = (await rc.execute_pipeline(pipe))[2]
+
+  if trimmed:
+    await rc.zset_remove(lex_key(RedisTable.LastPlayers), *(lex_member(_decode(name)) for name in trimmed))
+
+# -- last_players_limit
+def last_players_limit() -> int:
+  return max(1, int(getattr(config, "REDIS_LAST_PLAYERS_LIMIT", 5000)))
+
+# -- migrate_last_players
+async def migrate_last_players() -> int:
+  """
+    Переводит LastPlayers из старого списка (LREM + RPUSH) в ZSET, сохраняя порядок:
+    хвост списка — самые свежие игроки. Возвращает число перенесённых игроков.
+    Вызывается при запуске, до приёма вебхуков, поэтому параллельных записей в список нет.
+  """
+  if await rc.key_type(RedisTable.LastPlayers) != "list":
+    return 0
+
+  names = await rc.list_get(RedisTable.LastPlayers, 0)
+  now = time.time()
+  scores = {}
+  for index, name in enumerate(names):
+    # Повторы в списке: побеждает последнее (самое свежее) вхождение
+    scores[name] = now - (len(names) - index) / 1000
+
+  async with rc.pipeline(transaction=True) as pipe:
+    pipe.delete(RedisTable.LastPlayers)
+    if scores:
+      pipe.zadd(RedisTable.LastPlayers, scores)
+      pipe.zremrangebyrank(RedisTable.LastPlayers, 0, -(last_players_limit() + 1))
+    await rc.execute_pipeline(pipe)
+  return len(scores)
         
 
 # -- ev_sync_maps
@@ -93,93 +319,387 @@ async def ev_add_players_to_list(data):
 @require_connection
 async def ev_sync_maps(*args):
   """
-    Удаляем все карты из редис
-    Берем карты из SQL и добавляем их в редис
+    Берем карты из SQL и подменяем ими списки карт в редис
   """
-  await rc.list_clear(RedisTable.MapListAll)
-  await rc.list_clear(RedisTable.MapListActive)
-
+  # Номер берётся до чтения SQL: синхронизация, начатая раньше, не перезапишет более свежий снимок
+  version = await next_map_list_version()
   response = (await nsroute.call_route("/get_map_list"))
 
   if response is None:
     return
-  
-  async with aioredis.Redis.from_pool(rc.pool) as conn:
-    async with conn.pipeline() as pipe:
-      for map_name, activated in response:
-        pipe.rpush(RedisTable.MapListAll, map_name)
-        if activated:
-          pipe.rpush(RedisTable.MapListActive, map_name)
 
-      await pipe.execute()
+  if not await rebuild_map_lists(response, version):
+    logger.info(f"Redis: пересборка списков карт #{version} пропущена, уже применена более новая")
+
+# -- next_map_list_version
+async def next_map_list_version() -> int:
+  return await rc.counter_incr(RedisTable.MapListVersion)
+
+# -- rebuild_map_lists
+async def rebuild_map_lists(maps, version: Optional[int] = None) -> bool:
+  """
+    Пересобирает оба списка карт (и их :lex-индексы) под staging-ключами и одним MULTI/EXEC
+    переименовывает их в рабочие: читатели всё время видят либо старый, либо новый полный список.
+    Возвращает False, если к моменту применения уже применена пересборка с большим номером.
+  """
+  if version is None:
+    version = await next_map_list_version()
+  all_maps = [map_name for map_name, _ in maps]
+  active_maps = [map_name for map_name, activated in maps if activated]
+
+  keys = [RedisTable.MapListApplied]
+  async with rc.pipeline(transaction=True) as pipe:
+    for live, names, members in (
+      (RedisTable.MapListAll, all_maps, None),
+      (RedisTable.MapListActive, active_maps, None),
+      (lex_key(RedisTable.MapListAll), None, all_maps),
+      (lex_key(RedisTable.MapListActive), None, active_maps),
+    ):
+      staging = f"{live}:staging:{version}"
+      keys += [live, staging]
+      pipe.delete(staging)
+      if names:
+        pipe.rpush(staging, *names)
+      if members:
+        pipe.zadd(staging, {lex_member(name): 0 for name in members})
+
+    pipe.eval(COMMIT_MAP_LISTS_SCRIPT, len(keys), *keys, version)
+    return bool((await rc.execute_pipeline(pipe))[-1])
+
+# -- route_next_map_list_version
+@nsroute.create_route("/redis/next_map_list_version", timeout=1.0, failure_threshold=3, reset_timeout=15, fallback=None)
+@require_connection
+async def route_next_map_list_version() -> int:
+  """Номер пересборки списков карт: брать до чтения карт из SQL и передавать в /redis/rebuild_map_lists."""
+  return await next_map_list_version()
+
+# -- route_rebuild_map_lists
+@nsroute.create_route("/redis/rebuild_map_lists", timeout=5.0, failure_threshold=3, reset_timeout=15, fallback=None)
+@require_connection
+async def route_rebuild_map_lists(maps, version: Optional[int] = None) -> bool:
+  return await rebuild_map_lists(maps, version)
 
 
 # -- check_steam
-@nsroute.create_route("/CheckSteam")
+@nsroute.create_route("/CheckSteam", timeout=1.0, max_concurrency=16, failure_threshold=5, reset_timeout=30)
 async def check_steam(steam_id: str):
   """
+    Сначала смотрим кеш процесса (steam_cache), затем
     Проверяем, есть ли связь в Редис, если да, то возвращаем
     Если нет, то делаем SQL запрос, и проверяем, существует ли
     Если в SQL существует -> сохраняем в редис и возвращаем ответ
     Если не существует -> Сохраняем в кэш как несуществующий(None) и возвращаем
+    Одновременные запросы одного steam_id ждут один SQL запрос
+    Кеш индексируется SteamID64: STEAM_0:1:N и STEAM_1:1:N — одна запись
   """
 
-  # Проверяем
-  if steam_id in cache_players:
-    return cache_players[steam_id]
-  
-  # SQL
-  response = (await nsroute.call_route("/check_user", steam_id))
+  steam_id64 = to_steamid64(steam_id)
+  if steam_id64 is None:
+    return None
+
+  discord_id = steam_cache.get(steam_id64, MISS)
+  if discord_id is not MISS:
+    metrics.inc("check_steam_lookups_total", tier="local")
+    return discord_id
+
+  return await steam_cache.get_or_load(steam_id64, lambda: load_steam(steam_id64))
+
+# -- load_steam
+async def load_steam(steam_id64: int):
+  """Промах первого уровня: ключ в Redis, затем /check_user; ответ базы сохраняется в Redis с TTL."""
+  version = steam_cache.version
+  key = steam_cache_key(steam_id64)
+  if rc.connected:
+    try:
+      cached = await rc.value_get(key)
+    except Exception as err:
+      logger.warning(f"Redis: CheckSteam: не удалось прочитать {key}: {err}")
+    else:
+      if cached is not None:
+        metrics.inc("check_steam_lookups_total", tier="redis")
+        # В Redis id хранится строкой; /GetMember ждёт int
+        cached = _decode(cached)
+        return int(cached) if cached else None
+
+  metrics.inc("check_steam_lookups_total", tier="db")
+  discord_id = await nsroute.call_route("/check_user", steam_id64)
+
+  # Если за время запроса связь изменилась (ev_user_changed сменил версию), ответ мог устареть — в Redis не пишем
+  if rc.connected and steam_cache.version == version:
+    ttl = getattr(config, "REDIS_CHECK_STEAM_TTL", 600) if discord_id else getattr(config, "REDIS_CHECK_STEAM_NEGATIVE_TTL", 60)
+    try:
+      await rc.value_set(key, str(discord_id) if discord_id else "", ttl)
+    except Exception as err:
+      logger.warning(f"Redis: CheckSteam: не удалось сохранить {key}: {err}")
+  # users.discord_id — VARCHAR: ответ базы приводится к тому же типу, что и ответ из Redis
+  return int(discord_id) if discord_id else None
+
+# -- steam_cache_key
+def steam_cache_key(steam_id64: int) -> str:
+  return f"{RedisTable.CheckSteam}:{steam_id64}"
+
+# -- ev_user_changed
+@observer.subscribe(Event.DB_USER_CHANGED)
+async def ev_user_changed(data):
+  """Регистрация или её удаление закоммичены: сбрасываем связь на обоих уровнях кеша CheckSteam."""
+  steam_id64 = data.get("steam_id64")
+  if steam_id64 is None:
+    steam_cache.clear()
+    return
 
-  if response is None:
-    cache_players[steam_id] = None
+  steam_cache.invalidate(steam_id64)
+  if rc.connected:
+    try:
+      await rc.delete_keys(steam_cache_key(steam_id64))
+    except Exception as err:
+      logger.warning(f"Redis: CheckSteam: не удалось удалить {steam_cache_key(steam_id64)}: {err}")
 
-  else:
-    cache_players[steam_id] = response
+def _collect_check_steam(registry) -> None:
+  lookups = {tier: registry.get_counter("check_steam_lookups_total", tier=tier) for tier in ("local", "redis", "db")}
+  total = sum(lookups.values())
+  for tier, count in lookups.items():
+    registry.set_gauge("check_steam_hit_ratio", count / total if total else 0.0, tier=tier)
 
-  return cache_players[steam_id]
+metrics.add_collector(_collect_check_steam)
 
 # -- route_get_offline_players
-@nsroute.create_route("/redis/get_offline_players")
+@nsroute.create_route("/redis/get_offline_players", timeout=1.5, max_concurrency=8, failure_threshold=3, reset_timeout=15, fallback=None)
 @require_connection
 async def route_get_offline_players() -> list:
-  last_players: list = await rc.list_get(RedisTable.LastPlayers, 0)
+  # По возрастанию времени последнего появления — тот же порядок, что был у списка
+  last_players: list = await rc.zset_range(RedisTable.LastPlayers, 0)
   return [player.decode('utf-8') for player in last_players]
 
 # -- route_get_banned_players
-@nsroute.create_route("/redis/get_banned_players")
+@nsroute.create_route("/redis/get_banned_players", timeout=1.5, max_concurrency=8, failure_threshold=3, reset_timeout=15, fallback=None)
 @require_connection
 async def route_get_banned_players() -> list:
-  banned_players: list = await rc.list_get(RedisTable.BannedPlayers, 0)
-  return [player.decode('utf-8') for player in banned_players]
+  """Активные баны в порядке выдачи; истёкшие временные баны предварительно снимаются."""
+  await purge_expired_bans()
+  bans = await rc.items_hash(RedisTable.BannedPlayers)
+  return sorted(bans, key=lambda target: _ban_field(bans[target], "banned_at"))
+
+def _ban_field(raw: str, name: str, default=0):
+  try:
+    return json.loads(raw).get(name, default)
+  except (ValueError, AttributeError):
+    return default
+
+# -- route_save_runtime_state
+@nsroute.create_route("/redis/runtime_state/save", timeout=1.5, failure_threshold=3, reset_timeout=15, fallback=None)
+@require_connection
+async def route_save_runtime_state(sections: Dict[str, str]) -> bool:
+  """Сохраняет секции состояния бота (секция -> JSON) одной командой HSET."""
+  async with rc.pipeline(transaction=False) as pipe:
+    pipe.hset(RedisTable.RuntimeState, mapping=sections)
+    await rc.execute_pipeline(pipe)
+  return True
+
+# -- route_load_runtime_state
+@nsroute.create_route("/redis/runtime_state/load", timeout=1.5, failure_threshold=3, reset_timeout=15, fallback=None)
+@require_connection
+async def route_load_runtime_state() -> Dict[str, str]:
+  return await rc.items_hash(RedisTable.RuntimeState)
+
+# SECTION Ретрансляция чата CS -> Discord (Redis Streams)
+
+# Необязательна: при пустом CHAT_RELAY_STREAM сообщения копятся только в памяти бота (bot_server.cs_message_buffer).
+# Вебхук добавляет сообщение в поток (XADD, MAXLEN ~ CHAT_RELAY_MAXLEN), отправитель в Discord читает его
+# через группу потребителей и подтверждает (XACK) только после успешной отправки — доставка «хотя бы раз».
+CHAT_RELAY_GROUP = "discord"
+CHAT_RELAY_CONSUMER = f"{socket.gethostname()}-{os.getpid()}"
+chat_relay_last_claim: float = 0.0
+
+def chat_relay_stream() -> str:
+  return getattr(config, "CHAT_RELAY_STREAM", "") or ""
+
+def _relay_message(entry) -> tuple:
+  entry_id, fields = entry
+  return _decode(entry_id), _decode(fields.get(b"m", fields.get("m", b"")))
+
+# -- route_chat_relay_append
+@nsroute.create_route("/redis/chat_relay/append", timeout=1.0, max_concurrency=16, failure_threshold=3, reset_timeout=15, fallback=None)
+@require_connection
+async def route_chat_relay_append(message: str) -> Optional[str]:
+  """Добавляет сообщение чата CS в поток; None — поток выключен или Redis недоступен (сообщение остаётся в памяти)."""
+  stream = chat_relay_stream()
+  if not stream:
+    return None
+  entry_id = await rc.stream_add(stream, {"m": message}, maxlen=getattr(config, "CHAT_RELAY_MAXLEN", 10000))
+  return _decode(entry_id)
+
+# -- route_chat_relay_read
+@nsroute.create_route("/redis/chat_relay/read", timeout=1.5, failure_threshold=3, reset_timeout=15, fallback=None)
+@require_connection
+async def route_chat_relay_read(count: int = 100) -> list:
+  """
+    Очередная пачка [(id, сообщение)] для отправки в Discord, по порядку:
+    неподтверждённые записи этого процесса (прошлая отправка не удалась или процесс перезапущен),
+    зависшие записи других процессов (раз в CHAT_RELAY_CLAIM_IDLE_SEC — резервный процесс подхватывает поток),
+    затем новые записи
+  """
+  global chat_relay_last_claim
+  stream = chat_relay_stream()
+  if not stream:
+    return []
+
+  try:
+    entries = await rc.stream_read_group(stream, CHAT_RELAY_GROUP, CHAT_RELAY_CONSUMER, "0", count)
+    if entries:
+      metrics.inc("chat_relay_redelivered_total", len(entries))
+      return [_relay_message(entry) for entry in entries]
+
+    idle_sec = getattr(config, "CHAT_RELAY_CLAIM_IDLE_SEC", 30)
+    if time.monotonic() - chat_relay_last_claim >= idle_sec:
+      chat_relay_last_claim = time.monotonic()
+      entries = await rc.stream_claim_idle(stream, CHAT_RELAY_GROUP, CHAT_RELAY_CONSUMER, int(idle_sec * 1000), count)
+      if entries:
+        metrics.inc("chat_relay_claimed_total", len(entries))
+        logger.warning(f"Redis: чат: подхвачено {len(entries)} неотправленных сообщений другого процесса")
+        return [_relay_message(entry) for entry in entries]
+
+    entries = await rc.stream_read_group(stream, CHAT_RELAY_GROUP, CHAT_RELAY_CONSUMER, ">", count)
+  except Exception as err:
+    # Поток или группу удалили вручную — создаём заново, записи придут со следующим чтением
+    if "NOGROUP" not in str(err):
+      raise
+    await rc.stream_group_create(stream, CHAT_RELAY_GROUP)
+    return []
+  return [_relay_message(entry) for entry in entries]
+
+# -- route_chat_relay_ack
+@nsroute.create_route("/redis/chat_relay/ack", timeout=1.0, failure_threshold=3, reset_timeout=15, fallback=None)
+@require_connection
+async def route_chat_relay_ack(ids: list) -> int:
+  stream = chat_relay_stream()
+  if not stream or not ids:
+    return 0
+  return await rc.stream_ack(stream, CHAT_RELAY_GROUP, *ids)
+
+# -- route_chat_relay_history
+@nsroute.create_route("/redis/chat_relay/history", timeout=1.5, max_concurrency=4, failure_threshold=3, reset_timeout=15, fallback=None)
+@require_connection
+async def route_chat_relay_history(count: int = 50) -> list:
+  """Последние count сообщений чата [(id, сообщение)] от старых к новым — без обращения к MySQL."""
+  stream = chat_relay_stream()
+  if not stream:
+    return []
+  return [_relay_message(entry) for entry in reversed(await rc.stream_range_rev(stream, count))]
+
+# !SECTION
+
+# SECTION Автодополнение (:lex-индексы)
+
+# -- lex_key
+def lex_key(table: str) -> str:
+  return f"{table}:lex"
+
+# -- lex_member
+def lex_member(name: str) -> bytes:
+  """Член :lex-индекса: регистронезависимый ключ сортировки и исходное имя через NUL."""
+  return name.lower().encode('utf-8') + b"\x00" + name.encode('utf-8')
+
+def _lex_name(member: bytes) -> str:
+  return member.split(b"\x00", 1)[-1].decode('utf-8')
+
+def _decode(value) -> str:
+  return value.decode('utf-8') if isinstance(value, bytes) else str(value)
+
+def _glob_escape(value: bytes) -> bytes:
+  for char in (b"\\", b"*", b"?", b"[", b"]"):
+    value = value.replace(char, b"\\" + char)
+  return value
+
+# -- rebuild_lex_index
+async def rebuild_lex_index(table: str) -> int:
+  """Пересобирает :lex-индекс набора из самого набора (список, ZSET или HASH); возвращает размер."""
+  kind = await rc.key_type(table)
+  if kind == "list":
+    names = await rc.list_get(table, 0)
+  elif kind == "zset":
+    names = await rc.zset_range(table, 0)
+  elif kind == "hash":
+    names = await rc.keys_hash(table)
+  else:
+    names = []
+
+  members = {lex_member(_decode(name)): 0 for name in names}
+  async with rc.pipeline(transaction=True) as pipe:
+    pipe.delete(lex_key(table))
+    if members:
+      pipe.zadd(lex_key(table), members)
+    await rc.execute_pipeline(pipe)
+  return len(members)
+
+# -- route_autocomplete
+@nsroute.create_route("/redis/autocomplete", timeout=1.0, max_concurrency=16, failure_threshold=3, reset_timeout=15, fallback=None)
+@require_connection
+async def route_autocomplete(dataset: str, current: str, limit: int = 25) -> list:
+  """
+    До limit имён набора для автодополнения без выгрузки всего набора:
+    сначала совпадения по префиксу (ZRANGEBYLEX), затем по вхождению подстроки (ZSCAN MATCH на стороне Redis)
+  """
+  table = AUTOCOMPLETE_DATASETS.get(dataset)
+  if table is None:
+    return []
+  if table == RedisTable.BannedPlayers:
+    await purge_expired_bans()
+
+  key = lex_key(table)
+  needle = (current or "").strip().lower().encode('utf-8')
+  if not needle:
+    return [_lex_name(member) for member in await rc.zset_range_by_lex(key, b"-", b"+", 0, limit)]
+
+  # UTF-8 не содержит байта 0xFF, поэтому "(needle\xff" — верхняя граница всех строк с этим префиксом
+  members = await rc.zset_range_by_lex(key, b"[" + needle, b"(" + needle + b"\xff", 0, limit)
+  names = [_lex_name(member) for member in members]
+  if len(names) < limit:
+    seen = set(members)
+    # Обход ограничен AUTOCOMPLETE_SCAN_PAGES запросами: на большом наборе полный ZSCAN не уложится в таймаут
+    # маршрута, и пользователь не получил бы даже найденных по префиксу имён
+    pattern = b"*" + _glob_escape(needle) + b"*\x00*"
+    async for member in rc.zset_scan(key, match=pattern, count=AUTOCOMPLETE_SCAN_COUNT, max_pages=autocomplete_scan_pages()):
+      if member not in seen:
+        seen.add(member)
+        names.append(_lex_name(member))
+        if len(names) >= limit:
+          break
+  return names
+
+# !SECTION
 
 # -- route_get_map_list_active
-@nsroute.create_route("/redis/get_map_list_active")
+@nsroute.create_route("/redis/get_map_list_active", timeout=1.5, max_concurrency=8, failure_threshold=3, reset_timeout=15, fallback=None)
 @require_connection
 async def route_get_map_list_active() -> list:
   map_list: list = await rc.list_get(RedisTable.MapListActive, 0)
   return [map.decode('utf-8') for map in map_list]
 
 # -- route_get_map_list_all
-@nsroute.create_route("/redis/get_map_list_all")
+@nsroute.create_route("/redis/get_map_list_all", timeout=1.5, max_concurrency=8, failure_threshold=3, reset_timeout=15, fallback=None)
 @require_connection
 async def route_get_map_list_all() -> list:
   map_list: list = await rc.list_get(RedisTable.MapListAll, 0 )
   return [map.decode('utf-8') for map in map_list]
 
 # -- route_update_map_list
-@nsroute.create_route("/redis/update_map_list")
+@nsroute.create_route("/redis/update_map_list", timeout=2.0, failure_threshold=3, reset_timeout=15, fallback=None)
 @require_connection
 async def route_update_map_list(type, map_name, activated=None):
+  member = {lex_member(map_name): 0}
   if type == "add":
     await rc.list_add(RedisTable.MapListAll, map_name)
+    await rc.zset_add(lex_key(RedisTable.MapListAll), member)
     if activated == 1:
       await rc.list_add(RedisTable.MapListActive, map_name)
+      await rc.zset_add(lex_key(RedisTable.MapListActive), member)
 
     
   elif type == "delete":
     await rc.list_delete(RedisTable.MapListAll, map_name)
     await rc.list_delete(RedisTable.MapListActive, map_name)
+    await rc.zset_remove(lex_key(RedisTable.MapListAll), *member)
+    await rc.zset_remove(lex_key(RedisTable.MapListActive), *member)
 
     
   elif type == "update":
@@ -190,5 +710,7 @@ async def route_update_map_list(type, map_name, activated=None):
       # Нужно удалить, чтобы не было повторений
       await rc.list_delete(RedisTable.MapListActive, map_name)
       await rc.list_add(RedisTable.MapListActive, map_name)
+      await rc.zset_add(lex_key(RedisTable.MapListActive), member)
     elif activated == 0:
-      await rc.list_delete(RedisTable.MapListActive, map_name)
\ No newline at end of file
+      await rc.list_delete(RedisTable.MapListActive, map_name)
+      await rc.zset_remove(lex_key(RedisTable.MapListActive), *member)
\ No newline at end of file
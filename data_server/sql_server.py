@@ -1,24 +1,60 @@
-from observer.observer_client import observer, logger, nsroute, Event, Param
-from data_server.asyncsql import AioMysql, QueryError, ConnectionError as aioConnectionError
+from observer.observer_client import observer, logger, nsroute, caches, CacheRegion, MISS, Event, Param
+from data_server.asyncsql import AioMysql, CircuitOpenError, QueryError, TransactionError, ConnectionError as aioConnectionError
+from data_server.user_sync import UserAssociationSync
+from data_server.migrate import apply_migrations, explain_lookups
+from data_server.write_behind import WriteBehindBuffer
+from data_server.sqlite_backend import AioSqlite
+from data_server.map_import import MAX_IMPORT_BYTES, MapImportRow, import_maps, parse_map_list
+from data_server.steamid import STEAMID64_BASE, to_steam2, to_steamid64
+from observer.startup import StartupReport
 
 import discord
-import re
+import functools
 import asyncio
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional, Any
 
 import config
 
-mysql: AioMysql = AioMysql(host=config.DB_HOST,
-                           port=config.DB_PORT,
-                           user=config.DB_USER,
-                           password=config.DB_PASSWORD,
-                           db=config.DB_NAME)
+# -- create_database()
+def create_database() -> AioMysql:
+  """MySQL или локальная замена на SQLite (config.DB_BACKEND = 'sqlite') с тем же интерфейсом."""
+  if getattr(config, "DB_BACKEND", "mysql") == "sqlite":
+    return AioSqlite(getattr(config, "DB_SQLITE_PATH", "local.sqlite3"),
+                     slow_query_ms=getattr(config, "DB_SLOW_QUERY_MS", 200))
+
+  return AioMysql(host=config.DB_HOST,
+                  port=config.DB_PORT,
+                  user=config.DB_USER,
+                  password=config.DB_PASSWORD,
+                  db=config.DB_NAME,
+                  failure_threshold=getattr(config, "DB_BREAKER_FAILURE_THRESHOLD", 3),
+                  reset_timeout=getattr(config, "DB_BREAKER_RESET_SEC", 15),
+                  minsize=getattr(config, "DB_POOL_MINSIZE", 1),
+                  maxsize=getattr(config, "DB_POOL_MAXSIZE", 10),
+                  pool_recycle=getattr(config, "DB_POOL_RECYCLE_SEC", 300),
+                  slow_query_ms=getattr(config, "DB_SLOW_QUERY_MS", 200))
+
+mysql: AioMysql = create_database()
+
+users_sync: UserAssociationSync = UserAssociationSync(
+  mysql,
+  full_sync_every=getattr(config, "USERS_FULL_SYNC_EVERY", 12),
+)
 
-# Кеши для хранения данных
-steam_discord_cache: Dict[str, int] = {}
-discord_steam_cache: Dict[int, str] = {}
-map_list_cache: List[Tuple[str, int]] = []
+# Интервалы обновления кешей (в секундах)
+CACHE_UPDATE_INTERVAL = 300  # 5 минут
+CACHE_RETRY_INTERVAL = 15  # пока кеши не прогреты (не было соединения при запуске)
+
+# Кеши — области CacheManager (observer/cache_manager.py), лимиты переопределяются config.CACHE_REGIONS.
+# Ассоциации — полная копия таблицы users, целиком подменяется синхронизацией (без TTL)
+steam_discord_cache: CacheRegion = caches.region("steam_discord")
+discord_steam_cache: CacheRegion = caches.region("discord_steam")
+# Список карт под одним ключом; сбрасывается после изменений maps, TTL — страховка от пропущенного сброса
+map_list_cache: CacheRegion = caches.region("map_list", ttl=CACHE_UPDATE_INTERVAL * 2)
+# Таблица maps изменена здесь или в другом процессе (через шину кешей): список перечитается при следующем запросе
+caches.invalidate_on(Event.DB_MAPS_CHANGED, "map_list")
+MAP_LIST_KEY = "all"
 
 # Метаданные для кешей
 cache_last_update = {
@@ -26,14 +62,60 @@ cache_last_update = {
     "map_list": datetime.min
 }
 
-# Интервалы обновления кешей (в секундах)
-CACHE_UPDATE_INTERVAL = 300  # 5 минут
+# Горячие запросы поиска; индексы для них создают миграции 0002_lookup_indexes.sql и 0003_steam_id64.sql.
+# Steam ID ищется по нормализованному steam_id64 (data_server/steamid.py), а не по введённой строке.
+# OR по двум колонкам не использует один индекс, поэтому проверка регистрации — UNION ALL двух индексных поисков
+USER_EXISTS_QUERY = (
+  "SELECT 1 FROM users WHERE discord_id = %s "
+  "UNION ALL "
+  "SELECT 1 FROM users WHERE steam_id64 = %s "
+  "LIMIT 1"
+)
+MAP_EXISTS_QUERY = "SELECT EXISTS(SELECT 1 FROM maps WHERE map_name = %s LIMIT 1)"
+DISCORD_BY_STEAM_QUERY = "SELECT discord_id FROM users WHERE steam_id64 = %s LIMIT 1"
+STEAM_BY_DISCORD_QUERY = "SELECT steam_id64 FROM users WHERE discord_id = %s LIMIT 1"
+
+HOT_LOOKUPS = {
+  "user_exists": (USER_EXISTS_QUERY, ("0", STEAMID64_BASE + 1)),
+  "map_exists": (MAP_EXISTS_QUERY, ("de_dust2",)),
+  "discord_by_steam": (DISCORD_BY_STEAM_QUERY, (STEAMID64_BASE + 1,)),
+}
+
+# Без колонки steam_id64 (миграция 0003 не применена: DB_AUTO_MIGRATE=False или ошибка миграции)
+# поиск идёт по текстовому steam_id в обеих формах STEAM_0/STEAM_1
+LEGACY_USER_EXISTS_QUERY = (
+  "SELECT 1 FROM users WHERE discord_id = %s "
+  "UNION ALL "
+  "SELECT 1 FROM users WHERE steam_id IN (%s, %s) "
+  "LIMIT 1"
+)
+LEGACY_DISCORD_BY_STEAM_QUERY = "SELECT discord_id FROM users WHERE steam_id IN (%s, %s) LIMIT 1"
+LEGACY_STEAM_BY_DISCORD_QUERY = "SELECT steam_id FROM users WHERE discord_id = %s LIMIT 1"
+
+LEGACY_HOT_LOOKUPS = {
+  "user_exists": (LEGACY_USER_EXISTS_QUERY, ("0", "STEAM_0:0:1", "STEAM_1:0:1")),
+  "map_exists": (MAP_EXISTS_QUERY, ("de_dust2",)),
+  "discord_by_steam": (LEGACY_DISCORD_BY_STEAM_QUERY, ("STEAM_0:0:1", "STEAM_1:0:1")),
+}
+
+STEAM_ID64_COLUMN_QUERY = (
+  "SELECT COUNT(*) FROM information_schema.COLUMNS "
+  "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'users' AND COLUMN_NAME = 'steam_id64'"
+)
+# Проверяется при запуске (probe_steam_id64); у SQLite колонка есть всегда
+steam_id64_enabled: bool = True
+# prepare_schema выполнена; если MySQL был недоступен при запуске — её догоняет update_cache_task
+schema_prepared: bool = False
+
+def steam_forms(steam_id64: int) -> Tuple[str, str]:
+  return to_steam2(steam_id64), to_steam2(steam_id64, universe=1)
 
 # SECTION Utility
 
 # -- @require_connection
 def require_connection(func) -> callable:
   
+  @functools.wraps(func)
   async def wrapper(*args, **kwargs) -> callable:
     if mysql.is_connected():
       return await func(*args, **kwargs)
@@ -47,19 +129,15 @@ def require_connection(func) -> callable:
 
 # -- steam_record_exist
 @require_connection
-async def steam_record_exist(user_id: str, steam_id: str):
-  query = "SELECT COUNT(*) FROM users WHERE discord_id = %s OR steam_id = %s"
-  query_values = (user_id, steam_id)
-
+async def steam_record_exist(user_id: str, steam_id64: int):
   try:
-    response = await mysql.execute_select(query, query_values)
-
-    if not response or not response[0]:
-      return False  # Если нет результатов, возвращаем False
-
-    rows = response[0][0]
+    if steam_id64_enabled:
+      response = await mysql.execute_select(USER_EXISTS_QUERY, (user_id, steam_id64))
+    else:
+      response = await mysql.execute_select(LEGACY_USER_EXISTS_QUERY, (user_id, *steam_forms(steam_id64)))
 
-    return rows != 0
+    # UNION ALL ... LIMIT 1 возвращает одну строку, если запись найдена, и пустой результат иначе
+    return bool(response)
   except QueryError as err:
     logger.error(f"{err}")
     return False
@@ -67,101 +145,134 @@ async def steam_record_exist(user_id: str, steam_id: str):
 # -- map_record_exist
 @require_connection
 async def map_record_exist(map_name: str):
-  query = "SELECT COUNT(*) FROM maps WHERE map_name = %s"
   query_values = (map_name,)
 
   try:
-    response = await mysql.execute_select(query, query_values)
+    response = await mysql.execute_select(MAP_EXISTS_QUERY, query_values)
 
     if not response or not response[0]:
       return False  # Если нет результатов, возвращаем False
 
-    rows = response[0][0]
-
-    return rows != 0
+    return bool(response[0][0])
   except QueryError as err:
     logger.error(f"{err}")
     return None
 
-# -- check_steam_id
-def check_steam_id(steam_id: str):
-  pattern = r'^(STEAM|VALVE)_[0-9]:[0-9]:[0-9]{1,12}$'
-  return bool(re.match(pattern, steam_id))
-
 # !SECTION
 
-# -- ev_ready
-@observer.subscribe(Event.BE_READY)
-async def ev_ready():
+# -- ev_startup
+@observer.subscribe(Event.BE_STARTUP)
+async def ev_startup(report: StartupReport):
+    """Connects before the Discord gateway and warms the caches, so /CheckSteam hits right after a restart."""
     try:
         # AioMysql.connect() now handles its own monitoring and reconnections.
-        await mysql.connect() 
+        async with report.step("mysql.connect"):
+            await mysql.connect()
         if mysql.is_connected():
             logger.info("MySQL: Connection established and monitoring started.")
+            async with report.step("mysql.schema"):
+                await prepare_schema()
+            await refresh_caches(report)
         else:
             # This case should ideally be handled by AioMysql's connect retries.
             # If connect() fails after retries, it will raise ConnectionError.
             logger.error("MySQL: Failed to connect despite retries. Monitoring will attempt to reconnect.")
-        
-        # The cache update task can still be started here.
-        # It will rely on mysql.is_connected() to determine if it should run.
-        asyncio.create_task(update_cache_task())
     except aioConnectionError as err: # Ensure this is the correct exception type from asyncsql.py
         logger.error(f"MySQL: Connection failed on startup: {err}. Background monitoring will attempt to reconnect.")
-        # Still start update_cache_task, as it checks for connection.
-        asyncio.create_task(update_cache_task())
     except Exception as e:
         logger.critical(f"MySQL: Unexpected error during initial connection setup: {e}")
-        # Still start update_cache_task
+    finally:
+        # The cache update task relies on mysql.is_connected() to determine if it should run.
         asyncio.create_task(update_cache_task())
 
+async def prepare_schema():
+  """Применяет миграции из data_server/migrations и проверяет планы горячих запросов."""
+  global schema_prepared
+  schema_prepared = True
+  if mysql.dialect != "mysql":
+    return  # схему SQLite создаёт сам AioSqlite, миграции и EXPLAIN написаны для MySQL
+
+  if getattr(config, "DB_AUTO_MIGRATE", True):
+    try:
+      await apply_migrations(mysql)
+    except Exception as err:
+      logger.error(f"MySQL: ошибка применения миграций: {err}")
+
+  await probe_steam_id64()
+
+  try:
+    report = await explain_lookups(mysql, HOT_LOOKUPS if steam_id64_enabled else LEGACY_HOT_LOOKUPS)
+  except Exception as err:
+    logger.warning(f"MySQL: EXPLAIN-проверка не выполнена: {err}")
+    return
+
+  for name, problems in report.items():
+    if problems:
+      logger.warning(f"MySQL: запрос {name} не использует индекс: {'; '.join(problems)}")
+
+async def probe_steam_id64() -> bool:
+  """Есть ли users.steam_id64 (миграция 0003); без неё /reg, /unreg и /check_user ищут по steam_id."""
+  global steam_id64_enabled
+  try:
+    response = await mysql.execute_select(STEAM_ID64_COLUMN_QUERY)
+  except Exception as err:
+    logger.warning(f"MySQL: не удалось проверить колонку users.steam_id64: {err}")
+    return steam_id64_enabled
+
+  steam_id64_enabled = bool(response) and bool(response[0][0])
+  if not steam_id64_enabled:
+    logger.error("MySQL: миграция 0003_steam_id64.sql не применена, поиск по Steam ID идёт по текстовому steam_id без индекса SteamID64")
+  return steam_id64_enabled
+
+async def refresh_caches(report: Optional[StartupReport] = None):
+  """
+  Параллельно обновляет кеш ассоциаций Steam ID <-> Discord ID и кеш списка карт.
+  report — отчёт фазы запуска, в который пишутся тайминги шагов.
+  """
+  if report is None:
+    await asyncio.gather(update_user_associations_cache(), update_map_list_cache())
+  else:
+    await asyncio.gather(
+      report.run("cache.users", update_user_associations_cache()),
+      report.run("cache.maps", update_map_list_cache()),
+    )
+  logger.info("MySQL: Кеши успешно обновлены")
+
 async def update_cache_task():
   """
   Периодически обновляет кеши данных из MySQL.
-  Позволяет работать приложению даже при временных проблемах с соединением.
+  Первое заполнение делает ev_startup; если при запуске соединения не было,
+  следующая попытка — через CACHE_RETRY_INTERVAL, а не через полный интервал.
   """
   while True:
-    # Подождем немного, чтобы не обновлять кеш сразу при запуске
-    await asyncio.sleep(5)  
-    
+    warmed = cache_last_update["steam_discord"] != datetime.min
+    await asyncio.sleep(CACHE_UPDATE_INTERVAL if warmed else CACHE_RETRY_INTERVAL)
+
     if mysql.is_connected():
       try:
-        # Обновляем кеш ассоциаций Steam ID <-> Discord ID
-        await update_user_associations_cache()
-        
-        # Обновляем кеш списка карт
-        await update_map_list_cache()
-        
-        logger.info("MySQL: Кеши успешно обновлены")
+        if not schema_prepared:
+          await prepare_schema()
+        await refresh_caches()
       except Exception as e:
         logger.error(f"MySQL: Ошибка при обновлении кешей: {e}")
     else:
       logger.warning("MySQL: Нет соединения, пропускаем обновление кешей")
-    
-    # Ждем определенное время перед следующим обновлением
-    await asyncio.sleep(CACHE_UPDATE_INTERVAL)
 
 async def update_user_associations_cache():
   """
-  Загружает все ассоциации Steam ID <-> Discord ID из базы данных в кеш.
+  Обновляет кеш ассоциаций Steam ID <-> Discord ID.
+  Читаются только изменения после водяного знака (см. data_server/user_sync.py),
+  новые словари подменяют старые целиком — кеш не бывает пустым во время обновления.
   """
-  query = "SELECT steam_id, discord_id FROM users"
-  
   try:
-    response = await mysql.execute_select(query)
-    
-    if response:
-      # Очищаем текущие кеши
-      steam_discord_cache.clear()
-      discord_steam_cache.clear()
-      
-      # Заполняем кеши новыми данными
-      for steam_id, discord_id in response:
-        steam_discord_cache[steam_id] = discord_id
-        discord_steam_cache[discord_id] = steam_id
-      
-      cache_last_update["steam_discord"] = datetime.now()
+    result = await users_sync.sync(steam_discord_cache.view(), discord_steam_cache.view())
+
+    if result is not None:
+      steam_discord_cache.replace(result[0])
+      discord_steam_cache.replace(result[1])
       logger.info(f"MySQL: Обновлен кеш ассоциаций пользователей: {len(steam_discord_cache)} записей")
+
+    cache_last_update["steam_discord"] = datetime.now()
   except Exception as e:
     logger.error(f"MySQL: Ошибка при обновлении кеша ассоциаций: {e}")
 
@@ -175,10 +286,9 @@ async def update_map_list_cache():
     response = await mysql.execute_select(query)
     
     if response:
-      global map_list_cache
-      map_list_cache = response
+      map_list_cache.set(MAP_LIST_KEY, response)
       cache_last_update["map_list"] = datetime.now()
-      logger.info(f"MySQL: Обновлен кеш списка карт: {len(map_list_cache)} записей")
+      logger.info(f"MySQL: Обновлен кеш списка карт: {len(response)} записей")
   except Exception as e:
     logger.error(f"MySQL: Ошибка при обновлении кеша списка карт: {e}")
 
@@ -189,15 +299,17 @@ async def update_map_list_cache():
 async def ev_reg(data):
   interaction: discord.Interaction = data[Param.Interaction]
   user_id: str = str(interaction.user.id)
-  steam_id: str = data['steam_id']
+  # STEAM_X:Y:Z, [U:1:N] или SteamID64; в steam_id сохраняется каноническая форма STEAM_0:Y:Z
+  steam_id64 = to_steamid64(data['steam_id'])
 
   # проверяем стим айди на валидность
-  if not check_steam_id(steam_id):
+  if steam_id64 is None:
     await interaction.followup.send('Неправильный формат SteamID', ephemeral=True)
     return
+  steam_id: str = to_steam2(steam_id64)
 
   # проверяем существует ли запись
-  if await steam_record_exist(user_id, steam_id):
+  if await steam_record_exist(user_id, steam_id64):
     await interaction.followup.send(f'Данные для данного SteamID или вашего аккаунта уже существуют.', ephemeral=True)
     return
 
@@ -205,14 +317,19 @@ async def ev_reg(data):
   username = interaction.user.name
   ds_username = interaction.user.display_name
 
-  query = "INSERT INTO users (discord_id, ds_name, ds_display_name, steam_id) VALUES (%s, %s, %s, %s)"
-  query_values = (user_id, username, ds_username, steam_id)
+  if steam_id64_enabled:
+    query = "INSERT INTO users (discord_id, ds_name, ds_display_name, steam_id, steam_id64) VALUES (%s, %s, %s, %s, %s)"
+    query_values = (user_id, username, ds_username, steam_id, steam_id64)
+  else:
+    query = "INSERT INTO users (discord_id, ds_name, ds_display_name, steam_id) VALUES (%s, %s, %s, %s)"
+    query_values = (user_id, username, ds_username, steam_id)
 
   try:
     rows = await mysql.execute_change(query, query_values)
     if rows == 0:
       await interaction.followup.send('Не удалось сохранить данные', ephemeral=True)
     else:
+      await observer.notify(Event.DB_USER_CHANGED, {"steam_id64": steam_id64, "discord_id": user_id})
       await interaction.followup.send('Данные сохранены!', ephemeral=True)
   except QueryError as err:
     logger.error(f"{err}")
@@ -225,21 +342,51 @@ async def ev_unreg(data):
   interaction: discord.Interaction = data[Param.Interaction]
   user_id = str(interaction.user.id)
 
-  query = "DELETE FROM users WHERE discord_id = %s"
-  query_values = (user_id,)
-
   try:
-    rows = await mysql.execute_change(query, query_values)
+    # SteamID64 нужен для сброса кеша CheckSteam; после удаления его уже не узнать
+    steam_id = discord_steam_cache.get(user_id) or discord_steam_cache.get(interaction.user.id)
+    if steam_id is None:
+      if steam_id64_enabled:
+        response = await mysql.execute_select(STEAM_BY_DISCORD_QUERY, (user_id,))
+        steam_id = response[0][0] if response else None
+      else:
+        response = await mysql.execute_select(LEGACY_STEAM_BY_DISCORD_QUERY, (user_id,))
+        steam_id = to_steamid64(response[0][0]) if response else None
+
+    rows = await users_sync.delete_user(user_id)
 
     if rows == 0:
       await interaction.followup.send('Данные не найдены', ephemeral=True)
     else:
+      discord_steam_cache.pop(user_id, None)
+      discord_steam_cache.pop(interaction.user.id, None)
+      if steam_id is not None:
+        steam_discord_cache.pop(steam_id, None)
+      await observer.notify(Event.DB_USER_CHANGED, {"steam_id64": steam_id, "discord_id": user_id})
       await interaction.followup.send('Данные удалены!', ephemeral=True)
 
-  except QueryError as err:
+  except (QueryError, TransactionError) as err:
     logger.error(f"{err}")
     await interaction.followup.send('Ошибка!', ephemeral=True)
     
+# -- ev_user_changed
+@observer.subscribe(Event.DB_USER_CHANGED)
+async def ev_user_changed(data):
+  """Связь изменена здесь или в другом процессе (через шину кешей): убираем её из кеша ассоциаций."""
+  steam_id64 = data.get("steam_id64")
+  if steam_id64 is None:
+    # Что именно изменилось, неизвестно (пропущены сообщения шины) — дочитываем изменения из базы
+    if mysql.is_connected():
+      await update_user_associations_cache()
+    return
+
+  steam_discord_cache.pop(steam_id64, None)
+  discord_id = data.get("discord_id")
+  if discord_id is not None:
+    discord_steam_cache.pop(str(discord_id), None)
+    if str(discord_id).isdigit():
+      discord_steam_cache.pop(int(discord_id), None)
+
 # -- ev_map_add
 @observer.subscribe(Event.BC_DB_MAP_ADD)
 @require_connection
@@ -265,6 +412,7 @@ async def ev_map_add(data):
     if rows == 0:
       await interaction.followup.send('Не удалось добавить карту', ephemeral=True)
     else:
+      await observer.notify(Event.DB_MAPS_CHANGED, {"map_name": data['map_name']})
       await interaction.followup.send('Карта добавлена!', ephemeral=True)
   except QueryError as err:
     logger.error(f"{err}")
@@ -288,6 +436,7 @@ async def ev_map_delete(data):
     if rows == 0:
       await interaction.followup.send('Такой карты не существует', ephemeral=True)
     else:
+      await observer.notify(Event.DB_MAPS_CHANGED, {"map_name": data['map_name']})
       await interaction.followup.send('Карта удалена!', ephemeral=True)
   except QueryError as err:
     logger.error(f"{err}")
@@ -343,6 +492,7 @@ async def ev_map_update(data):
     if rows == 0:
       await interaction.followup.send('Такой карты не существует', ephemeral=True)
     else:
+      await observer.notify(Event.DB_MAPS_CHANGED, {"map_name": data['map_name']})
       await interaction.followup.send('Карта Обновлена!', ephemeral=True)
   except QueryError as err:
     logger.error(f"{err}")
@@ -351,32 +501,101 @@ async def ev_map_update(data):
   # Обновляем в редис
   await nsroute.call_route("/redis/update_map_list", "update", data['map_name'], data['activated'])
   
-# -- ev_member_update
-@observer.subscribe(Event.BE_MEMBER_UPDATE)
+# -- ev_map_import
+@observer.subscribe(Event.BC_DB_MAP_IMPORT)
 @require_connection
-async def ev_member_update(data):
-  ds_id = data['user_id']
-  new_username = data['new_username']
+async def ev_map_import(data):
+  """Массовое добавление карт из mapcycle.txt/CSV: одна транзакция в БД и одна пересборка списков в Redis."""
+  interaction: discord.Interaction = data[Param.Interaction]
+  attachment: discord.Attachment = data['file']
 
-  query = "UPDATE users SET ds_display_name = %s WHERE discord_id = %s"
-  query_values = (new_username, str(ds_id))
+  if attachment.size is not None and attachment.size > MAX_IMPORT_BYTES:
+    await interaction.followup.send(f'Файл слишком большой (лимит {MAX_IMPORT_BYTES // 1024} КБ)', ephemeral=True)
+    return
 
   try:
-    await mysql.execute_change(query, query_values)
-  except QueryError as err:
-    logger.error(f"{err}")
+    text = (await attachment.read()).decode('utf-8-sig', errors='replace')
+  except (discord.HTTPException, discord.NotFound) as err:
+    logger.error(f"MySQL: не удалось скачать файл импорта карт {attachment.filename}: {err}")
+    await interaction.followup.send('Не удалось получить файл', ephemeral=True)
+    return
+
+  defaults = MapImportRow('', data['activated'], data['min_players'], data['max_players'], data['priority'])
+  rows, report = parse_map_list(text, defaults)
+
+  try:
+    await import_maps(mysql, rows, report)
+  except (QueryError, TransactionError) as err:
+    logger.error(f"MySQL: импорт карт откатан: {err}")
+    await interaction.followup.send('Ошибка! Импорт отменён, ни одна карта не добавлена.', ephemeral=True)
+    return
+
+  logger.info(f"MySQL: {interaction.user.display_name} импортировал карты: {report.summary().splitlines()[0]}")
+
+  if report.inserted:
+    await observer.notify(Event.DB_MAPS_CHANGED, {})
+    # Номер берётся до чтения SQL, как в ev_sync_maps: пересборка по более старому снимку не перезапишет свежую
+    version = await nsroute.call_route("/redis/next_map_list_version")
+    try:
+      maps = await mysql.execute_select("SELECT map_name, activated FROM maps")
+      map_list_cache.set(MAP_LIST_KEY, maps)
+      cache_last_update["map_list"] = datetime.now()
+      await nsroute.call_route("/redis/rebuild_map_lists", maps, version)
+    except QueryError as err:
+      logger.error(f"MySQL: список карт после импорта не перечитан: {err}")
+
+  await interaction.followup.send(report.summary(), ephemeral=True)
+
+# -- flush_display_names
+async def flush_display_names(rows: List[Tuple[str, str]]) -> bool:
+  # Пока MySQL недоступен (или открыт автомат), пачка ждёт в буфере без ошибки в логе на каждый повтор
+  if not mysql.is_connected():
+    return False
+  query = "UPDATE users SET ds_display_name = %s WHERE discord_id = %s"
+  try:
+    await mysql.exec_many(query, rows)
+  except CircuitOpenError:
+    return False  # автомат открылся, пока пачка ждала очереди
+  return True
+
+display_name_buffer: WriteBehindBuffer = WriteBehindBuffer(
+  "display_names",
+  flush_display_names,
+  flush_interval=getattr(config, "DISPLAY_NAME_FLUSH_MS", 500) / 1000,
+  max_rows=getattr(config, "DISPLAY_NAME_FLUSH_ROWS", 200),
+)
+
+# -- ev_member_update
+@observer.subscribe(Event.BE_MEMBER_UPDATE)
+async def ev_member_update(data):
+  """Ставит новое имя в буфер; пачка уходит в БД одной транзакцией через exec_many."""
+  ds_id = str(data['user_id'])
+  display_name_buffer.put(ds_id, (data['new_username'], ds_id))
+
+# -- ev_close
+@observer.subscribe(Event.BE_CLOSE)
+async def ev_close():
+  await display_name_buffer.close()
 
 # -- (route) check_user
 @nsroute.create_route("/check_user")
 async def route_check_user(steam_id):
+  # Кеш и БД индексируются SteamID64: любая принятая форма Steam ID приводится к одному числу
+  steam_id64 = to_steamid64(steam_id)
+  if steam_id64 is None:
+    return None  # BOT, STEAM_ID_LAN и прочее не может быть зарегистрировано
+
   # Сначала проверяем кеш
-  if steam_id in steam_discord_cache:
-    return steam_discord_cache[steam_id]
+  discord_id = steam_discord_cache.get(steam_id64, MISS)
+  if discord_id is not MISS:
+    return discord_id
   
   # Если в кеше нет, пытаемся получить из базы данных, если соединение активно
   if mysql.is_connected():
-    query = "SELECT discord_id FROM users WHERE steam_id = %s"
-    query_values = (steam_id, )
+    if steam_id64_enabled:
+      query, query_values = DISCORD_BY_STEAM_QUERY, (steam_id64,)
+    else:
+      query, query_values = LEGACY_DISCORD_BY_STEAM_QUERY, steam_forms(steam_id64)
 
     try:
       response = await mysql.execute_select(query, query_values)
@@ -387,8 +606,8 @@ async def route_check_user(steam_id):
       discord_id = response[0][0]
       
       # Обновляем кеш
-      steam_discord_cache[steam_id] = discord_id
-      discord_steam_cache[discord_id] = steam_id
+      steam_discord_cache.set(steam_id64, discord_id)
+      discord_steam_cache.set(discord_id, steam_id64)
       
       return discord_id
     except QueryError as err:
@@ -397,17 +616,23 @@ async def route_check_user(steam_id):
   # Если нет соединения или произошла ошибка, возвращаем None
   return None
 
+# -- (route) db/query_top
+@nsroute.create_route("/db/query_top")
+async def route_db_query_top(limit: int = 10, sort: str = "total"):
+  """Топ шаблонов запросов по суммарному времени (или другому ключу из query_stats.SORT_KEYS)."""
+  return mysql.stats.top(limit, sort)
+
 # - (route) get_map_list
-@nsroute.create_route("/get_map_list")
+@nsroute.create_route("/get_map_list", timeout=10.0, failure_threshold=3, reset_timeout=30, fallback=None)
 async def route_get_map_list():
   """
   Возвращает список всех карт из кеша или базы данных.
   Если кеш пустой и соединение с базой есть - обновляет кеш.
   """
-  global map_list_cache
   # Сначала проверяем кеш
-  if map_list_cache:
-    return map_list_cache
+  cached = map_list_cache.get(MAP_LIST_KEY)
+  if cached:
+    return cached
   
   # Если в кеше пусто, пытаемся получить из базы данных, если соединение активно
   if mysql.is_connected():
@@ -420,22 +645,23 @@ async def route_get_map_list():
         return None  # Если нет результатов, возвращаем None
 
       # Обновляем кеш
-      map_list_cache = response
+      map_list_cache.set(MAP_LIST_KEY, response)
       cache_last_update["map_list"] = datetime.now()
       
       return response
     except QueryError as err:
       logger.error(f"{err}")
   
-  # Если нет соединения или произошла ошибка, но у нас есть кеш
-  if map_list_cache:
+  # Если нет соединения или произошла ошибка, но у нас есть кеш (в том числе с истёкшим TTL)
+  stale = map_list_cache.view().get(MAP_LIST_KEY)
+  if stale:
     logger.warning("MySQL: Используем кешированный список карт из-за проблем с БД")
-    return map_list_cache
+    return stale
     
   return None
 
 
-@nsroute.create_route("/db/map_exists")
+@nsroute.create_route("/db/map_exists", timeout=5.0, failure_threshold=3, reset_timeout=30, fallback=None)
 async def route_db_map_exists(map_name: str):
   if not mysql.is_connected():
     logger.error("MySQL: route /db/map_exists без соединения с БД")
@@ -444,7 +670,13 @@ async def route_db_map_exists(map_name: str):
   return await map_record_exist(map_name)
 
 
-@nsroute.create_route("/db/map_add_internal")
+# Без timeout: отмена по таймауту после COMMIT сообщила бы «БД недоступна» о карте, которая уже добавлена
+@nsroute.create_route(
+  "/db/map_add_internal",
+  failure_threshold=3,
+  reset_timeout=30,
+  fallback={"status": "db_unavailable"},
+)
 async def route_db_map_add_internal(
   map_name: str,
   activated: int = 1,
@@ -474,5 +706,6 @@ async def route_db_map_add_internal(
   if rows == 0:
     return {"status": "error"}
 
+  await observer.notify(Event.DB_MAPS_CHANGED, {"map_name": map_name})
   await nsroute.call_route("/redis/update_map_list", "add", map_name, activated)
   return {"status": "added"}
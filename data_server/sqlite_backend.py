@@ -0,0 +1,344 @@
+import asyncio
+import functools
+import os
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, List, Optional, Tuple
+
+from data_server.asyncsql import (
+  AioMysql,
+  ConnectionError,
+  MultipleQueryError,
+  QueryError,
+  TransactionError,
+  describe_batch,
+  describe_query,
+)
+from data_server.query_stats import QueryStats, normalize_query
+from observer.observer_client import logger
+
+# Схема, повторяющая таблицы MySQL, с которыми работает бот (users, maps, users_tombstones).
+# updated_at/tombstones присутствуют для совместимости запросов; delta-sync на SQLite не используется
+DEFAULT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  discord_id TEXT NOT NULL UNIQUE,
+  ds_name TEXT,
+  ds_display_name TEXT,
+  steam_id TEXT NOT NULL UNIQUE,
+  steam_id64 INTEGER UNIQUE,
+  updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_users_updated_at AFTER UPDATE ON users
+FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at
+BEGIN
+  UPDATE users SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE id = NEW.id;
+END;
+
+CREATE TABLE IF NOT EXISTS users_tombstones (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  discord_id TEXT NOT NULL,
+  steam_id TEXT NOT NULL,
+  deleted_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS maps (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  map_name TEXT NOT NULL UNIQUE,
+  activated INTEGER NOT NULL DEFAULT 1,
+  min_players INTEGER NOT NULL DEFAULT 0,
+  max_players INTEGER NOT NULL DEFAULT 32,
+  priority INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# В SQLite блокировку на запись даёт BEGIN IMMEDIATE, FOR UPDATE не поддерживается
+_FOR_UPDATE = re.compile(r"\s+FOR\s+UPDATE\s*;?\s*$", re.IGNORECASE)
+
+
+# -- translate_placeholders
+def translate_placeholders(query: str) -> str:
+  """Переводит плейсхолдеры MySQL (%s, %%) в стиль sqlite3 (?, %), не трогая строковые литералы."""
+  out: List[str] = []
+  quote: Optional[str] = None
+  index = 0
+  length = len(query)
+  while index < length:
+    char = query[index]
+    if quote is not None:
+      out.append(char)
+      if char == quote:
+        quote = None
+    elif char in ("'", '"', "`"):
+      quote = char
+      out.append(char)
+    elif char == "%" and index + 1 < length and query[index + 1] == "s":
+      out.append("?")
+      index += 1
+    elif char == "%" and index + 1 < length and query[index + 1] == "%":
+      out.append("%")
+      index += 1
+    else:
+      out.append(char)
+    index += 1
+  return "".join(out)
+
+
+# SECTION AioSqlite
+class AioSqlite:
+  """Локальная замена AioMysql на SQLite для разработки и бенчмарков (config.DB_BACKEND = 'sqlite').
+
+  Повторяет публичный интерфейс AioMysql: execute_one/execute_select/execute_change,
+  exec_many, fetch_iter, fetch_keyset и transaction(). Все обращения к sqlite3 идут
+  через однопоточный executor, поэтому event loop не блокируется, а соединение
+  используется одним потоком. MySQL-специфичный SQL (NOW(6), INTERVAL, information_schema)
+  не переводится — такие места проверяют mysql.dialect.
+  """
+
+  dialect: str = "sqlite"
+
+  # -- __init__()
+  def __init__(self, path: str, *, schema: Optional[str] = DEFAULT_SCHEMA, slow_query_ms: float = 200.0) -> None:
+    self.path: str = path
+    self.schema: Optional[str] = schema
+    self.conn: Optional[sqlite3.Connection] = None
+    self._executor: Optional[ThreadPoolExecutor] = None
+    # Сериализует операции и удерживается открытой транзакцией от begin() до close()
+    self._lock: asyncio.Lock = asyncio.Lock()
+    self.stats: QueryStats = QueryStats("sqlite", slow_ms=slow_query_ms)
+
+  # -- is_connected
+  def is_connected(self) -> bool:
+    return self.conn is not None
+
+  # -- connect()
+  async def connect(self) -> None:
+    """Открывает файл базы (или :memory:) и создаёт схему."""
+    if self.conn is not None:
+      return
+    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="aiosqlite")
+    try:
+      self.conn = await self._run(self._open)
+    except sqlite3.Error as e:
+      self._executor.shutdown(wait=False)
+      self._executor = None
+      raise ConnectionError(f"AioSqlite: не удалось открыть {self.path}: {e}") from e
+    logger.info(f"AioSqlite: база {self.path} открыта")
+
+  def _open(self) -> sqlite3.Connection:
+    if self.path != ":memory:":
+      directory = os.path.dirname(os.path.abspath(self.path))
+      os.makedirs(directory, exist_ok=True)
+    # isolation_level=None — autocommit, как у пула AioMysql; транзакции открываются явно
+    conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if self.schema:
+      conn.executescript(self.schema)
+    return conn
+
+  # -- _run()
+  async def _run(self, func: Callable, *args) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+
+  # -- _call()
+  async def _call(self, func: Callable, *args) -> Any:
+    if self.conn is None:
+      raise ConnectionError("AioSqlite: база не открыта")
+    async with self._lock:
+      return await self._run(func, *args)
+
+  def _execute_sync(self, query: str, args: Optional[Tuple[Any, ...]]) -> Tuple[int, Optional[List[Tuple[Any, ...]]]]:
+    cursor = self.conn.execute(translate_placeholders(query), tuple(args or ()))
+    try:
+      if cursor.description:
+        rows = cursor.fetchall()
+        return len(rows), rows
+      return cursor.rowcount, None
+    finally:
+      cursor.close()
+
+  def _executemany_sync(self, query: str, args_list: List[Tuple[Any, ...]]) -> None:
+    self.conn.execute("BEGIN")
+    try:
+      self.conn.executemany(translate_placeholders(query), [tuple(args) for args in args_list])
+      self.conn.execute("COMMIT")
+    except BaseException:
+      self.conn.execute("ROLLBACK")
+      raise
+
+  # -- execute_one()
+  async def execute_one(self, query: str, args: Optional[Tuple[Any, ...]] = ()) -> Tuple[int, Optional[List[Tuple[Any, ...]]]]:
+    """Выполняет SQL-запрос и возвращает количество затронутых строк и результат."""
+    return await self._execute("one", query, args)
+
+  # -- execute_change()
+  async def execute_change(self, query: str, args: Optional[Tuple[Any, ...]] = ()) -> int:
+    """Выполняет SQL-запрос, изменяющий данные, и возвращает количество затронутых строк."""
+    affected_rows, _ = await self._execute("change", query, args)
+    return affected_rows
+
+  # -- execute_select()
+  async def execute_select(self, query: str, args: Optional[Tuple[Any, ...]] = ()) -> List[Tuple[Any, ...]]:
+    """Выполняет SQL-запрос на выборку данных и возвращает результат."""
+    _, rows = await self._execute("select", query, args)
+    return rows or []
+
+  async def _execute(self, op: str, query: str, args: Optional[Tuple[Any, ...]]) -> Tuple[int, Optional[List[Tuple[Any, ...]]]]:
+    with self.stats.measure(op, query) as sample:
+      try:
+        affected_rows, rows = await self._call(self._execute_sync, query, args)
+      except sqlite3.Error as e:
+        raise QueryError(f"Ошибка при выполнении запроса: {e}. {describe_query(sample.template, args)}") from e
+      sample.rows = affected_rows
+      return affected_rows, rows
+
+  # -- exec_many()
+  async def exec_many(self, query: str, args_list: List[Tuple[Any, ...]]) -> None:
+    """Выполняет один запрос с разными наборами параметров в одной транзакции."""
+    with self.stats.measure("many", query) as sample:
+      try:
+        await self._call(self._executemany_sync, query, args_list)
+      except sqlite3.Error as e:
+        raise MultipleQueryError(f"Ошибка при выполнении нескольких запросов: {e}. {describe_batch(sample.template, args_list)}") from e
+      sample.rows = len(args_list)
+
+  # -- fetch_iter()
+  async def fetch_iter(self, query: str, *, args: Optional[Tuple[Any, ...]] = (), batch_size: int = 100) -> AsyncIterator[Tuple[Any, ...]]:
+    """Асинхронный итератор для выборки данных по частям.
+
+    Блокировка берётся на каждую порцию, а не на всю выборку: потребитель может
+    выполнять другие запросы, не дожидаясь конца итерации.
+    """
+    batch_size = max(1, int(batch_size))
+    try:
+      cursor = await self._call(self.conn.execute, translate_placeholders(query), tuple(args or ()))
+      try:
+        while True:
+          rows = await self._call(cursor.fetchmany, batch_size)
+          if not rows:
+            break
+          for row in rows:
+            yield row
+      finally:
+        if self.conn is not None:
+          await self._call(cursor.close)
+    except sqlite3.Error as e:
+      raise QueryError(f"Ошибка при выборке данных: {e}. Запрос: {normalize_query(query)}") from e
+
+  # Постраничная выборка строится только на execute_select, поэтому реализация AioMysql подходит без изменений
+  fetch_keyset = AioMysql.fetch_keyset
+
+  # -- transaction()
+  def transaction(self) -> "SqliteTransaction":
+    return SqliteTransaction(self)
+
+  # -- check_connection
+  async def check_connection(self) -> bool:
+    try:
+      await self.execute_select("SELECT 1")
+      return True
+    except (QueryError, ConnectionError) as e:
+      logger.warning(f"AioSqlite: проверка соединения не удалась: {e}")
+      return False
+
+  # -- close()
+  async def close(self) -> None:
+    """Закрывает соединение и останавливает executor."""
+    if self.conn is None:
+      return
+    async with self._lock:
+      await self._run(self.conn.close)
+      self.conn = None
+    self._executor.shutdown(wait=True)
+    self._executor = None
+    logger.info(f"AioSqlite: база {self.path} закрыта")
+
+# !SECTION
+
+# SECTION SqliteTransaction
+class SqliteTransaction:
+  """Аналог asyncsql.Transaction: от begin() до close() остальные запросы к базе ждут."""
+
+  # -- __init__()
+  def __init__(self, db: AioSqlite) -> None:
+    self.db: AioSqlite = db
+    self.conn: Optional[sqlite3.Connection] = None
+    self._locked: bool = False
+
+  # -- begin()
+  async def begin(self) -> None:
+    """Начинает транзакцию (BEGIN IMMEDIATE — сразу берёт блокировку на запись)."""
+    if self.db.conn is None:
+      raise ConnectionError("AioSqlite: база не открыта")
+    await self.db._lock.acquire()
+    self._locked = True
+    try:
+      await self.db._run(self.db.conn.execute, "BEGIN IMMEDIATE")
+    except sqlite3.Error as e:
+      self._release()
+      raise TransactionError(f"Ошибка при начале транзакции: {e}") from e
+    self.conn = self.db.conn
+
+  # -- execute()
+  async def execute(self, query: str, args: Optional[Tuple[Any, ...]] = ()) -> Tuple[int, Optional[List[Tuple[Any, ...]]]]:
+    """Выполняет SQL-запрос в рамках текущей транзакции."""
+    if not self.conn:
+      raise TransactionError("Нет активной транзакции.")
+    try:
+      affected_rows, rows = await self.db._run(self.db._execute_sync, _FOR_UPDATE.sub("", query), args)
+      return affected_rows, rows or []
+    except sqlite3.Error as e:
+      raise TransactionError(f"Ошибка при выполнении запроса: {e}. {describe_query(normalize_query(query), args)}") from e
+
+  # -- execute_many()
+  async def execute_many(self, query: str, args_list: List[Tuple[Any, ...]]) -> int:
+    """Выполняет один запрос для каждого набора параметров в рамках текущей транзакции."""
+    if not self.conn:
+      raise TransactionError("Нет активной транзакции.")
+    try:
+      cursor = await self.db._run(self.conn.executemany, translate_placeholders(query), [tuple(args) for args in args_list])
+      return cursor.rowcount
+    except sqlite3.Error as e:
+      raise TransactionError(f"Ошибка при выполнении пакета запросов: {e}. {describe_batch(normalize_query(query), args_list)}") from e
+
+  # -- commit()
+  async def commit(self) -> None:
+    """Коммитит текущую транзакцию."""
+    await self._finish("COMMIT", "коммите")
+
+  # -- rollback()
+  async def rollback(self) -> None:
+    """Откатывает текущую транзакцию."""
+    await self._finish("ROLLBACK", "откате")
+
+  async def _finish(self, statement: str, action: str) -> None:
+    if not self.conn:
+      raise TransactionError("Нет активной транзакции.")
+    try:
+      if self.conn.in_transaction:
+        await self.db._run(self.conn.execute, statement)
+    except sqlite3.Error as e:
+      raise TransactionError(f"Ошибка при {action} транзакции: {e}") from e
+
+  # -- close()
+  async def close(self) -> None:
+    """Завершает незакоммиченную транзакцию откатом и освобождает базу."""
+    if self.conn is not None:
+      try:
+        if self.conn.in_transaction:
+          await self.db._run(self.conn.execute, "ROLLBACK")
+      except sqlite3.Error as e:
+        logger.error(f"AioSqlite: ошибка отката при закрытии транзакции: {e}")
+      self.conn = None
+    self._release()
+
+  def _release(self) -> None:
+    if self._locked:
+      self._locked = False
+      self.db._lock.release()
+
+# !SECTION
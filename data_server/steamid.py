@@ -0,0 +1,52 @@
+import re
+from functools import lru_cache
+from typing import Any, Optional
+
+# SteamID64 индивидуального аккаунта публичной вселенной: база + account_id (32 бита)
+STEAMID64_BASE = 76561197960265728
+STEAMID64_MAX = STEAMID64_BASE + 0xFFFFFFFF
+
+# STEAM_X:Y:Z (VALVE_ — тот же формат у серверов с другим провайдером авторизации); X — вселенная, в расчёте не участвует
+_STEAM2_RE = re.compile(r"^(?:STEAM|VALVE)_[0-5]:([01]):(\d{1,10})$", re.IGNORECASE)
+# Steam3: [U:1:N] или U:1:N
+_STEAM3_RE = re.compile(r"^\[?U:1:(\d{1,10})\]?$", re.IGNORECASE)
+_STEAM64_RE = re.compile(r"^\d{17}$")
+
+
+# -- to_steamid64
+@lru_cache(maxsize=4096, typed=True)  # одни и те же Steam ID приходят с каждым сообщением чата
+def to_steamid64(value: Any) -> Optional[int]:
+  """Приводит STEAM_X:Y:Z, VALVE_X:Y:Z, [U:1:N] и SteamID64 (строкой или числом) к SteamID64.
+
+  STEAM_0:1:123 и STEAM_1:1:123 дают одно и то же число. Для BOT, STEAM_ID_LAN,
+  пустых и некорректных значений возвращает None.
+  """
+  if isinstance(value, bool):
+    return None
+  if isinstance(value, int):
+    account = value
+  else:
+    text = str(value or "").strip()
+    match = _STEAM2_RE.match(text)
+    if match:
+      account = int(match.group(2)) * 2 + int(match.group(1))
+    else:
+      match = _STEAM3_RE.match(text)
+      if match:
+        account = int(match.group(1))
+      elif _STEAM64_RE.match(text):
+        account = int(text)
+      else:
+        return None
+
+  steamid64 = account if account >= STEAMID64_BASE else STEAMID64_BASE + account
+  if not STEAMID64_BASE < steamid64 <= STEAMID64_MAX:
+    return None
+  return steamid64
+
+
+# -- to_steam2
+def to_steam2(steamid64: int, universe: int = 0) -> str:
+  """SteamID64 -> STEAM_X:Y:Z (по умолчанию вселенная 0, как отдаёт сервер CS 1.6)."""
+  account = steamid64 - STEAMID64_BASE
+  return f"STEAM_{universe}:{account & 1}:{account >> 1}"
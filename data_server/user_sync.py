@@ -0,0 +1,255 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from data_server.asyncsql import AioMysql, TransactionError
+from data_server.steamid import to_steamid64
+from observer.observer_client import logger, metrics
+
+# Ключи кеша — SteamID64 (data_server/steamid.py), а не строка из таблицы
+UserMaps = Tuple[Dict[int, Any], Dict[Any, int]]
+
+# Запас на транзакции, закоммиченные с более ранним updated_at, чем уже прочитанные строки
+SYNC_OVERLAP = timedelta(seconds=5)
+# Tombstone старше этого срока не нужны: полный sync всё равно пересобирает кеш
+TOMBSTONE_TTL_DAYS = 7
+# Размер страницы полной выгрузки users
+FULL_SYNC_PAGE_SIZE = 1000
+# Водяной знак пустой таблицы: следующий delta прочитает всё, что появится (с запасом SYNC_OVERLAP)
+WATERMARK_FLOOR = datetime(1970, 1, 2)
+
+
+# -- merge_user_changes
+def merge_user_changes(
+  steam_discord: Dict[int, Any],
+  discord_steam: Dict[Any, int],
+  upserts: List[Tuple[int, Any, datetime]],
+  tombstones: List[Tuple[str, Any, datetime]],
+) -> UserMaps:
+  """Применяет изменения к копиям словарей и возвращает новую пару.
+
+  Изменения упорядочиваются по времени; при равном времени tombstone идёт раньше
+  регистрации, поэтому повторная регистрация после /unreg побеждает.
+  Повторное применение уже учтённых изменений (overlap) ничего не ломает.
+  """
+  new_steam_discord = dict(steam_discord)
+  new_discord_steam = dict(discord_steam)
+
+  changes = [(ts, 1, steam_id, discord_id) for steam_id, discord_id, ts in upserts]
+  changes += [(ts, 0, steam_id, discord_id) for steam_id, discord_id, ts in tombstones]
+  changes.sort(key=lambda change: (change[0], change[1]))
+
+  for _, is_upsert, steam_id, discord_id in changes:
+    if is_upsert:
+      old_steam = new_discord_steam.get(discord_id)
+      if old_steam is not None and old_steam != steam_id and new_steam_discord.get(old_steam) == discord_id:
+        del new_steam_discord[old_steam]
+      old_discord = new_steam_discord.get(steam_id)
+      if old_discord is not None and old_discord != discord_id and new_discord_steam.get(old_discord) == steam_id:
+        del new_discord_steam[old_discord]
+      new_steam_discord[steam_id] = discord_id
+      new_discord_steam[discord_id] = steam_id
+    else:
+      if str(new_steam_discord.get(steam_id)) == str(discord_id):
+        del new_steam_discord[steam_id]
+      for key in (discord_id, _as_int(discord_id)):
+        if key is not None and new_discord_steam.get(key) == steam_id:
+          del new_discord_steam[key]
+
+  return new_steam_discord, new_discord_steam
+
+
+# -- normalize_user_rows
+def normalize_user_rows(rows: List[Tuple[Any, ...]]) -> List[Tuple[Any, ...]]:
+  """(steam_id, discord_id, ...) -> (SteamID64, discord_id, ...); строки с неразбираемым steam_id отбрасываются."""
+  normalized = []
+  for row in rows:
+    steam_id64 = to_steamid64(row[0])
+    if steam_id64 is not None:
+      normalized.append((steam_id64, *row[1:]))
+  if len(normalized) != len(rows):
+    metrics.inc("users_sync_invalid_steam_id_total", len(rows) - len(normalized))
+  return normalized
+
+
+def _as_int(value: Any) -> Optional[int]:
+  try:
+    return int(value)
+  except (TypeError, ValueError):
+    return None
+
+
+# SECTION UserAssociationSync
+class UserAssociationSync:
+  """Watermark-синхронизация ассоциаций Steam ID <-> Discord ID.
+
+  Первый запуск, каждые full_sync_every циклов и любая ошибка delta-запроса
+  приводят к полной пересборке. Без миграции 0001_users_sync.sql работает только полный sync.
+  """
+
+  def __init__(self, mysql: AioMysql, *, full_sync_every: int = 12) -> None:
+    self.mysql: AioMysql = mysql
+    self.full_sync_every: int = max(1, int(full_sync_every))
+    self.users_watermark: Optional[datetime] = None
+    self.tombstones_watermark: Optional[datetime] = None
+    self.delta_supported: Optional[bool] = None  # None — схема ещё не проверялась
+    self._cycles_since_full: int = 0
+
+  @property
+  def tombstones_enabled(self) -> bool:
+    return bool(self.delta_supported)
+
+  # -- sync()
+  async def sync(self, steam_discord: Dict[int, Any], discord_steam: Dict[Any, int]) -> Optional[UserMaps]:
+    """Возвращает новую пару словарей или None, если изменений нет."""
+    need_full = (
+      self.delta_supported is not True
+      or self.users_watermark is None
+      or self._cycles_since_full >= self.full_sync_every
+    )
+
+    if not need_full:
+      try:
+        result = await self._delta_sync(steam_discord, discord_steam)
+        self._cycles_since_full += 1
+        return result
+      except Exception as err:
+        logger.warning(f"MySQL: delta-sync ассоциаций не удался, выполняем полный: {err}")
+        metrics.inc("users_sync_total", mode="delta_failed")
+
+    return await self._full_sync()
+
+  # -- _delta_sync()
+  async def _delta_sync(self, steam_discord: Dict[int, Any], discord_steam: Dict[Any, int]) -> Optional[UserMaps]:
+    upserts = await self.mysql.execute_select(
+      "SELECT steam_id, discord_id, updated_at FROM users WHERE updated_at > %s ORDER BY updated_at",
+      (self.users_watermark - SYNC_OVERLAP,),
+    )
+    tombstones = await self.mysql.execute_select(
+      "SELECT steam_id, discord_id, deleted_at FROM users_tombstones WHERE deleted_at > %s ORDER BY deleted_at",
+      (self.tombstones_watermark - SYNC_OVERLAP,),
+    )
+    metrics.inc("users_sync_total", mode="delta")
+    metrics.inc("users_sync_rows_total", len(upserts) + len(tombstones), mode="delta")
+
+    if upserts:
+      self.users_watermark = max(self.users_watermark, max(row[2] for row in upserts))
+    if tombstones:
+      self.tombstones_watermark = max(self.tombstones_watermark, max(row[2] for row in tombstones))
+
+    upserts = normalize_user_rows(upserts)
+    tombstones = normalize_user_rows(tombstones)
+
+    # Строки из окна overlap, уже отражённые в кеше, не требуют копирования словарей
+    upserts = [
+      row for row in upserts
+      if steam_discord.get(row[0]) != row[1] or discord_steam.get(row[1]) != row[0]
+    ]
+    tombstones = [row for row in tombstones if str(steam_discord.get(row[0])) == str(row[1])]
+
+    if not upserts and not tombstones:
+      return None
+
+    return merge_user_changes(steam_discord, discord_steam, upserts, tombstones)
+
+  # -- _full_sync()
+  async def _full_sync(self) -> UserMaps:
+    self.delta_supported = await self._probe_schema()
+    self._cycles_since_full = 0
+
+    if self.delta_supported:
+      # Водяной знак tombstone берём до снимка users, чтобы удаления во время снимка попали в следующий delta
+      tomb_rows = await self.mysql.execute_select("SELECT MAX(deleted_at) FROM users_tombstones")
+      rows = await self._fetch_all("SELECT steam_id, discord_id, updated_at FROM users")
+    else:
+      tomb_rows = []
+      rows = await self._fetch_all("SELECT steam_id, discord_id FROM users")
+
+    metrics.inc("users_sync_total", mode="full")
+    metrics.inc("users_sync_rows_total", len(rows), mode="full")
+
+    # Пустая таблица — тоже снимок: кеш очищается, а водяные знаки ставятся, чтобы дальше работал delta
+    steam_discord: Dict[int, Any] = {}
+    discord_steam: Dict[Any, int] = {}
+    for row in normalize_user_rows(rows):
+      steam_discord[row[0]] = row[1]
+      discord_steam[row[1]] = row[0]
+
+    if self.delta_supported:
+      self.users_watermark = max((row[2] for row in rows if row[2] is not None), default=WATERMARK_FLOOR)
+      self.tombstones_watermark = (tomb_rows[0][0] if tomb_rows and tomb_rows[0][0] else None) or WATERMARK_FLOOR
+      await self._purge_tombstones()
+
+    return steam_discord, discord_steam
+
+  # -- _fetch_all()
+  async def _fetch_all(self, query: str) -> List[Tuple[Any, ...]]:
+    """Полная выгрузка страницами по steam_id: обрыв соединения не начинает выборку заново."""
+    return [row async for row in self.mysql.fetch_keyset(query, "steam_id", batch_size=FULL_SYNC_PAGE_SIZE)]
+
+  # -- _probe_schema()
+  async def _probe_schema(self) -> bool:
+    # Локальный SQLite (data_server/sqlite_backend.py) обновляет кеш только полной выгрузкой
+    if getattr(self.mysql, "dialect", "mysql") != "mysql":
+      return False
+
+    query = (
+      "SELECT "
+      "(SELECT COUNT(*) FROM information_schema.COLUMNS "
+      " WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'users' AND COLUMN_NAME = 'updated_at'), "
+      "(SELECT COUNT(*) FROM information_schema.TABLES "
+      " WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'users_tombstones')"
+    )
+    try:
+      response = await self.mysql.execute_select(query)
+    except Exception as err:
+      logger.warning(f"MySQL: не удалось проверить схему для delta-sync: {err}")
+      return False
+
+    supported = bool(response) and all(response[0])
+    if not supported and self.delta_supported is None:
+      logger.warning("MySQL: миграция 0001_users_sync.sql не применена, кеш ассоциаций обновляется полностью")
+    return supported
+
+  # -- _purge_tombstones()
+  async def _purge_tombstones(self) -> None:
+    try:
+      await self.mysql.execute_change(
+        "DELETE FROM users_tombstones WHERE deleted_at < NOW(6) - INTERVAL %s DAY",
+        (TOMBSTONE_TTL_DAYS,),
+      )
+    except Exception as err:
+      logger.warning(f"MySQL: не удалось очистить users_tombstones: {err}")
+
+  # -- delete_user()
+  async def delete_user(self, discord_id: str) -> int:
+    """Удаляет регистрацию; при поддержке схемы — вместе с tombstone в одной транзакции."""
+    if not self.tombstones_enabled:
+      return await self.mysql.execute_change("DELETE FROM users WHERE discord_id = %s", (discord_id,))
+
+    transaction = self.mysql.transaction()
+    try:
+      await transaction.begin()
+      _, rows = await transaction.execute("SELECT steam_id FROM users WHERE discord_id = %s FOR UPDATE", (discord_id,))
+      if not rows:
+        await transaction.rollback()
+        return 0
+
+      deleted, _ = await transaction.execute("DELETE FROM users WHERE discord_id = %s", (discord_id,))
+      for (steam_id,) in rows:
+        await transaction.execute(
+          "INSERT INTO users_tombstones (discord_id, steam_id) VALUES (%s, %s)",
+          (discord_id, steam_id),
+        )
+      await transaction.commit()
+      return deleted
+    except TransactionError:
+      if transaction.conn is not None:
+        try:
+          await transaction.rollback()
+        except TransactionError:
+          pass
+      raise
+    finally:
+      await transaction.close()
+
+# !SECTION
@@ -0,0 +1,124 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from observer.observer_client import logger, metrics
+
+FlushFn = Callable[[List[Tuple[Any, ...]]], Awaitable[Any]]
+
+
+# SECTION WriteBehindBuffer
+class WriteBehindBuffer:
+  """Буфер отложенной записи: обновления с одним ключом схлопываются (побеждает последнее).
+
+  Сброс выполняется через flush_interval секунд после первого изменения или сразу,
+  когда набралось max_rows ключей. Если flush_fn упала, строки возвращаются в буфер
+  (если за это время не пришло более новое значение) и уходят со следующим сбросом.
+  flush_fn может вернуть False (хранилище заведомо недоступно): строки так же ждут
+  повтора, но без ошибки в логе.
+  """
+
+  def __init__(self, name: str, flush_fn: FlushFn, *, flush_interval: float = 0.5, max_rows: int = 200) -> None:
+    self.name: str = name
+    self.flush_fn: FlushFn = flush_fn
+    self.flush_interval: float = max(0.0, float(flush_interval))
+    self.max_rows: int = max(1, int(max_rows))
+    self._pending: Dict[Hashable, Tuple[Any, ...]] = {}
+    self._lock: asyncio.Lock = asyncio.Lock()
+    self._timer: Optional[asyncio.TimerHandle] = None
+    self._flush_task: Optional[asyncio.Task] = None
+
+  def __len__(self) -> int:
+    return len(self._pending)
+
+  # -- put()
+  def put(self, key: Hashable, row: Tuple[Any, ...]) -> None:
+    if key in self._pending:
+      metrics.inc("write_behind_coalesced_total", buffer=self.name)
+      del self._pending[key]  # новое значение уходит в конец порядка записи
+    self._pending[key] = row
+    self._report_depth()
+
+    if len(self._pending) >= self.max_rows:
+      self._cancel_timer()
+      self._spawn_flush()
+    elif self._timer is None:
+      loop = asyncio.get_running_loop()
+      self._timer = loop.call_later(self.flush_interval, self._on_timer)
+
+  # -- flush()
+  async def flush(self) -> int:
+    """Сбрасывает всё накопленное. Возвращает количество записанных строк."""
+    async with self._lock:
+      self._cancel_timer()
+      if not self._pending:
+        return 0
+
+      batch = self._pending
+      self._pending = {}
+      self._report_depth()
+
+      started = time.perf_counter()
+      try:
+        written = await self.flush_fn(list(batch.values()))
+      except Exception as err:
+        self._restore(batch)
+        metrics.inc("write_behind_flush_failures_total", buffer=self.name)
+        logger.error(f"WriteBehind[{self.name}]: сброс {len(batch)} строк не удался, повтор позже: {err}")
+        return 0
+      finally:
+        metrics.observe("write_behind_flush_seconds", time.perf_counter() - started, buffer=self.name)
+
+      if written is False:
+        self._restore(batch)
+        metrics.inc("write_behind_flush_deferred_total", buffer=self.name)
+        return 0
+
+      metrics.inc("write_behind_rows_total", len(batch), buffer=self.name)
+      # Строки, пришедшие во время сброса, не должны ждать следующего put()
+      if self._pending and self._timer is None:
+        self._timer = asyncio.get_running_loop().call_later(self.flush_interval, self._on_timer)
+      return len(batch)
+
+  # -- close()
+  async def close(self, timeout: float = 5.0) -> None:
+    """Финальный сброс при остановке приложения."""
+    self._cancel_timer()
+    try:
+      await asyncio.wait_for(self.flush(), timeout=timeout)
+    except asyncio.TimeoutError:
+      logger.error(f"WriteBehind[{self.name}]: финальный сброс не уложился в {timeout}s, потеряно {len(self._pending)} строк")
+      return
+    if self._pending:
+      self._cancel_timer()
+      logger.warning(f"WriteBehind[{self.name}]: при остановке не записано {len(self._pending)} строк")
+
+  def _restore(self, batch: Dict[Hashable, Tuple[Any, ...]]) -> None:
+    # Возвращаем строки, не затирая более свежие значения, пришедшие во время сброса
+    for key, row in batch.items():
+      self._pending.setdefault(key, row)
+    self._report_depth()
+    self._schedule_retry()
+
+  def _on_timer(self) -> None:
+    self._timer = None
+    self._spawn_flush()
+
+  def _spawn_flush(self) -> None:
+    if self._flush_task is None or self._flush_task.done():
+      self._flush_task = asyncio.create_task(self.flush(), name=f"write_behind:{self.name}")
+
+  def _schedule_retry(self) -> None:
+    if self._timer is None and self._pending:
+      loop = asyncio.get_running_loop()
+      self._timer = loop.call_later(max(self.flush_interval, 1.0), self._on_timer)
+
+  def _cancel_timer(self) -> None:
+    if self._timer is not None:
+      self._timer.cancel()
+      self._timer = None
+
+  def _report_depth(self) -> None:
+    metrics.set_gauge("write_behind_depth", len(self._pending), buffer=self.name)
+
+# !SECTION
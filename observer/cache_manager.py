@@ -0,0 +1,267 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Mapping, Optional
+
+# Маркер «ключа нет в кеше»: None — допустимое (негативное) значение
+MISS = object()
+
+
+# SECTION CacheRegion
+class CacheRegion:
+  """Именованная область кеша: LRU-лимит, TTL, отдельный TTL для негативных записей и версия.
+
+  Значение None считается негативной записью («в источнике нет») и живёт negative_ttl.
+  version растёт при invalidate/clear/replace: get_or_load не сохраняет результат
+  загрузки, если за время загрузки область инвалидировали.
+  """
+
+  def __init__(
+    self,
+    name: str,
+    *,
+    maxsize: Optional[int] = None,
+    ttl: Optional[float] = None,
+    negative_ttl: Optional[float] = None,
+    clock: Callable[[], float] = time.monotonic,
+  ) -> None:
+    self.name: str = name
+    self.maxsize: Optional[int] = None
+    self.ttl: Optional[float] = None
+    self.negative_ttl: Optional[float] = None
+    self.configure(maxsize=maxsize, ttl=ttl, negative_ttl=negative_ttl)
+    self._clock: Callable[[], float] = clock
+    self._values: Dict[Hashable, Any] = {}
+    self._expires: Dict[Hashable, float] = {}  # только для записей с TTL
+    self._inflight: Dict[Hashable, asyncio.Future] = {}
+    self.version: int = 0
+    self.hits: int = 0
+    self.negative_hits: int = 0
+    self.misses: int = 0
+    self.evictions: int = 0
+    self.expirations: int = 0
+
+  # -- configure()
+  def configure(self, *, maxsize: Optional[int] = None, ttl: Optional[float] = None, negative_ttl: Optional[float] = None) -> None:
+    """None — без ограничения. negative_ttl по умолчанию равен ttl."""
+    self.maxsize = max(1, int(maxsize)) if maxsize else None
+    self.ttl = float(ttl) if ttl else None
+    self.negative_ttl = float(negative_ttl) if negative_ttl else self.ttl
+
+  def __len__(self) -> int:
+    return len(self._values)
+
+  def __contains__(self, key: Hashable) -> bool:
+    return self.get(key, MISS, count=False) is not MISS
+
+  # -- get()
+  def get(self, key: Hashable, default: Any = None, *, count: bool = True) -> Any:
+    values = self._values
+    if key not in values:
+      if count:
+        self.misses += 1
+      return default
+
+    expires_at = self._expires.get(key)
+    if expires_at is not None and expires_at <= self._clock():
+      self._drop(key)
+      self.expirations += 1
+      if count:
+        self.misses += 1
+      return default
+
+    value = values[key]
+    if self.maxsize is not None:
+      # dict сохраняет порядок вставки: перестановка в конец даёт LRU
+      del values[key]
+      values[key] = value
+    if count:
+      if value is None:
+        self.negative_hits += 1
+      else:
+        self.hits += 1
+    return value
+
+  # -- set()
+  def set(self, key: Hashable, value: Any) -> None:
+    values = self._values
+    if key in values:
+      del values[key]
+    values[key] = value
+
+    ttl = self.negative_ttl if value is None else self.ttl
+    if ttl is not None:
+      self._expires[key] = self._clock() + ttl
+    else:
+      self._expires.pop(key, None)
+
+    if self.maxsize is not None:
+      while len(values) > self.maxsize:
+        self._drop(next(iter(values)))
+        self.evictions += 1
+
+  # -- pop()
+  def pop(self, key: Hashable, default: Any = None) -> Any:
+    """Удаляет запись без смены версии (локальное изменение, а не инвалидация)."""
+    if key not in self._values:
+      return default
+    value = self._values[key]
+    self._drop(key)
+    return value
+
+  # -- invalidate()
+  def invalidate(self, *keys: Hashable) -> None:
+    for key in keys:
+      self._drop(key)
+    self.version += 1
+
+  # -- clear()
+  def clear(self) -> None:
+    self._values = {}
+    self._expires = {}
+    self.version += 1
+
+  # -- replace()
+  def replace(self, mapping: Dict[Hashable, Any]) -> None:
+    """Подменяет содержимое целиком; словарь переходит во владение области (без копирования)."""
+    self._values = mapping
+    self._expires = {}
+    if self.ttl is not None:
+      expires_at = self._clock() + self.ttl
+      self._expires = dict.fromkeys(mapping, expires_at)
+    self.version += 1
+
+  # -- view()
+  def view(self) -> Mapping[Hashable, Any]:
+    """Текущее содержимое без учёта TTL; только для чтения."""
+    return self._values
+
+  # -- get_or_load()
+  async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+    """Значение из кеша или из loader(). Одновременные промахи по одному ключу ждут одну загрузку."""
+    value = self.get(key, MISS)
+    if value is not MISS:
+      return value
+
+    pending = self._inflight.get(key)
+    if pending is not None:
+      try:
+        return await asyncio.shield(pending)
+      except asyncio.CancelledError:
+        if not pending.cancelled():
+          raise  # отменили самого ожидающего
+        # Отменили загрузку ведущего (например, по таймауту его маршрута): загружаем заново
+        return await self.get_or_load(key, loader)
+
+    future = asyncio.get_running_loop().create_future()
+    self._inflight[key] = future
+    version = self.version
+    try:
+      value = await loader()
+    except asyncio.CancelledError:
+      # Отмена касается только ведущего: ожидающие получат отменённый future и повторят загрузку
+      future.cancel()
+      raise
+    except BaseException as err:
+      future.set_exception(err)
+      future.exception()  # ожидающих может не быть — не логировать «exception was never retrieved»
+      raise
+    else:
+      if self.version == version:
+        self.set(key, value)
+      future.set_result(value)
+      return value
+    finally:
+      self._inflight.pop(key, None)
+
+  # -- stats()
+  def stats(self) -> Dict[str, Any]:
+    return {
+      "size": len(self._values),
+      "maxsize": self.maxsize,
+      "ttl": self.ttl,
+      "negative_ttl": self.negative_ttl,
+      "version": self.version,
+      "hits": self.hits,
+      "negative_hits": self.negative_hits,
+      "misses": self.misses,
+      "evictions": self.evictions,
+      "expirations": self.expirations,
+    }
+
+  def _drop(self, key: Hashable) -> None:
+    self._values.pop(key, None)
+    self._expires.pop(key, None)
+
+# !SECTION
+
+# SECTION CacheManager
+class CacheManager:
+  """Реестр областей кеша, инвалидация по событиям Observer и экспорт статистики в Metrics."""
+
+  def __init__(self, observer=None, metrics=None) -> None:
+    self._regions: Dict[str, CacheRegion] = {}
+    self._overrides: Dict[str, Dict[str, Any]] = {}
+    self._observer = observer
+    if metrics is not None:
+      metrics.add_collector(self._collect)
+    self._metrics = metrics
+
+  # -- region()
+  def region(
+    self,
+    name: str,
+    *,
+    maxsize: Optional[int] = None,
+    ttl: Optional[float] = None,
+    negative_ttl: Optional[float] = None,
+  ) -> CacheRegion:
+    """Возвращает область name, создавая её с указанными лимитами (переопределяются configure())."""
+    region = self._regions.get(name)
+    if region is None:
+      settings = {"maxsize": maxsize, "ttl": ttl, "negative_ttl": negative_ttl}
+      settings.update(self._overrides.get(name, {}))
+      region = self._regions[name] = CacheRegion(name, **settings)
+    return region
+
+  # -- configure()
+  def configure(self, overrides: Mapping[str, Mapping[str, Any]]) -> None:
+    """Переопределяет лимиты областей (config.CACHE_REGIONS), в том числе уже созданных."""
+    for name, settings in overrides.items():
+      merged = {**self._overrides.get(name, {}), **settings}
+      self._overrides[name] = merged
+      region = self._regions.get(name)
+      if region is not None:
+        current = {"maxsize": region.maxsize, "ttl": region.ttl, "negative_ttl": region.negative_ttl}
+        current.update(merged)
+        region.configure(**current)
+
+  # -- invalidate_on()
+  def invalidate_on(self, event, name: str, keys: Optional[Callable[..., Optional[Iterable[Hashable]]]] = None) -> None:
+    """Инвалидирует область при событии: keys(data) -> ключи, None — вся область."""
+    if self._observer is None:
+      raise RuntimeError("CacheManager: observer не задан, подписка на события невозможна")
+
+    async def _invalidate(*args, **kwargs) -> None:
+      region = self._regions.get(name)
+      if region is None:
+        return
+      selected = keys(*args, **kwargs) if keys is not None else None
+      if selected is None:
+        region.clear()
+      else:
+        region.invalidate(*selected)
+
+    _invalidate.__qualname__ = f"cache_invalidate:{name}"
+    self._observer.subscribe(event)(_invalidate)
+
+  # -- stats()
+  def stats(self) -> Dict[str, Dict[str, Any]]:
+    return {name: region.stats() for name, region in self._regions.items()}
+
+  def _collect(self, metrics) -> None:
+    for name, region in self._regions.items():
+      for stat in ("hits", "negative_hits", "misses", "evictions", "expirations", "version"):
+        metrics.set_gauge(f"cache_{stat}", getattr(region, stat), region=name)
+      metrics.set_gauge("cache_size", len(region), region=name)
+
+# !SECTION
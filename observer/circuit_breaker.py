@@ -0,0 +1,113 @@
+import time
+from enum import Enum
+from typing import Callable, Optional
+
+
+class BreakerState(Enum):
+  CLOSED = "closed"
+  OPEN = "open"
+  HALF_OPEN = "half_open"
+
+
+# Числовое представление состояния для gauge-метрик
+BREAKER_STATE_VALUES = {
+  BreakerState.CLOSED: 0,
+  BreakerState.HALF_OPEN: 1,
+  BreakerState.OPEN: 2,
+}
+
+
+# SECTION CircuitBreaker
+class CircuitBreaker:
+  """Автомат closed/open/half-open.
+
+  После failure_threshold ошибок подряд переходит в open и отклоняет вызовы,
+  пока не пройдёт reset_timeout. Затем пропускает half_open_max_calls пробных
+  вызовов: успех закрывает автомат, ошибка снова открывает его.
+  """
+
+  def __init__(
+    self,
+    name: str,
+    *,
+    failure_threshold: int = 5,
+    reset_timeout: float = 30.0,
+    half_open_max_calls: int = 1,
+    on_transition: Optional[Callable[["CircuitBreaker", BreakerState, BreakerState], None]] = None,
+    clock: Callable[[], float] = time.monotonic,
+  ) -> None:
+    self.name: str = name
+    self.failure_threshold: int = max(1, int(failure_threshold))
+    self.reset_timeout: float = max(0.0, float(reset_timeout))
+    self.half_open_max_calls: int = max(1, int(half_open_max_calls))
+    self.on_transition = on_transition
+    self._clock = clock
+
+    self._state: BreakerState = BreakerState.CLOSED
+    self._failures: int = 0
+    self._opened_at: float = 0.0
+    self._half_open_calls: int = 0
+    self._probe_started_at: float = 0.0
+
+  # -- state
+  @property
+  def state(self) -> BreakerState:
+    """Текущее состояние; open автоматически становится half_open по истечении reset_timeout."""
+    if self._state is BreakerState.OPEN and (self._clock() - self._opened_at) >= self.reset_timeout:
+      self._transition(BreakerState.HALF_OPEN)
+    return self._state
+
+  # -- allow()
+  def allow(self) -> bool:
+    """Можно ли выполнить вызов прямо сейчас."""
+    state = self.state
+    if state is BreakerState.CLOSED:
+      return True
+    if state is BreakerState.OPEN:
+      return False
+
+    now = self._clock()
+    if self._half_open_calls >= self.half_open_max_calls:
+      # Пробный вызов мог быть отменён и не сообщить результат — не зависаем в half_open навсегда
+      if (now - self._probe_started_at) < self.reset_timeout:
+        return False
+      self._half_open_calls = 0
+    self._half_open_calls += 1
+    self._probe_started_at = now
+    return True
+
+  # -- record_success()
+  def record_success(self) -> None:
+    self._failures = 0
+    if self._state is not BreakerState.CLOSED:
+      self._transition(BreakerState.CLOSED)
+
+  # -- record_failure()
+  def record_failure(self) -> None:
+    if self._state is BreakerState.HALF_OPEN:
+      self.trip()
+      return
+
+    self._failures += 1
+    if self._state is BreakerState.CLOSED and self._failures >= self.failure_threshold:
+      self.trip()
+
+  # -- trip()
+  def trip(self) -> None:
+    """Принудительно открывает автомат (например, по сигналу health-check)."""
+    self._opened_at = self._clock()
+    if self._state is not BreakerState.OPEN:
+      self._transition(BreakerState.OPEN)
+
+  # -- _transition()
+  def _transition(self, new_state: BreakerState) -> None:
+    old_state = self._state
+    self._state = new_state
+    self._half_open_calls = 0
+    if new_state is BreakerState.CLOSED:
+      self._failures = 0
+
+    if self.on_transition is not None and old_state is not new_state:
+      self.on_transition(self, old_state, new_state)
+
+# !SECTION
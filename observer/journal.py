@@ -0,0 +1,228 @@
+import json
+import os
+import queue
+import threading
+import time
+from enum import Enum
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, TextIO
+
+from observer.observer import Event, Param
+
+# Префикс для ключей-перечислений (Param.Interaction и т.п.), чтобы их можно было восстановить при replay
+_ENUM_KEY_PREFIX = "@"
+# Маркер значения, которое нельзя сериализовать (discord.Interaction, discord.Message, ...)
+OPAQUE_MARKER = "$obj"
+_MAX_DEPTH = 8
+
+
+# -- to_json_safe
+def to_json_safe(value: Any, _depth: int = 0) -> Any:
+  """Приводит payload события к JSON-совместимому виду.
+
+  Несериализуемые объекты заменяются на {"$obj": "<ИмяТипа>"}.
+  """
+  if value is None or isinstance(value, (bool, int, float, str)):
+    return value
+
+  if _depth >= _MAX_DEPTH:
+    return {OPAQUE_MARKER: type(value).__name__}
+
+  if isinstance(value, Enum):
+    return f"{_ENUM_KEY_PREFIX}{type(value).__name__}.{value.name}"
+
+  if isinstance(value, dict):
+    result = {}
+    for key, item in value.items():
+      if isinstance(key, Enum):
+        key = f"{_ENUM_KEY_PREFIX}{type(key).__name__}.{key.name}"
+      result[str(key)] = to_json_safe(item, _depth + 1)
+    return result
+
+  if isinstance(value, (list, tuple, set, frozenset)):
+    return [to_json_safe(item, _depth + 1) for item in value]
+
+  if isinstance(value, bytes):
+    return {OPAQUE_MARKER: "bytes", "len": len(value)}
+
+  return {OPAQUE_MARKER: type(value).__name__}
+
+
+# -- from_json_safe
+def from_json_safe(value: Any) -> Any:
+  """Обратное преобразование ключей Param.* из журнала."""
+  if isinstance(value, dict):
+    result = {}
+    for key, item in value.items():
+      result[_decode_key(key)] = from_json_safe(item)
+    return result
+  if isinstance(value, list):
+    return [from_json_safe(item) for item in value]
+  return value
+
+
+def _decode_key(key: str) -> Any:
+  prefix = f"{_ENUM_KEY_PREFIX}{Param.__name__}."
+  if key.startswith(prefix):
+    member = Param.__members__.get(key[len(prefix):])
+    if member is not None:
+      return member
+  return key
+
+
+# -- has_opaque
+def has_opaque(value: Any) -> bool:
+  """True, если в payload есть несериализованные объекты (их нельзя честно воспроизвести)."""
+  if isinstance(value, dict):
+    return OPAQUE_MARKER in value or any(has_opaque(item) for item in value.values())
+  if isinstance(value, list):
+    return any(has_opaque(item) for item in value)
+  return False
+
+
+# SECTION EventJournal
+class EventJournal:
+  """Append-only журнал событий Observer в формате JSON Lines с ротацией по размеру.
+
+  Каждая строка: {"t": monotonic, "w": unix time, "e": event, "a": args, "k": kwargs}.
+  Подключается через observer.add_tap(journal.record). Запись на диск идёт в отдельном потоке
+  пачками (один flush на пачку), чтобы Observer.notify не ждал диск; close() дописывает остаток.
+  """
+
+  def __init__(self, path: str, *, max_bytes: int = 50 * 1024 * 1024, backup_count: int = 3) -> None:
+    self.path: Path = Path(path)
+    self.max_bytes: int = max(1024, int(max_bytes))
+    self.backup_count: int = max(0, int(backup_count))
+    self._file: Optional[TextIO] = None
+    self._size: int = 0
+    self._queue: "queue.SimpleQueue[Optional[str]]" = queue.SimpleQueue()
+    self._thread: Optional[threading.Thread] = None
+    self._thread_lock: threading.Lock = threading.Lock()
+
+  # -- record()
+  def record(self, event: Event, args: tuple, kwargs: dict) -> None:
+    line = json.dumps(
+      {
+        "t": round(time.monotonic(), 6),
+        "w": round(time.time(), 3),
+        "e": event.value,
+        "a": to_json_safe(list(args)),
+        "k": to_json_safe(kwargs),
+      },
+      ensure_ascii=False,
+      separators=(",", ":"),
+    ) + "\n"
+    if self._thread is None:
+      self._start_writer()
+    self._queue.put(line)
+
+  def _start_writer(self) -> None:
+    with self._thread_lock:
+      if self._thread is None:
+        self._thread = threading.Thread(target=self._writer, name="event_journal", daemon=True)
+        self._thread.start()
+
+  # -- _writer()
+  def _writer(self) -> None:
+    """Поток записи: забирает всё накопленное и сбрасывает на диск одним flush; None — остановка."""
+    while True:
+      batch = [self._queue.get()]
+      while len(batch) < 1000:
+        try:
+          batch.append(self._queue.get_nowait())
+        except queue.Empty:
+          break
+
+      for line in batch:
+        if line is not None:
+          self._write(line)
+      if self._file is not None:
+        self._file.flush()
+      if None in batch:
+        self._close_file()
+        return
+
+  # -- _write()
+  def _write(self, line: str) -> None:
+    if self._file is None:
+      self._open()
+
+    encoded_len = len(line.encode("utf-8"))
+    if self._size and self._size + encoded_len > self.max_bytes:
+      self._rotate()
+
+    self._file.write(line)
+    self._size += encoded_len
+
+  # -- _open()
+  def _open(self) -> None:
+    self.path.parent.mkdir(parents=True, exist_ok=True)
+    self._file = open(self.path, "a", encoding="utf-8")
+    self._size = self.path.stat().st_size
+
+  # -- _rotate()
+  def _rotate(self) -> None:
+    self._close_file()
+    if self.backup_count > 0:
+      for index in range(self.backup_count - 1, 0, -1):
+        source = self._backup_path(index)
+        if source.exists():
+          os.replace(source, self._backup_path(index + 1))
+      os.replace(self.path, self._backup_path(1))
+    else:
+      self.path.unlink(missing_ok=True)
+    self._open()
+
+  def _backup_path(self, index: int) -> Path:
+    return self.path.with_name(f"{self.path.name}.{index}")
+
+  # -- close()
+  def close(self, timeout: float = 5.0) -> None:
+    """Дописывает накопленные строки и закрывает файл."""
+    with self._thread_lock:
+      thread, self._thread = self._thread, None
+    if thread is not None:
+      self._queue.put(None)
+      thread.join(timeout)
+    else:
+      self._close_file()
+
+  def _close_file(self) -> None:
+    if self._file is not None:
+      self._file.close()
+      self._file = None
+      self._size = 0
+
+# !SECTION
+
+
+# -- journal_files
+def journal_files(path: str) -> List[Path]:
+  """Файлы журнала в хронологическом порядке: самые старые бэкапы первыми."""
+  base = Path(path)
+  backups = []
+  for candidate in base.parent.glob(f"{base.name}.*"):
+    suffix = candidate.name[len(base.name) + 1:]
+    if suffix.isdigit():
+      backups.append((int(suffix), candidate))
+  files = [candidate for _, candidate in sorted(backups, reverse=True)]
+  if base.exists():
+    files.append(base)
+  return files
+
+
+# -- read_journal
+def read_journal(path: str) -> Iterator[dict]:
+  """Читает журнал вместе с ротированными частями; битые строки пропускаются."""
+  for file_path in journal_files(path):
+    with open(file_path, "r", encoding="utf-8") as journal_file:
+      for raw_line in journal_file:
+        raw_line = raw_line.strip()
+        if not raw_line:
+          continue
+        try:
+          record = json.loads(raw_line)
+        except json.JSONDecodeError:
+          continue
+        if isinstance(record, dict) and "e" in record:
+          yield record
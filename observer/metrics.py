@@ -0,0 +1,171 @@
+import bisect
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# Границы бакетов гистограмм по умолчанию (в секундах)
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+  return tuple(sorted((str(key), str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+  items = list(labels)
+  if extra is not None:
+    items.append(extra)
+  if not items:
+    return ""
+  return "{" + ",".join(f'{key}="{value}"' for key, value in items) + "}"
+
+
+# SECTION Histogram
+class Histogram:
+  """Гистограмма с фиксированными бакетами, счётчиком, суммой и максимумом."""
+
+  def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+    self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+    self.counts: List[int] = [0] * (len(self.buckets) + 1)
+    self.count: int = 0
+    self.total: float = 0.0
+    self.max: float = 0.0
+
+  def observe(self, value: float) -> None:
+    self.counts[bisect.bisect_left(self.buckets, value)] += 1
+    self.count += 1
+    self.total += value
+    if value > self.max:
+      self.max = value
+
+  def quantile(self, q: float) -> float:
+    """Оценка квантиля по верхней границе бакета."""
+    if self.count == 0:
+      return 0.0
+    rank = q * self.count
+    seen = 0
+    for index, bucket_count in enumerate(self.counts):
+      seen += bucket_count
+      if seen >= rank:
+        return self.buckets[index] if index < len(self.buckets) else self.max
+    return self.max
+
+  def snapshot(self) -> dict:
+    return {
+      "count": self.count,
+      "sum": round(self.total, 6),
+      "max": round(self.max, 6),
+      "p50": self.quantile(0.5),
+      "p95": self.quantile(0.95),
+    }
+
+# !SECTION
+
+# SECTION Metrics
+class Metrics:
+  """Простой in-process реестр метрик: счётчики, gauge и гистограммы с метками."""
+
+  def __init__(self) -> None:
+    self._counters: Dict[str, Dict[LabelKey, float]] = {}
+    self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+    self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+    self._collectors: List[Callable[["Metrics"], None]] = []
+
+  # -- add_collector()
+  def add_collector(self, collector: Callable[["Metrics"], None]) -> None:
+    """Регистрирует функцию, обновляющую gauge перед каждым snapshot()/render_text()."""
+    self._collectors.append(collector)
+
+  def _run_collectors(self) -> None:
+    for collector in self._collectors:
+      collector(self)
+
+  # -- inc()
+  def inc(self, name: str, value: float = 1, **labels) -> None:
+    series = self._counters.setdefault(name, {})
+    key = _label_key(labels)
+    series[key] = series.get(key, 0) + value
+
+  # -- set_gauge()
+  def set_gauge(self, name: str, value: float, **labels) -> None:
+    self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+  # -- observe()
+  def observe(self, name: str, value: float, **labels) -> None:
+    series = self._histograms.setdefault(name, {})
+    key = _label_key(labels)
+    histogram = series.get(key)
+    if histogram is None:
+      histogram = series[key] = Histogram()
+    histogram.observe(value)
+
+  # -- timer()
+  @contextmanager
+  def timer(self, name: str, **labels) -> Iterator[None]:
+    """Замеряет длительность блока и записывает её в гистограмму name."""
+    started = time.perf_counter()
+    try:
+      yield
+    finally:
+      self.observe(name, time.perf_counter() - started, **labels)
+
+  # -- get_counter()
+  def get_counter(self, name: str, **labels) -> float:
+    return self._counters.get(name, {}).get(_label_key(labels), 0)
+
+  # -- get_gauge()
+  def get_gauge(self, name: str, **labels) -> Optional[float]:
+    return self._gauges.get(name, {}).get(_label_key(labels))
+
+  # -- get_histogram()
+  def get_histogram(self, name: str, **labels) -> Optional[Histogram]:
+    return self._histograms.get(name, {}).get(_label_key(labels))
+
+  # -- snapshot()
+  def snapshot(self) -> dict:
+    """Возвращает JSON-совместимый снимок всех метрик."""
+    self._run_collectors()
+    def _series(store: Dict[str, Dict[LabelKey, object]], convert) -> dict:
+      return {
+        name: [{"labels": dict(key), "value": convert(value)} for key, value in series.items()]
+        for name, series in store.items()
+      }
+
+    return {
+      "counters": _series(self._counters, lambda value: value),
+      "gauges": _series(self._gauges, lambda value: value),
+      "histograms": _series(self._histograms, lambda value: value.snapshot()),
+    }
+
+  # -- render_text()
+  def render_text(self) -> str:
+    """Текстовый формат в стиле Prometheus exposition."""
+    self._run_collectors()
+    lines: List[str] = []
+
+    for name in sorted(self._counters):
+      lines.append(f"# TYPE {name} counter")
+      for key, value in self._counters[name].items():
+        lines.append(f"{name}{_format_labels(key)} {value}")
+
+    for name in sorted(self._gauges):
+      lines.append(f"# TYPE {name} gauge")
+      for key, value in self._gauges[name].items():
+        lines.append(f"{name}{_format_labels(key)} {value}")
+
+    for name in sorted(self._histograms):
+      lines.append(f"# TYPE {name} histogram")
+      for key, histogram in self._histograms[name].items():
+        cumulative = 0
+        for bound, bucket_count in zip(histogram.buckets, histogram.counts):
+          cumulative += bucket_count
+          lines.append(f"{name}_bucket{_format_labels(key, ('le', str(bound)))} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {histogram.count}")
+        lines.append(f"{name}_sum{_format_labels(key)} {round(histogram.total, 6)}")
+        lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+
+    return "\n".join(lines) + "\n"
+
+# !SECTION
@@ -1,6 +1,14 @@
 import asyncio
+import logging
+import time
+from dataclasses import dataclass
 from enum import Enum
-from typing import Callable, Dict, List
+from typing import Any, Callable, Dict, List, Optional
+
+from observer.circuit_breaker import BREAKER_STATE_VALUES, BreakerState, CircuitBreaker
+from observer.metrics import Metrics
+
+_log = logging.getLogger(__name__)
 
 class Param(Enum):
   Interaction = "interaction",
@@ -20,9 +28,12 @@ class Event(Enum):
   WBH_MOMENT_VOTE = "wbh_moment_vote"
 
   # Bot events
+  BE_STARTUP = "be_startup"  # до подключения к gateway: подключения к БД и прогрев кешей (аргумент — StartupReport)
   BE_READY = "be_ready"
   BE_MESSAGE = "be_message"
   BE_MEMBER_UPDATE = "be_member_update"
+  BE_CLOSE = "be_close"  # остановка бота: финальные сбросы буферов, пока подключения к БД и Redis открыты
+  BE_CLOSED = "be_closed"  # после BE_CLOSE: закрытие подключений
 
   # Bot command events
   BC_PING = "bc_ping"
@@ -35,6 +46,7 @@ class Event(Enum):
   BC_DB_MAP_ADD = "bc_db_map_add"
   BC_DB_MAP_DELETE = "bc_db_map_delete"
   BC_DB_MAP_UPDATE = "bc_db_map_update"
+  BC_DB_MAP_IMPORT = "bc_db_map_import"
 
   BC_CS_SYNC_MAPS = "bc_cs_sync_maps"
   BC_CS_RCON = "bc_cs_rcon"
@@ -49,12 +61,31 @@ class Event(Enum):
   CS_MAP_INSTALL_DONE = "cs_map_install_done"
   CS_MAP_INSTALL_FAILED = "cs_map_install_failed"
 
+  # Data events
+  DB_USER_CHANGED = "db_user_changed"  # связь Steam ↔ Discord изменена и закоммичена: {steam_id64, discord_id}
+  DB_MAPS_CHANGED = "db_maps_changed"  # таблица maps изменена: {map_name} (или {} после импорта)
+
 
 # SECTION Observer
 class Observer:
   def __init__(self) -> None:
     """Инициализация наблюдателя с пустым списком подписчиков."""
     self._subscribers: Dict[str, List[Callable]] = {}
+    self._taps: List[Callable[[Event, tuple, dict], None]] = []
+    # Необязательный хук замера длительности подписчиков: (event, subscriber, seconds)
+    self.stage_hook: Optional[Callable[[str, str, float], None]] = None
+
+  def add_tap(self, tap: Callable[[Event, tuple, dict], None]) -> None:
+    """Регистрирует синхронного наблюдателя всех событий (например, журнал).
+
+    Args:
+      tap (Callable): Вызывается как tap(event, args, kwargs) до рассылки подписчикам.
+    """
+    self._taps.append(tap)
+
+  def remove_tap(self, tap: Callable[[Event, tuple, dict], None]) -> None:
+    if tap in self._taps:
+      self._taps.remove(tap)
 
   def subscribe(self, event: Event) -> Callable:
     """Декоратор для подписки на событие.
@@ -80,16 +111,32 @@ class Observer:
       *args: Аргументы, которые будут переданы в функции обратного вызова.
       **kwargs: Ключевые аргументы, которые будут переданы в функции обратного вызова.
     """
+    for tap in self._taps:
+      try:
+        tap(event, args, kwargs)
+      except Exception as err:
+        asyncio.get_running_loop().call_exception_handler(
+          {
+            "message": "Observer tap raised an exception",
+            "event": event.value,
+            "exception": err,
+          }
+        )
+
     if event.value in self._subscribers:
       tasks: List[asyncio.Task] = []
       callbacks: List[Callable] = []
 
       for callback in self._subscribers[event.value]:
         callbacks.append(callback)
+        subscriber_name = getattr(callback, '__qualname__', repr(callback))
+        coro = callback(*args, **kwargs)
+        if self.stage_hook is not None:
+          coro = self._timed(event.value, subscriber_name, coro)
         tasks.append(
           asyncio.create_task(
-            callback(*args, **kwargs),
-            name=f"observer:{event.value}:{getattr(callback, '__qualname__', repr(callback))}",
+            coro,
+            name=f"observer:{event.value}:{subscriber_name}",
           )
         )
 
@@ -110,27 +157,180 @@ class Observer:
             )
 
 
+  async def _timed(self, event_name: str, subscriber_name: str, coro) -> Any:
+    started = time.perf_counter()
+    try:
+      return await coro
+    finally:
+      hook = self.stage_hook
+      if hook is not None:
+        hook(event_name, subscriber_name, time.perf_counter() - started)
+
+
 # !SECTION
 
 # SECTION NoServerRoute
 
+# Маркер "fallback не задан": в этом случае отказ маршрута поднимает RouteUnavailableError
+_NO_FALLBACK = object()
+
+
+class RouteUnavailableError(asyncio.TimeoutError):
+  """Маршрут не ответил за отведённое время или отключён автоматом.
+
+  Наследуется от asyncio.TimeoutError, чтобы существующие обработчики таймаутов
+  у вызывающего кода продолжали работать без изменений.
+  """
+
+  def __init__(self, route: str, reason: str) -> None:
+    super().__init__(f"Route {route} unavailable: {reason}")
+    self.route: str = route
+    self.reason: str = reason
+
+
+@dataclass
+class RoutePolicy:
+  """Декларативная политика вызова маршрута.
+
+  timeout: ограничение времени вызова (включая ожидание слота), сек.
+  max_concurrency: сколько вызовов маршрута может выполняться одновременно.
+  failure_threshold: после стольких ошибок подряд автомат открывается (None — без автомата).
+  reset_timeout: сколько автомат остаётся открытым до пробного вызова, сек.
+  fallback: значение, возвращаемое при таймауте/открытом автомате/ошибке.
+  """
+  timeout: Optional[float] = None
+  max_concurrency: Optional[int] = None
+  failure_threshold: Optional[int] = None
+  reset_timeout: float = 30.0
+  fallback: Any = _NO_FALLBACK
+
+  @property
+  def has_fallback(self) -> bool:
+    return self.fallback is not _NO_FALLBACK
+
+
 class NoServerRoute:
-  def __init__(self) -> None:
+  def __init__(self, metrics: Optional[Metrics] = None) -> None:
     self._routes: Dict[str, Callable] = {}
+    self._policies: Dict[str, RoutePolicy] = {}
+    self._semaphores: Dict[str, asyncio.Semaphore] = {}
+    self._breakers: Dict[str, CircuitBreaker] = {}
+    self._metrics: Metrics = metrics if metrics is not None else Metrics()
 
-  def create_route(self, route: str) -> Callable:
+  def create_route(
+    self,
+    route: str,
+    *,
+    timeout: Optional[float] = None,
+    max_concurrency: Optional[int] = None,
+    failure_threshold: Optional[int] = None,
+    reset_timeout: float = 30.0,
+    fallback: Any = _NO_FALLBACK,
+  ) -> Callable:
+    """Регистрирует маршрут. Параметры политики описаны в RoutePolicy."""
+    policy = RoutePolicy(
+      timeout=timeout,
+      max_concurrency=max_concurrency,
+      failure_threshold=failure_threshold,
+      reset_timeout=reset_timeout,
+      fallback=fallback,
+    )
 
     def decorator(callback: Callable) -> Callable:
       self._routes[route] = callback
+      self._configure_policy(route, policy)
       return callback
     
     return decorator
+
+  def _configure_policy(self, route: str, policy: RoutePolicy) -> None:
+    self._semaphores.pop(route, None)
+    self._breakers.pop(route, None)
+
+    if policy == RoutePolicy():
+      self._policies.pop(route, None)
+      return
+
+    self._policies[route] = policy
+    if policy.max_concurrency:
+      self._semaphores[route] = asyncio.Semaphore(policy.max_concurrency)
+    if policy.failure_threshold:
+      self._breakers[route] = CircuitBreaker(
+        route,
+        failure_threshold=policy.failure_threshold,
+        reset_timeout=policy.reset_timeout,
+        on_transition=self._on_breaker_transition,
+      )
+      self._metrics.set_gauge("route_breaker_state", BREAKER_STATE_VALUES[BreakerState.CLOSED], route=route)
+
+  def _on_breaker_transition(self, breaker: CircuitBreaker, old: BreakerState, new: BreakerState) -> None:
+    self._metrics.set_gauge("route_breaker_state", BREAKER_STATE_VALUES[new], route=breaker.name)
+    self._metrics.inc("route_breaker_transitions_total", route=breaker.name, to=new.value)
+    if new is BreakerState.OPEN:
+      _log.warning("NoServerRoute: circuit breaker opened for %s", breaker.name)
+    elif new is BreakerState.CLOSED:
+      _log.info("NoServerRoute: circuit breaker closed for %s", breaker.name)
+
+  def breaker_state(self, route: str) -> Optional[BreakerState]:
+    breaker = self._breakers.get(route)
+    return breaker.state if breaker is not None else None
   
   async def call_route(self, route: str, *argc, **kwargs):
     if not route in self._routes:
       return None
-    
-    return await self._routes[route](*argc, **kwargs)
+
+    policy = self._policies.get(route)
+    if policy is None:
+      return await self._routes[route](*argc, **kwargs)
+
+    return await self._call_with_policy(route, policy, argc, kwargs)
+
+  async def _call_with_policy(self, route: str, policy: RoutePolicy, argc: tuple, kwargs: dict):
+    callback = self._routes[route]
+    breaker = self._breakers.get(route)
+    semaphore = self._semaphores.get(route)
+
+    if breaker is not None and not breaker.allow():
+      self._metrics.inc("route_calls_total", route=route, outcome="rejected")
+      return self._fallback_or_raise(route, policy, "breaker_open")
+
+    async def _run():
+      if semaphore is None:
+        return await callback(*argc, **kwargs)
+      async with semaphore:
+        return await callback(*argc, **kwargs)
+
+    started = time.perf_counter()
+    try:
+      if policy.timeout:
+        result = await asyncio.wait_for(_run(), timeout=policy.timeout)
+      else:
+        result = await _run()
+    except asyncio.TimeoutError:
+      if breaker is not None:
+        breaker.record_failure()
+      self._metrics.inc("route_calls_total", route=route, outcome="timeout")
+      return self._fallback_or_raise(route, policy, "timeout")
+    except Exception as err:
+      if breaker is not None:
+        breaker.record_failure()
+      self._metrics.inc("route_calls_total", route=route, outcome="error")
+      if not policy.has_fallback:
+        raise
+      _log.warning("NoServerRoute: %s failed, using fallback: %s", route, err)
+      return policy.fallback
+    finally:
+      self._metrics.observe("route_latency_seconds", time.perf_counter() - started, route=route)
+
+    if breaker is not None:
+      breaker.record_success()
+    self._metrics.inc("route_calls_total", route=route, outcome="ok")
+    return result
+
+  def _fallback_or_raise(self, route: str, policy: RoutePolicy, reason: str):
+    if policy.has_fallback:
+      return policy.fallback
+    raise RouteUnavailableError(route, reason)
 
 
 # !SECTION
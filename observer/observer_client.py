@@ -1,4 +1,6 @@
-from observer.observer import Observer, Event, Param, NoServerRoute
+from observer.observer import Observer, Event, Param, NoServerRoute, RouteUnavailableError
+from observer.metrics import Metrics
+from observer.cache_manager import CacheManager, CacheRegion, MISS
 from logger.log import Log
 
 class TextStyle:
@@ -35,5 +37,7 @@ class Color:
 
 # -- Init Objects
 logger: Log = Log()
+metrics: Metrics = Metrics()
 observer: Observer = Observer()
-nsroute: NoServerRoute = NoServerRoute()
\ No newline at end of file
+nsroute: NoServerRoute = NoServerRoute(metrics=metrics)
+caches: CacheManager = CacheManager(observer=observer, metrics=metrics)
\ No newline at end of file
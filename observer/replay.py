@@ -0,0 +1,424 @@
+"""Воспроизведение журнала событий Observer (см. observer/journal.py).
+
+Запуск:
+  python -m observer.replay logs/events.jsonl --speed 10
+
+Discord, MySQL и Redis подменяются заглушками: Discord-канал отвечает с задержкой
+--discord-latency, MySQL возвращает пустые результаты, Redis отвечает пустыми значениями
+с задержкой --redis-latency на команду (pipeline — один обмен), так что подписчики
+с require_connection проходят весь путь. В конце печатается отчёт по длительности
+каждого подписчика (stage) и отставанию от расписания; команды Redis — строки события "redis".
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import sys
+import time
+import types
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from observer.journal import from_json_safe, has_opaque, read_journal
+
+DEFAULT_EVENTS = ("wbh_message", "wbh_info", "wbh_moment_vote")
+
+# ID каналов для конфигурации-заглушки, если config.py недоступен
+_STUB_CONFIG = {
+  "BOT_TOKEN": "",
+  "API_KEY": "",
+  "GUILD_ID": 1,
+  "CS_CHAT_CHNL_ID": 2,
+  "INFO_CHANNEL_ID": 3,
+  "MOMENTS_CHANNEL_ID": 4,
+  "ADMIN_CHANNEL_ID": None,
+  "CS_HOST": "127.0.0.1",
+  "CS_RCON_PASSWORD": "",
+  "CS_RECONNECT_INTERVAL": 60,
+  "DB_HOST": "127.0.0.1",
+  "DB_PORT": 3306,
+  "DB_USER": "",
+  "DB_PASSWORD": "",
+  "DB_NAME": "",
+  "WEB_HOST_ADDRESS": "127.0.0.1",
+  "WEB_SERVER_PORT": 8080,
+  "WEB_ALLOWED_IPS": ["127.0.0.1"],
+  "REDIS_HOST": "127.0.0.1",
+  "REDIS_PORT": 6379,
+}
+
+
+# SECTION StageStats
+class StageStats:
+  """Сырые замеры длительностей по стадиям (event -> subscriber)."""
+
+  def __init__(self) -> None:
+    self.samples: Dict[Tuple[str, str], List[float]] = defaultdict(list)
+
+  def record(self, event_name: str, stage: str, seconds: float) -> None:
+    self.samples[(event_name, stage)].append(seconds)
+
+  def report(self) -> List[dict]:
+    rows = []
+    for (event_name, stage), values in sorted(self.samples.items()):
+      ordered = sorted(values)
+      rows.append({
+        "event": event_name,
+        "stage": stage,
+        "count": len(ordered),
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+        "p50_ms": _percentile(ordered, 0.50) * 1000,
+        "p95_ms": _percentile(ordered, 0.95) * 1000,
+        "max_ms": ordered[-1] * 1000,
+      })
+    return rows
+
+# !SECTION
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+  if not ordered:
+    return 0.0
+  index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+  return ordered[index]
+
+
+# SECTION Stubs
+def _ensure_config() -> None:
+  """Подставляет конфигурацию-заглушку, если config.py не импортируется."""
+  if "config" in sys.modules:
+    return
+  try:
+    import config  # noqa: F401
+  except Exception:
+    sys.modules["config"] = types.SimpleNamespace(**_STUB_CONFIG)
+
+
+def _build_discord_stubs(stats: StageStats, latency: float):
+  import discord
+
+  message_ids = itertools.count(1)
+
+  class StubMessage:
+    def __init__(self, channel: "StubChannel", content: str, *, message_id: Optional[int] = None, missing: bool = False) -> None:
+      self.id: int = message_id if message_id is not None else next(message_ids)
+      self.channel = channel
+      self.content: str = content
+      self.author = None
+      self.missing: bool = missing
+
+    async def edit(self, *, content: str = None, **_kwargs) -> "StubMessage":
+      await channel_call(self.channel, "discord.edit")
+      if self.missing:
+        raise discord.NotFound(types.SimpleNamespace(status=404, reason="Not Found"), "stub")
+      if content is not None:
+        self.content = content
+      return self
+
+  # Наследуемся от TextChannel, чтобы проходили проверки isinstance в bot_server
+  class StubChannel(discord.TextChannel):
+    def __init__(self, channel_id: int) -> None:  # noqa: D401 - без вызова super: discord-состояние не нужно
+      self.id = channel_id
+      self.messages: Dict[int, StubMessage] = {}
+
+    def __repr__(self) -> str:
+      return f"<StubChannel id={self.id}>"
+
+    async def send(self, content: str = None, **_kwargs) -> StubMessage:
+      await channel_call(self, "discord.send")
+      message = StubMessage(self, content or "")
+      self.messages[message.id] = message
+      return message
+
+    def get_partial_message(self, message_id: int) -> StubMessage:
+      # Правки по id (bot_server после восстановления состояния): неизвестный id даст NotFound при edit
+      return self.messages.get(message_id) or StubMessage(self, "", message_id=message_id, missing=True)
+
+    async def fetch_message(self, message_id: int) -> StubMessage:
+      await channel_call(self, "discord.fetch_message")
+      message = self.messages.get(message_id)
+      if message is None:
+        raise discord.NotFound(types.SimpleNamespace(status=404, reason="Not Found"), "stub")
+      return message
+
+    async def purge(self, *, limit: int = 100, check=None, **_kwargs) -> list:
+      await channel_call(self, "discord.purge")
+      return []
+
+  async def channel_call(channel, stage: str) -> None:
+    started = time.perf_counter()
+    if latency > 0:
+      await asyncio.sleep(latency)
+    stats.record(f"channel:{channel.id}", stage, time.perf_counter() - started)
+
+  return StubChannel
+
+
+class StubMysql:
+  """Заглушка AioMysql: соединение «есть», запросы ничего не возвращают."""
+
+  connected = True
+
+  async def connect(self) -> None:
+    return None
+
+  async def check_connection(self) -> bool:
+    return True
+
+  async def execute_one(self, *_args, **_kwargs):
+    return None
+
+  async def execute_select(self, *_args, **_kwargs):
+    return []
+
+  async def execute_change(self, *_args, **_kwargs):
+    return 0
+
+  async def exec_many(self, *_args, **_kwargs):
+    return 0
+
+  async def close(self) -> None:
+    return None
+
+
+# Пустые ответы заглушки Redis по команде redis-py; остальные команды возвращают 0
+_REDIS_REPLIES = {
+  "type": b"none",
+  "get": None,
+  "hget": None,
+  "hgetall": {},
+  "incr": 1,
+  "ping": True,
+  "zscan": (0, []),
+  "scan": (0, []),
+  "xadd": b"0-1",
+  "xautoclaim": [b"0-0", [], []],
+}
+_REDIS_LIST_COMMANDS = {
+  "lrange", "zrange", "zrangebylex", "zrevrange", "hkeys", "keys", "mget",
+  "xreadgroup", "xrange", "xrevrange", "eval", "evalsha",
+}
+
+
+def _redis_reply(command: str):
+  if command in _REDIS_LIST_COMMANDS:
+    return []
+  reply = _REDIS_REPLIES.get(command, 0)
+  return dict(reply) if isinstance(reply, dict) else reply
+
+
+class StubRedis:
+  """Заглушка клиента redis-py: данных нет, каждая команда (или pipeline целиком) стоит latency секунд."""
+
+  def __init__(self, stats: StageStats, latency: float) -> None:
+    self.stats = stats
+    self.latency: float = latency
+
+  async def roundtrip(self, stage: str) -> None:
+    started = time.perf_counter()
+    if self.latency > 0:
+      await asyncio.sleep(self.latency)
+    self.stats.record("redis", stage, time.perf_counter() - started)
+
+  def pipeline(self, transaction: bool = True) -> "StubRedisPipeline":
+    return StubRedisPipeline(self)
+
+  def __getattr__(self, command: str):
+    if command.startswith("_"):
+      raise AttributeError(command)
+
+    async def _command(*_args, **_kwargs):
+      await self.roundtrip(f"redis.{command}")
+      return _redis_reply(command)
+
+    return _command
+
+
+class StubRedisPipeline:
+  def __init__(self, redis: StubRedis) -> None:
+    self.redis = redis
+    self.commands: List[str] = []
+
+  async def __aenter__(self) -> "StubRedisPipeline":
+    return self
+
+  async def __aexit__(self, *_exc) -> bool:
+    return False
+
+  def __getattr__(self, command: str):
+    if command.startswith("_"):
+      raise AttributeError(command)
+
+    def _queue(*_args, **_kwargs) -> "StubRedisPipeline":
+      self.commands.append(command)
+      return self
+
+    return _queue
+
+  async def execute(self) -> list:
+    commands, self.commands = self.commands, []
+    await self.redis.roundtrip("redis.pipeline")
+    return [_redis_reply(command) for command in commands]
+
+
+def _install_stubs(stats: StageStats, latency: float, redis_latency: float = 0.001) -> None:
+  from bot import bot_server
+  from data_server import redis_server, sql_server
+
+  stub_channel_cls = _build_discord_stubs(stats, latency)
+  channels: Dict[int, object] = {}
+
+  def get_channel(channel_id):
+    if channel_id in (None, 0, ""):
+      return None
+    if channel_id not in channels:
+      channels[channel_id] = stub_channel_cls(int(channel_id))
+    return channels[channel_id]
+
+  bot_server.dbot.bot.get_channel = get_channel
+  if bot_server.moments_channel_id <= 0:
+    bot_server.moments_channel_id = _STUB_CONFIG["MOMENTS_CHANNEL_ID"]
+  # Не ходим во внешние HLTV/FTP при воспроизведении
+  bot_server.demo_resolver.myarena_host = ""
+
+  sql_server.mysql = StubMysql()
+  redis_server.rc.client = StubRedis(stats, redis_latency)
+  redis_server.rc.connected = True
+
+# !SECTION
+
+
+# SECTION Replay
+def load_events(path: str, events: Iterable[str]) -> Tuple[List[dict], int]:
+  """Читает журнал и оставляет только выбранные события с воспроизводимым payload."""
+  wanted = set(events)
+  selected: List[dict] = []
+  skipped = 0
+  for record in read_journal(path):
+    if wanted and record["e"] not in wanted:
+      continue
+    if has_opaque(record.get("a")) or has_opaque(record.get("k")):
+      skipped += 1
+      continue
+    selected.append(record)
+  return selected, skipped
+
+
+async def replay(
+  records: List[dict],
+  *,
+  speed: float = 1.0,
+  max_gap: Optional[float] = None,
+  drain: float = 2.0,
+  stats: Optional[StageStats] = None,
+  target=None,
+) -> dict:
+  """Подаёт записи журнала в Observer, сохраняя интервалы между событиями (делённые на speed)."""
+  from observer.observer import Event, Observer
+
+  if target is None:
+    from observer.observer_client import observer as global_observer
+
+    target = Observer()
+    target._subscribers = {name: list(callbacks) for name, callbacks in global_observer._subscribers.items()}
+
+  stats = stats if stats is not None else StageStats()
+  target.stage_hook = stats.record
+
+  loop = asyncio.get_running_loop()
+  lags: List[float] = []
+  tasks: List[asyncio.Task] = []
+  offset = 0.0
+  previous_t: Optional[float] = None
+  started = loop.time()
+
+  async def _dispatch(event: Event, args: list, kwargs: dict) -> None:
+    dispatch_started = time.perf_counter()
+    await target.notify(event, *args, **kwargs)
+    stats.record(event.value, "total", time.perf_counter() - dispatch_started)
+
+  for record in records:
+    t = float(record.get("t", 0.0))
+    if previous_t is not None:
+      gap = max(0.0, t - previous_t) / max(speed, 1e-9)
+      if max_gap is not None:
+        gap = min(gap, max_gap)
+      offset += gap
+    previous_t = t
+
+    delay = started + offset - loop.time()
+    if delay > 0:
+      await asyncio.sleep(delay)
+    lags.append(max(0.0, loop.time() - (started + offset)))
+
+    event = Event(record["e"])
+    args = from_json_safe(record.get("a") or [])
+    kwargs = from_json_safe(record.get("k") or {})
+    tasks.append(asyncio.create_task(_dispatch(event, args, kwargs)))
+
+  if tasks:
+    await asyncio.gather(*tasks, return_exceptions=True)
+  if drain > 0:
+    await asyncio.sleep(drain)
+
+  lags.sort()
+  return {
+    "events": len(records),
+    "wall_sec": loop.time() - started,
+    "schedule_lag_p95_ms": _percentile(lags, 0.95) * 1000,
+    "schedule_lag_max_ms": (lags[-1] if lags else 0.0) * 1000,
+    "stages": stats.report(),
+  }
+
+
+def format_report(result: dict, skipped: int = 0) -> str:
+  lines = [
+    f"events={result['events']} skipped_opaque={skipped} wall={result['wall_sec']:.2f}s "
+    f"lag_p95={result['schedule_lag_p95_ms']:.1f}ms lag_max={result['schedule_lag_max_ms']:.1f}ms",
+    f"{'event':<20} {'stage':<40} {'count':>6} {'mean_ms':>9} {'p50_ms':>9} {'p95_ms':>9} {'max_ms':>9}",
+  ]
+  for row in result["stages"]:
+    lines.append(
+      f"{row['event']:<20} {row['stage'][:40]:<40} {row['count']:>6} "
+      f"{row['mean_ms']:>9.2f} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['max_ms']:>9.2f}"
+    )
+  return "\n".join(lines)
+
+# !SECTION
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+  parser = argparse.ArgumentParser(description="Replay an observer event journal against stubbed Discord/MySQL/Redis")
+  parser.add_argument("journal", help="путь к журналу (EVENT_JOURNAL_PATH)")
+  parser.add_argument("--speed", type=float, default=1.0, help="множитель скорости (1 = реальное время)")
+  parser.add_argument("--events", default=",".join(DEFAULT_EVENTS), help="список событий через запятую; пусто = все")
+  parser.add_argument("--max-gap", type=float, default=None, help="максимальная пауза между событиями, сек")
+  parser.add_argument("--discord-latency", type=float, default=0.05, help="задержка заглушки Discord, сек")
+  parser.add_argument("--redis-latency", type=float, default=0.001, help="задержка заглушки Redis на команду, сек")
+  parser.add_argument("--drain", type=float, default=2.0, help="ожидание фоновых задач после последнего события, сек")
+  options = parser.parse_args(argv)
+
+  if not os.path.exists(options.journal):
+    parser.error(f"journal not found: {options.journal}")
+
+  _ensure_config()
+
+  import bot.bot_server  # noqa: F401
+  import bot.cmd_autocomplete  # noqa: F401
+  import data_server.redis_server  # noqa: F401
+  import data_server.sql_server  # noqa: F401
+
+  stats = StageStats()
+  _install_stubs(stats, options.discord_latency, options.redis_latency)
+
+  events = [name.strip() for name in options.events.split(",") if name.strip()]
+  records, skipped = load_events(options.journal, events)
+
+  result = asyncio.run(replay(records, speed=options.speed, max_gap=options.max_gap, drain=options.drain, stats=stats))
+  print(format_report(result, skipped))
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
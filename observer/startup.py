@@ -0,0 +1,77 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from observer.observer import Event
+
+
+# SECTION StartupReport
+class StartupReport:
+  """Тайминги шагов фазы BE_STARTUP: подписчики оборачивают свои шаги в step()."""
+
+  def __init__(self, metrics=None, clock: Callable[[], float] = time.perf_counter) -> None:
+    self._clock: Callable[[], float] = clock
+    self._metrics = metrics
+    self.started_at: float = clock()
+    self.finished_at: Optional[float] = None
+    self.steps: List[Tuple[str, float, Optional[str]]] = []  # (шаг, секунды, ошибка)
+    self.timed_out: bool = False
+
+  # -- step()
+  @asynccontextmanager
+  async def step(self, name: str):
+    """Замеряет шаг; исключение записывается в отчёт и пробрасывается дальше."""
+    started = self._clock()
+    error: Optional[str] = None
+    try:
+      yield
+    except Exception as err:
+      error = str(err) or type(err).__name__
+      raise
+    finally:
+      elapsed = self._clock() - started
+      self.steps.append((name, elapsed, error))
+      if self._metrics is not None:
+        self._metrics.set_gauge("startup_step_seconds", round(elapsed, 6), step=name)
+
+  # -- run()
+  async def run(self, name: str, coro: Awaitable):
+    async with self.step(name):
+      return await coro
+
+  # -- finish()
+  def finish(self) -> float:
+    self.finished_at = self._clock()
+    total = self.finished_at - self.started_at
+    if self._metrics is not None:
+      self._metrics.set_gauge("startup_seconds", round(total, 6))
+    return total
+
+  @property
+  def failed(self) -> Dict[str, str]:
+    return {name: error for name, _, error in self.steps if error is not None}
+
+  # -- summary()
+  def summary(self) -> str:
+    end = self.finished_at if self.finished_at is not None else self._clock()
+    parts = []
+    for name, elapsed, error in sorted(self.steps, key=lambda item: item[1], reverse=True):
+      parts.append(f"{name} {elapsed:.3f}s" + (f" (ошибка: {error})" if error else ""))
+    status = ", не завершён по таймауту" if self.timed_out else ""
+    return f"прогрев {end - self.started_at:.3f}s{status}: " + ("; ".join(parts) or "шагов нет")
+
+# !SECTION
+
+# -- run_startup
+async def run_startup(observer, report: StartupReport, timeout: Optional[float] = None) -> StartupReport:
+  """Рассылает BE_STARTUP и ждёт подписчиков не дольше timeout.
+
+  По таймауту подписчики не отменяются (подключения продолжают попытки в фоне),
+  просто запуск бота перестаёт их ждать.
+  """
+  task = asyncio.create_task(observer.notify(Event.BE_STARTUP, report), name="observer:startup")
+  done, _ = await asyncio.wait({task}, timeout=timeout or None)
+  report.timed_out = task not in done
+  report.finish()
+  return report
@@ -0,0 +1,106 @@
+import asyncio
+import pathlib
+import sys
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+  sys.path.insert(0, str(ROOT))
+
+from data_server.cache_bus import PUBLISH_SCRIPT, CacheBus
+from observer.observer import Event, Observer
+
+
+class _FakeChannel:
+  """Счётчик версий и канал Redis в памяти: публикации копятся в published."""
+
+  def __init__(self):
+    self.version = 0
+    self.published = []
+    self.connected = True
+
+  async def eval_script(self, script, keys, args):
+    assert script == PUBLISH_SCRIPT
+    self.version += 1
+    channel, payload = args
+    self.published.append(f"{self.version}|{payload}".encode())
+    return self.version
+
+  async def value_get(self, key):
+    return str(self.version).encode() if self.version else None
+
+
+def _bus(redis):
+  observer = Observer()
+  received = []
+
+  @observer.subscribe(Event.DB_USER_CHANGED)
+  async def on_user_changed(data):
+    received.append(data)
+
+  bus = CacheBus(redis, observer, "cache:invalidate", (Event.DB_USER_CHANGED, Event.DB_MAPS_CHANGED))
+  bus.last_version = 0
+  return bus, observer, received
+
+
+def test_mutation_is_replayed_in_other_process_only():
+  redis = _FakeChannel()
+  first, first_observer, first_received = _bus(redis)
+  second, _, second_received = _bus(redis)
+
+  async def scenario():
+    await first_observer.notify(Event.DB_USER_CHANGED, {"steam_id64": 76561197960265729, "discord_id": "42"})
+    for raw in list(redis.published):
+      await first.handle(raw)
+      await second.handle(raw)
+
+  asyncio.run(scenario())
+  assert first_received == [{"steam_id64": 76561197960265729, "discord_id": "42"}]
+  assert second_received == [{"steam_id64": 76561197960265729, "discord_id": "42", "remote": True}]
+  # Повтор в другом процессе не публикуется обратно в канал
+  assert len(redis.published) == 1
+  assert first.last_version == second.last_version == 1
+
+
+def test_missed_message_triggers_resync():
+  redis = _FakeChannel()
+  publisher, publisher_observer, _ = _bus(redis)
+  subscriber, _, received = _bus(redis)
+
+  async def scenario():
+    for map_name in ("de_a", "de_b", "de_c"):
+      await publisher_observer.notify(Event.DB_MAPS_CHANGED, {"map_name": map_name})
+    await subscriber.handle(redis.published[0])
+    await subscriber.handle(redis.published[2])  # сообщение №2 потеряно
+
+  asyncio.run(scenario())
+  assert received == [{"remote": True, "resync": True}]
+  assert subscriber.last_version == 3
+
+
+def test_lagging_version_is_resynced_on_second_check():
+  redis = _FakeChannel()
+  bus, _, received = _bus(redis)
+  redis.version = 5  # сообщения опубликованы, но до подписчика не дошли
+
+  async def scenario():
+    await bus.check_version()
+    first = list(received)
+    await bus.check_version()
+    return first
+
+  assert asyncio.run(scenario()) == []
+  assert received == [{"remote": True, "resync": True}]
+  assert bus.last_version == 5
+
+  redis.version = 6
+  asyncio.run(bus.check_version(force=True))
+  assert len(received) == 2 and bus.last_version == 6
+
+
+def test_disabled_bus_does_not_publish():
+  redis = _FakeChannel()
+  observer = Observer()
+  bus = CacheBus(redis, observer, "", (Event.DB_MAPS_CHANGED,))
+
+  asyncio.run(observer.notify(Event.DB_MAPS_CHANGED, {"map_name": "de_a"}))
+  assert redis.published == [] and not bus.enabled
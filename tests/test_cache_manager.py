@@ -0,0 +1,125 @@
+import asyncio
+import pathlib
+import sys
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+  sys.path.insert(0, str(ROOT))
+
+from observer.cache_manager import MISS, CacheManager, CacheRegion
+from observer.metrics import Metrics
+from observer.observer import Event, Observer
+
+
+class FakeClock:
+  def __init__(self):
+    self.now = 0.0
+
+  def __call__(self):
+    return self.now
+
+
+def test_ttl_negative_ttl_and_lru_eviction():
+  clock = FakeClock()
+  region = CacheRegion("t", maxsize=2, ttl=10, negative_ttl=2, clock=clock)
+  region.set("a", 1)
+  region.set("missing", None)
+
+  assert region.get("missing", MISS) is None
+  clock.now = 3
+  assert region.get("missing", MISS) is MISS
+  assert region.get("a") == 1
+
+  region.set("b", 2)
+  region.get("a")  # a свежее b
+  region.set("c", 3)
+  assert "b" not in region and region.get("a") == 1
+
+  clock.now = 20
+  assert region.get("a", MISS) is MISS
+  stats = region.stats()
+  assert stats["evictions"] == 1
+  assert stats["expirations"] == 2
+  assert stats["negative_hits"] == 1
+  assert stats["hits"] == 3 and stats["misses"] == 2
+
+
+def test_get_or_load_single_flight_and_version_guard():
+  region = CacheRegion("t")
+  calls = []
+
+  async def scenario():
+    gate = asyncio.Event()
+
+    async def loader():
+      calls.append(1)
+      await gate.wait()
+      return "value"
+
+    first = asyncio.create_task(region.get_or_load("k", loader))
+    second = asyncio.create_task(region.get_or_load("k", loader))
+    await asyncio.sleep(0)
+    region.invalidate("k")  # загрузка началась до инвалидации — результат не кешируется
+    gate.set()
+    results = await asyncio.gather(first, second)
+    return results, region.get("k", MISS)
+
+  results, cached = asyncio.run(scenario())
+  assert results == ["value", "value"]
+  assert len(calls) == 1
+  assert cached is MISS
+
+
+def test_cancelled_leader_does_not_cancel_waiting_followers():
+  region = CacheRegion("t")
+  calls = []
+
+  async def scenario():
+    gate = asyncio.Event()
+
+    async def loader():
+      calls.append(1)
+      await gate.wait()
+      return "value"
+
+    leader = asyncio.create_task(region.get_or_load("k", loader))
+    followers = [asyncio.create_task(region.get_or_load("k", loader)) for _ in range(2)]
+    await asyncio.sleep(0)
+    # Таймаут маршрута ведущего отменяет его загрузку, пока остальные ждут её результат
+    leader.cancel()
+    await asyncio.sleep(0)
+    gate.set()
+    results = await asyncio.gather(*followers)
+    return leader.cancelled(), results, region.get("k", MISS)
+
+  leader_cancelled, results, cached = asyncio.run(scenario())
+  assert leader_cancelled
+  assert results == ["value", "value"]
+  # Один из ожидающих повторил загрузку, второй дождался её
+  assert len(calls) == 2
+  assert cached == "value"
+
+
+def test_invalidate_on_event_and_metrics_collector():
+  observer = Observer()
+  metrics = Metrics()
+  manager = CacheManager(observer=observer, metrics=metrics)
+  region = manager.region("users", maxsize=10)
+  manager.invalidate_on(Event.BC_REG, "users", keys=lambda data: (data["id"],))
+  manager.invalidate_on(Event.BC_UNREG, "users")
+  region.set(1, "a")
+  region.set(2, "b")
+
+  async def scenario():
+    await observer.notify(Event.BC_REG, {"id": 1})
+    assert 1 not in region and 2 in region
+    await observer.notify(Event.BC_UNREG)
+
+  asyncio.run(scenario())
+  assert len(region) == 0 and region.version == 2
+
+  manager.configure({"users": {"maxsize": 1}})
+  assert region.maxsize == 1
+  metrics.snapshot()
+  assert metrics.get_gauge("cache_version", region="users") == 2
+  assert metrics.get_gauge("cache_size", region="users") == 0
@@ -0,0 +1,91 @@
+import asyncio
+import pathlib
+import sys
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+  sys.path.insert(0, str(ROOT))
+
+from bot.chat_flusher import ChatFlusher
+from observer.observer_client import metrics
+
+
+def test_messages_extend_batch_and_flusher_sleeps_when_idle():
+  flushes = []
+
+  async def flush():
+    flushes.append(1)
+
+  async def scenario():
+    flusher = ChatFlusher("test_debounce", flush, delay=0.03, max_latency=1.0, max_size=1000)
+    for _ in range(3):
+      flusher.put(10)
+      await asyncio.sleep(0.01)
+    assert flushes == []
+    await asyncio.sleep(0.08)
+    return flusher
+
+  flusher = asyncio.run(scenario())
+  assert len(flushes) == 1
+  # Без новых сообщений таймер не взведён
+  assert flusher._timer is None and flusher.pending == 0
+  assert metrics.get_counter("chat_flushes_total", flusher="test_debounce", reason="deadline") == 1
+  assert metrics.get_counter("chat_flush_messages_total", flusher="test_debounce") == 3
+  assert metrics.get_histogram("chat_flush_latency_seconds", flusher="test_debounce").count == 1
+
+
+def test_continuous_chat_is_flushed_by_max_latency():
+  flushes = []
+
+  async def flush():
+    flushes.append(1)
+
+  async def scenario():
+    flusher = ChatFlusher("test_latency", flush, delay=0.04, max_latency=0.06, max_size=1000)
+    for _ in range(10):
+      flusher.put(1)
+      await asyncio.sleep(0.02)
+    await flusher.close()
+
+  asyncio.run(scenario())
+  assert len(flushes) >= 3
+  assert metrics.get_counter("chat_flushes_total", flusher="test_latency", reason="max_latency") >= 2
+
+
+def test_size_threshold_flushes_immediately():
+  flushes = []
+
+  async def flush():
+    flushes.append(1)
+
+  async def scenario():
+    flusher = ChatFlusher("test_size", flush, delay=60, max_latency=60, max_size=10)
+    flusher.put(6)
+    await asyncio.sleep(0)
+    assert flushes == []
+    flusher.put(6)
+    await asyncio.sleep(0.01)
+
+  asyncio.run(scenario())
+  assert flushes == [1]
+  assert metrics.get_counter("chat_flushes_total", flusher="test_size", reason="size") == 1
+
+
+def test_failed_flush_is_retried_without_new_messages():
+  results = [False, True]
+  calls = []
+
+  async def flush():
+    calls.append(1)
+    return results.pop(0)
+
+  async def scenario():
+    flusher = ChatFlusher("test_retry", flush, delay=0.01, max_latency=0.05, max_size=1000)
+    flusher.put(5)
+    await asyncio.sleep(0.06)
+    return flusher
+
+  flusher = asyncio.run(scenario())
+  assert len(calls) == 2 and flusher.pending == 0
+  assert metrics.get_counter("chat_flush_failures_total", flusher="test_retry") == 1
+  assert metrics.get_counter("chat_flush_messages_total", flusher="test_retry") == 1
@@ -0,0 +1,103 @@
+import asyncio
+import pathlib
+import sys
+import threading
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+  sys.path.insert(0, str(ROOT))
+
+from observer.journal import EventJournal, OPAQUE_MARKER, from_json_safe, has_opaque, read_journal, to_json_safe
+from observer.observer import Event, Observer, Param
+from observer.replay import StageStats, load_events, replay
+
+
+class _Opaque:
+  pass
+
+
+def test_to_json_safe_keeps_param_keys_and_marks_opaque_objects():
+  payload = {Param.Interaction: _Opaque(), "players": ({"name": "a"},), "raw": b"xy"}
+  safe = to_json_safe(payload)
+
+  assert safe["@Param.Interaction"] == {OPAQUE_MARKER: "_Opaque"}
+  assert safe["players"] == [{"name": "a"}]
+  assert has_opaque(safe)
+  assert Param.Interaction in from_json_safe(safe)
+
+
+def test_journal_tap_records_events_and_rotates(tmp_path):
+  path = tmp_path / "events.jsonl"
+  journal = EventJournal(str(path), max_bytes=1024, backup_count=2)
+  observer = Observer()
+  observer.add_tap(journal.record)
+
+  async def scenario():
+    for index in range(60):
+      await observer.notify(Event.WBH_MESSAGE, {"message": f"line {index}\n"})
+
+  asyncio.run(scenario())
+  journal.close()
+
+  assert (tmp_path / "events.jsonl.1").exists()
+  assert not (tmp_path / "events.jsonl.3").exists()
+
+  records = list(read_journal(str(path)))
+  messages = [record["a"][0]["message"] for record in records]
+  assert messages == sorted(messages, key=lambda line: int(line.split()[1]))
+  assert messages[-1] == "line 59\n"
+  assert all(record["e"] == "wbh_message" for record in records)
+
+
+def test_replay_feeds_events_with_stage_timings(tmp_path):
+  path = tmp_path / "events.jsonl"
+  journal = EventJournal(str(path))
+  source = Observer()
+  source.add_tap(journal.record)
+
+  async def record_traffic():
+    await source.notify(Event.WBH_MESSAGE, {"message": "hi"})
+    await source.notify(Event.WBH_INFO, {"info_message": "x", "current_players": []})
+    await source.notify(Event.BC_REG, {Param.Interaction: _Opaque()})
+
+  asyncio.run(record_traffic())
+  journal.close()
+
+  records, skipped = load_events(str(path), ["wbh_message", "wbh_info", "bc_reg"])
+  assert [record["e"] for record in records] == ["wbh_message", "wbh_info"]
+  assert skipped == 1
+
+  target = Observer()
+  received = []
+
+  @target.subscribe(Event.WBH_MESSAGE)
+  async def on_message(data):
+    received.append(data["message"])
+
+  stats = StageStats()
+  result = asyncio.run(replay(records, speed=100.0, drain=0, stats=stats, target=target))
+
+  assert received == ["hi"]
+  assert result["events"] == 2
+  stages = {(row["event"], row["stage"]) for row in result["stages"]}
+  assert ("wbh_message", on_message.__qualname__) in stages
+  assert ("wbh_info", "total") in stages
+
+
+def test_journal_writes_from_background_thread(tmp_path):
+  path = tmp_path / "events.jsonl"
+  journal = EventJournal(str(path))
+  writers = set()
+  write = journal._write
+
+  def tracking_write(line):
+    writers.add(threading.current_thread().name)
+    write(line)
+
+  journal._write = tracking_write
+  for index in range(20):
+    journal.record(Event.WBH_MESSAGE, ({"message": str(index)},), {})
+  journal.close()
+
+  assert writers == {"event_journal"}
+  assert [record["a"][0]["message"] for record in read_journal(str(path))] == [str(index) for index in range(20)]
@@ -0,0 +1,78 @@
+import asyncio
+import pathlib
+import sys
+
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+  sys.path.insert(0, str(ROOT))
+
+from data_server.asyncsql import TransactionError
+from data_server.map_import import MapImportRow, import_maps, parse_map_list
+from data_server.sqlite_backend import AioSqlite
+
+
+def test_parse_mapcycle_and_csv_lines():
+  text = "\n".join([
+    "// mapcycle",
+    "de_dust2",
+    "de_inferno.bsp  // комментарий",
+    "map_name,activated,min_players,max_players,priority",
+    "de_nuke,0,4,,50",
+    "DE_DUST2",
+    "bad!map",
+    "de_train,2",
+    "de_aztec,1,10,5",
+  ])
+  rows, report = parse_map_list(text, MapImportRow("", activated=1, min_players=2, max_players=20, priority=100))
+
+  assert [row.as_tuple() for row in rows] == [
+    ("de_dust2", 1, 2, 20, 100),
+    ("de_inferno", 1, 2, 20, 100),
+    ("de_nuke", 0, 4, 20, 50),
+  ]
+  assert report.skipped == ["DE_DUST2"]
+  assert [line_no for line_no, _ in report.invalid] == [7, 8, 9]
+
+
+def _run(scenario):
+  async def wrapper():
+    db = AioSqlite(":memory:")
+    await db.connect()
+    try:
+      return await scenario(db)
+    finally:
+      await db.close()
+
+  return asyncio.run(wrapper())
+
+
+def test_import_skips_existing_and_inserts_in_one_transaction():
+  async def scenario(db):
+    await db.execute_change(
+      "INSERT INTO maps (map_name, activated, min_players, max_players, priority) VALUES (%s, %s, %s, %s, %s)",
+      ("de_dust2", 1, 0, 32, 100),
+    )
+    rows, report = parse_map_list("de_dust2\nde_mirage\nde_nuke\n")
+    await import_maps(db, rows, report)
+    return report, await db.execute_select("SELECT map_name FROM maps ORDER BY map_name")
+
+  report, maps = _run(scenario)
+  assert report.inserted == ["de_mirage", "de_nuke"]
+  assert report.skipped == ["de_dust2"]
+  assert maps == [("de_dust2",), ("de_mirage",), ("de_nuke",)]
+  assert report.summary().startswith("Добавлено: 2, пропущено (уже есть): 1, с ошибками: 0")
+
+
+def test_import_failure_rolls_back_everything():
+  async def scenario(db):
+    await db.execute_change("CREATE TRIGGER no_nuke BEFORE INSERT ON maps WHEN NEW.map_name = 'de_nuke' BEGIN SELECT RAISE(ABORT, 'nope'); END")
+    rows, report = parse_map_list("de_mirage\nde_nuke\n")
+    with pytest.raises(TransactionError):
+      await import_maps(db, rows, report)
+    return report, await db.execute_select("SELECT COUNT(*) FROM maps")
+
+  report, count = _run(scenario)
+  assert report.inserted == []
+  assert count == [(0,)]
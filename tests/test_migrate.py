@@ -0,0 +1,96 @@
+import asyncio
+import pathlib
+import sys
+
+import aiomysql
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+  sys.path.insert(0, str(ROOT))
+
+from data_server.asyncsql import QueryError
+from data_server.migrate import MIGRATIONS_DIR, apply_migrations, load_migrations, mysql_error_code, split_statements
+
+
+def _query_error(code: int) -> QueryError:
+  try:
+    try:
+      raise aiomysql.OperationalError(code, "boom")
+    except aiomysql.Error as err:
+      raise QueryError("wrapped") from err
+  except QueryError as wrapped:
+    return wrapped
+
+
+class _FakeMysql:
+  def __init__(self, applied=(), failures=None):
+    self.applied = list(applied)
+    self.failures = failures or {}
+    self.executed = []
+
+  async def execute_change(self, query, args=()):
+    if query.startswith("INSERT INTO schema_migrations"):
+      self.applied.append(args[0])
+      return 1
+    for marker, code in self.failures.items():
+      if marker in query:
+        raise _query_error(code)
+    self.executed.append(query)
+    return 0
+
+  async def execute_select(self, query, args=()):
+    return [(version,) for version in self.applied]
+
+
+def test_split_statements_drops_comments_and_keeps_multiline():
+  sql = "-- header\nALTER TABLE t\n  ADD COLUMN c INT; -- trailing\n\nCREATE INDEX i ON t (c);\n"
+  assert split_statements(sql) == ["ALTER TABLE t\n  ADD COLUMN c INT", "CREATE INDEX i ON t (c)"]
+
+
+def test_split_statements_keeps_double_dash_inside_quotes():
+  sql = (
+    "INSERT INTO t (a, b) VALUES ('x -- y', \"it\\'s -- z\"); -- note\n"
+    "ALTER TABLE `a--b` COMMENT 'multi\n-- line;\nend'; -- tail\n"
+  )
+  assert split_statements(sql) == [
+    "INSERT INTO t (a, b) VALUES ('x -- y', \"it\\'s -- z\")",
+    "ALTER TABLE `a--b` COMMENT 'multi\n-- line;\nend'",
+  ]
+
+
+def test_repo_migrations_are_ordered_and_versioned():
+  migrations = load_migrations(MIGRATIONS_DIR)
+  versions = [migration.version for migration in migrations]
+  assert versions == sorted(versions)
+  assert versions[:2] == [1, 2]
+  assert any("uq_users_steam_id" in statement for statement in migrations[1].statements)
+
+
+def test_apply_migrations_tolerates_already_applied_ddl(tmp_path):
+  (tmp_path / "0001_first.sql").write_text("ALTER TABLE a ADD COLUMN x INT;\nCREATE TABLE b (id INT);\n", encoding="utf-8")
+  (tmp_path / "0002_second.sql").write_text("CREATE INDEX i ON a (x);\n", encoding="utf-8")
+  mysql = _FakeMysql(failures={"ADD COLUMN x": 1060})
+
+  applied = asyncio.run(apply_migrations(mysql, tmp_path))
+
+  assert applied == [1, 2]
+  assert mysql.executed[1:] == ["CREATE TABLE b (id INT)", "CREATE INDEX i ON a (x)"]
+
+
+def test_apply_migrations_stops_on_real_error(tmp_path):
+  (tmp_path / "0001_first.sql").write_text("CREATE UNIQUE INDEX u ON a (x);\n", encoding="utf-8")
+  (tmp_path / "0002_second.sql").write_text("CREATE INDEX i ON a (y);\n", encoding="utf-8")
+  mysql = _FakeMysql(failures={"UNIQUE INDEX u": 1062})
+
+  assert asyncio.run(apply_migrations(mysql, tmp_path)) == []
+  assert mysql.applied == []
+  assert mysql_error_code(_query_error(1062)) == 1062
+
+
+def test_apply_migrations_skips_recorded_versions(tmp_path):
+  (tmp_path / "0001_first.sql").write_text("CREATE TABLE a (id INT);\n", encoding="utf-8")
+  mysql = _FakeMysql(applied=[1])
+
+  assert asyncio.run(apply_migrations(mysql, tmp_path)) == []
+  assert len(mysql.executed) == 1
+  assert mysql.executed[0].startswith("CREATE TABLE IF NOT EXISTS schema_migrations")
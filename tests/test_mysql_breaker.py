@@ -0,0 +1,171 @@
+import asyncio
+import pathlib
+import sys
+import time
+import types
+
+import aiomysql
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+  sys.path.insert(0, str(ROOT))
+
+from data_server.asyncsql import AioMysql, CircuitOpenError, ConnectionError as MysqlConnectionError
+from observer.circuit_breaker import BreakerState
+from observer.observer_client import metrics
+
+
+def _make_mysql(**kwargs) -> AioMysql:
+  mysql = AioMysql("127.0.0.1", 3306, "user", "password", "db", **kwargs)
+  mysql.pool = types.SimpleNamespace(closed=False)
+  mysql._is_healthy = True
+  return mysql
+
+
+def test_connection_errors_open_breaker_and_calls_fail_fast():
+  mysql = _make_mysql(failure_threshold=1, reset_timeout=60)
+  calls = []
+
+  async def broken_query():
+    calls.append(1)
+    raise aiomysql.OperationalError(2003, "Can't connect")
+
+  async def scenario():
+    with pytest.raises(MysqlConnectionError):
+      await mysql.execute_with_retry(broken_query)
+    assert mysql.breaker.state is BreakerState.OPEN
+    assert not mysql.is_connected()
+
+    rejected_before = metrics.get_counter("mysql_fail_fast_total")
+    started = time.perf_counter()
+    with pytest.raises(CircuitOpenError):
+      await mysql.execute_with_retry(broken_query)
+    assert time.perf_counter() - started < 0.05
+    assert metrics.get_counter("mysql_fail_fast_total") == rejected_before + 1
+
+  asyncio.run(scenario())
+  assert calls == [1]
+  assert metrics.get_gauge("mysql_breaker_state") == 2
+
+
+def test_half_open_probe_success_closes_breaker():
+  mysql = _make_mysql(failure_threshold=1, reset_timeout=0.01)
+  mysql.breaker.trip()
+
+  async def healthy_query():
+    return [(1,)]
+
+  async def scenario():
+    await asyncio.sleep(0.02)
+    assert mysql.breaker.state is BreakerState.HALF_OPEN
+    assert await mysql.execute_with_retry(healthy_query) == [(1,)]
+
+  asyncio.run(scenario())
+  assert mysql.breaker.state is BreakerState.CLOSED
+  assert mysql.is_connected()
+
+
+def test_circuit_open_error_is_not_rewrapped_by_execute_select():
+  mysql = _make_mysql(failure_threshold=1, reset_timeout=60)
+  mysql.breaker.trip()
+
+  async def scenario():
+    with pytest.raises(CircuitOpenError):
+      await mysql.execute_select("SELECT 1")
+
+  asyncio.run(scenario())
+
+
+class _FakeCursor:
+  rowcount = 1
+  description = (("1",),)
+
+  async def __aenter__(self):
+    return self
+
+  async def __aexit__(self, *exc):
+    return False
+
+  async def execute(self, query, args=()):
+    return None
+
+  async def fetchall(self):
+    return [(1,)]
+
+
+class _FakeConnection:
+  def cursor(self, *args):
+    return _FakeCursor()
+
+
+class _FakePool:
+  closed = False
+  maxsize = 4
+
+  def __init__(self):
+    self.free = [_FakeConnection()]
+    self.size = 1
+
+  @property
+  def freesize(self):
+    return len(self.free)
+
+  async def acquire(self):
+    return self.free.pop()
+
+  async def release(self, conn):
+    self.free.append(conn)
+
+
+def test_pool_telemetry_tracks_acquire_and_connection_reuse():
+  mysql = _make_mysql()
+  mysql.pool = _FakePool()
+  opened_before = metrics.get_counter("mysql_pool_connections_opened_total")
+  acquires_before = metrics.get_histogram("mysql_pool_acquire_seconds")
+  acquires_before = acquires_before.count if acquires_before else 0
+
+  async def scenario():
+    for _ in range(3):
+      assert await mysql.execute_select("SELECT 1") == [(1,)]
+
+  asyncio.run(scenario())
+  assert metrics.get_counter("mysql_pool_connections_opened_total") == opened_before + 1
+  assert metrics.get_histogram("mysql_pool_acquire_seconds").count == acquires_before + 3
+  assert metrics.get_gauge("mysql_pool_in_use") == 0
+  assert metrics.get_gauge("mysql_pool_queries_per_connection") == 3
+  assert mysql._last_success > 0
+
+
+def test_fetch_keyset_pages_by_last_key():
+  mysql = _make_mysql()
+  table = [(f"STEAM_0:0:{index}", index) for index in range(1, 6)]
+  pages = []
+
+  async def fake_select(query, args=()):
+    pages.append(args)
+    assert query.startswith("SELECT keyset_src.*, keyset_src.steam_id FROM (SELECT steam_id, discord_id FROM users) AS keyset_src")
+    limit = args[-1]
+    rows = sorted(table)
+    if len(args) == 2:
+      rows = [row for row in rows if row[0] > args[0]]
+    return [row + (row[0],) for row in rows[:limit]]
+
+  mysql.execute_select = fake_select
+
+  async def scenario():
+    return [row async for row in mysql.fetch_keyset("SELECT steam_id, discord_id FROM users", "steam_id", batch_size=2)]
+
+  assert asyncio.run(scenario()) == sorted(table)
+  assert pages == [(2,), ("STEAM_0:0:2", 2), ("STEAM_0:0:4", 2)]
+
+
+def test_fetch_keyset_rejects_unsafe_key_column():
+  mysql = _make_mysql()
+
+  async def scenario():
+    async for _ in mysql.fetch_keyset("SELECT 1", "id; DROP TABLE users"):
+      pass
+
+  with pytest.raises(ValueError):
+    asyncio.run(scenario())
@@ -0,0 +1,150 @@
+import asyncio
+import pathlib
+import sys
+
+import discord
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+  sys.path.insert(0, str(ROOT))
+
+from bot.outbound import OutboundScheduler, Priority
+from observer.observer_client import metrics
+
+
+class _FakeChannel:
+  """Канал, который записывает отправленное и правленое содержимое в общий журнал."""
+
+  def __init__(self, channel_id, log):
+    self.id = channel_id
+    self.log = log
+
+  async def send(self, content=None, **kwargs):
+    self.log.append(("send", self.id, content))
+    return _FakeMessage(self, len(self.log))
+
+  def get_partial_message(self, message_id):
+    return _FakeMessage(self, message_id)
+
+
+class _FakeMessage:
+  def __init__(self, channel, message_id):
+    self.channel = channel
+    self.id = message_id
+
+  async def edit(self, content=None, **kwargs):
+    self.channel.log.append(("edit", self.id, content))
+    return self
+
+
+def test_ready_requests_go_out_by_priority():
+  log = []
+
+  async def scenario():
+    scheduler = OutboundScheduler(max_in_flight=1)
+    channel = _FakeChannel(1, log)
+    waits = [
+      scheduler.send(channel, "moment", priority=Priority.MOMENTS),
+      scheduler.send(channel, "status", priority=Priority.STATUS),
+      scheduler.send(channel, "kick", priority=Priority.MODERATION),
+      scheduler.send(channel, "chat", priority=Priority.CHAT),
+    ]
+    await asyncio.gather(*waits)
+    await scheduler.close()
+
+  asyncio.run(scenario())
+  assert [content for _, _, content in log] == ["kick", "chat", "status", "moment"]
+  assert metrics.get_histogram("discord_outbound_wait_seconds", priority="moderation").count >= 1
+
+
+def test_queued_edits_of_one_message_are_merged():
+  log = []
+
+  async def scenario():
+    scheduler = OutboundScheduler(route_limits={"edit": (1, 0.05)})
+    channel = _FakeChannel(7, log)
+    message = channel.get_partial_message(100)
+    first = await scheduler.edit(message, content="v1", priority=Priority.STATUS)
+    # Корзина занята первой правкой: следующие ждут и схлопываются
+    results = await asyncio.gather(*(
+      scheduler.edit(channel.get_partial_message(100), content=f"v{n}", priority=Priority.STATUS) for n in (2, 3, 4)
+    ))
+    await scheduler.close()
+    return first, results
+
+  first, results = asyncio.run(scenario())
+  assert log == [("edit", 100, "v1"), ("edit", 100, "v4")]
+  assert first.id == 100 and all(result is results[0] for result in results)
+  assert metrics.get_counter("discord_outbound_merged_total", priority="status") >= 2
+
+
+def test_channel_bucket_limits_only_its_channel():
+  log = []
+
+  async def scenario():
+    scheduler = OutboundScheduler(route_limits={"send": (1, 0.2)})
+    busy, free = _FakeChannel(1, log), _FakeChannel(2, log)
+    await scheduler.send(busy, "a", priority=Priority.CHAT)
+    pending = asyncio.ensure_future(scheduler.send(busy, "b", priority=Priority.MODERATION))
+    await scheduler.send(free, "c", priority=Priority.MOMENTS)
+    # Более приоритетный запрос в занятый канал не держит другие каналы
+    assert [content for _, _, content in log] == ["a", "c"]
+    await pending
+    await scheduler.close()
+
+  asyncio.run(scenario())
+  assert [content for _, _, content in log] == ["a", "c", "b"]
+
+
+def test_rate_limited_request_is_retried_and_counted():
+  calls = []
+
+  async def flaky_send():
+    calls.append(1)
+    if len(calls) == 1:
+      raise discord.RateLimited(0.01)
+    return "sent"
+
+  async def scenario():
+    scheduler = OutboundScheduler()
+    result = await asyncio.shield(scheduler.submit("send", 5, Priority.CHAT, flaky_send))
+    await scheduler.close()
+    return result
+
+  assert asyncio.run(scenario()) == "sent"
+  assert len(calls) == 2
+  assert metrics.get_counter("discord_429_total", source="outbound", route="send") >= 1
+
+
+def test_discord_http_rate_limit_warnings_are_counted():
+  async def scenario():
+    scheduler = OutboundScheduler()
+    await scheduler.send(_FakeChannel(1, []), "x", priority=Priority.CHAT)
+    before = metrics.get_counter("discord_429_total", source="http", method="PATCH")
+    discord.http._log.warning("We are being rate limited. %s %s responded with 429. Retrying in %.2f seconds.", "PATCH", "/channels/1/messages/2", 0.5)
+    after = metrics.get_counter("discord_429_total", source="http", method="PATCH")
+    await scheduler.close()
+    return before, after
+
+  before, after = asyncio.run(scenario())
+  assert after == before + 1
+
+
+def test_close_cancels_requests_in_flight():
+  started = asyncio.Event()
+
+  async def hanging_send():
+    started.set()
+    await asyncio.sleep(60)
+
+  async def scenario():
+    scheduler = OutboundScheduler()
+    future = scheduler.submit("send", 1, Priority.CHAT, hanging_send)
+    await started.wait()
+    assert len(scheduler._executing) == 1
+    await scheduler.close()
+    return scheduler, future
+
+  scheduler, future = asyncio.run(scenario())
+  assert future.cancelled()
+  assert not scheduler._executing and scheduler._in_flight == 0
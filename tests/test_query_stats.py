@@ -0,0 +1,67 @@
+import asyncio
+import pathlib
+import sys
+import types
+
+import aiomysql
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+  sys.path.insert(0, str(ROOT))
+
+from data_server.asyncsql import AioMysql, QueryError
+from data_server.query_stats import QuerySample, QueryStats, normalize_query
+from observer.observer_client import metrics
+
+
+def test_normalize_query_strips_values():
+  assert normalize_query("SELECT 1 FROM users WHERE discord_id = %s\n  AND name = 'bob''s'  LIMIT 10") == (
+    "SELECT ? FROM users WHERE discord_id = ? AND name = ? LIMIT ?"
+  )
+  assert normalize_query("DELETE FROM maps WHERE id IN (%s, %s, %s)") == normalize_query("DELETE FROM maps WHERE id IN (1,2)")
+  assert normalize_query("SELECT * FROM users_2") == "SELECT * FROM users_2"
+
+
+def test_top_orders_templates_and_counts_slow_queries():
+  stats = QueryStats("test_stats", slow_ms=50)
+  stats.record(QuerySample("select", "SELECT a"), 0.010)
+  stats.record(QuerySample("select", "SELECT a"), 0.020)
+  stats.record(QuerySample("change", "UPDATE b", rows=3, retries=1), 0.060)
+
+  top = stats.top(5)
+  assert [item["template"] for item in top] == ["UPDATE b", "SELECT a"]
+  assert top[0]["rows"] == 3 and top[0]["retries"] == 1
+  assert [item["template"] for item in stats.top(1, sort="calls")] == ["SELECT a"]
+  assert metrics.get_counter("test_stats_slow_queries_total", op="change") == 1
+  assert metrics.get_counter("test_stats_slow_queries_total", op="select") == 0
+  with pytest.raises(ValueError):
+    stats.top(sort="nope")
+
+
+def test_query_error_hides_parameters_and_retries_are_counted(monkeypatch):
+  mysql = AioMysql("127.0.0.1", 3306, "user", "password", "db", failure_threshold=10)
+  mysql.pool = types.SimpleNamespace(closed=False)
+  mysql._is_healthy = True
+  attempts = []
+
+  async def flaky_select(query, args):
+    attempts.append(query)
+    if len(attempts) == 1:
+      raise aiomysql.OperationalError(2013, "Lost connection")
+    raise aiomysql.ProgrammingError(1064, "syntax")
+
+  async def no_sleep(_delay):
+    return None
+
+  monkeypatch.setattr(mysql, "_execute_select_internal", flaky_select)
+  monkeypatch.setattr(asyncio, "sleep", no_sleep)
+
+  with pytest.raises(QueryError) as info:
+    asyncio.run(mysql.execute_select("SELECT steam_id FROM users WHERE discord_id = %s", ("secret-123",)))
+
+  assert "secret-123" not in str(info.value)
+  assert "параметров: 1" in str(info.value)
+  (entry,) = mysql.stats.top()
+  assert entry["template"] == "SELECT steam_id FROM users WHERE discord_id = ?"
+  assert entry["retries"] == 1 and entry["errors"] == 1
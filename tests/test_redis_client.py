@@ -0,0 +1,95 @@
+import asyncio
+import pathlib
+import sys
+
+import pytest
+from redis import asyncio as aioredis
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+  sys.path.insert(0, str(ROOT))
+
+from data_server.redis_client import AsyncRedisClient, RedisConnectionError
+
+
+class _FakeRedis:
+  def __init__(self):
+    self.down = False
+    self.calls = []
+
+  async def ping(self):
+    self.calls.append("ping")
+    if self.down:
+      raise aioredis.ConnectionError("refused")
+    return True
+
+  async def lrange(self, key, start, stop):
+    self.calls.append("lrange")
+    if self.down:
+      raise aioredis.ConnectionError("refused")
+    return [b"de_dust2"]
+
+  async def aclose(self):
+    self.calls.append("aclose")
+
+
+def _client(fake):
+  rc = AsyncRedisClient()
+  rc.client = fake
+  rc.connected = True
+  rc._ever_connected = True
+  return rc
+
+
+def test_commands_do_not_ping_and_track_health_from_outcomes():
+  fake = _FakeRedis()
+  rc = _client(fake)
+
+  async def scenario():
+    assert await rc.list_get("maps", 0) == [b"de_dust2"]
+    fake.down = True
+    with pytest.raises(aioredis.ConnectionError):
+      await rc.list_get("maps", 0)
+    assert not await rc.is_connected()
+    fake.down = False
+    await rc.list_get("maps", 0)
+
+  asyncio.run(scenario())
+  assert rc.connected
+  assert fake.calls == ["lrange", "lrange", "lrange"]
+
+
+async def _wait_for(predicate, timeout=2.0):
+  """Ждёт условия с запасом по времени: сколько тиков heartbeat уложится в интервал, зависит от нагрузки машины."""
+  loop = asyncio.get_running_loop()
+  deadline = loop.time() + timeout
+  while not predicate():
+    if loop.time() >= deadline:
+      return False
+    await asyncio.sleep(0.01)
+  return True
+
+
+def test_heartbeat_detects_outage_and_recovery():
+  fake = _FakeRedis()
+  rc = _client(fake)
+
+  async def scenario():
+    rc.start_heartbeat(0.1)
+    fake.down = True
+    lost = await _wait_for(lambda: not rc.connected)
+    pings = fake.calls.count("ping")
+    fake.down = False
+    restored = await _wait_for(lambda: rc.connected)
+    await rc.close()
+    return lost, restored, pings
+
+  lost, restored, pings = asyncio.run(scenario())
+  assert (lost, restored) == (True, True)
+  # Обрыв замечен самим heartbeat, без команд
+  assert pings >= 1 and "lrange" not in fake.calls
+
+
+def test_uninitialized_client_raises():
+  with pytest.raises(RedisConnectionError):
+    asyncio.run(AsyncRedisClient().list_get("maps", 0))
@@ -0,0 +1,628 @@
+import asyncio
+import pathlib
+import re
+import sys
+import types
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+  sys.path.insert(0, str(ROOT))
+
+config_module = sys.modules.get("config")
+if config_module is None:
+  config_module = types.SimpleNamespace()
+  sys.modules["config"] = config_module
+for name, value in (("REDIS_HOST", "127.0.0.1"), ("REDIS_PORT", 6379)):
+  if not hasattr(config_module, name):
+    setattr(config_module, name, value)
+
+from redis.exceptions import ResponseError
+
+from data_server import redis_server
+from data_server.redis_client import AsyncRedisClient
+
+
+class _FakeRedis:
+  """Списки, хэши и ZSET в памяти; значения хранятся как bytes, как их возвращает redis-py."""
+
+  def __init__(self):
+    self.data = {}
+    self.types = {}
+    self.ttls = {}
+    self.commands = []
+    self.now_ms = 0
+
+  @staticmethod
+  def _b(value):
+    return value if isinstance(value, bytes) else str(value).encode()
+
+  def _container(self, key, kind):
+    if key not in self.data:
+      self.data[key] = [] if kind == "list" else {}
+      self.types[key] = kind
+    return self.data[key]
+
+  def _zrange_sorted(self, key):
+    return [member for member, _ in sorted(self.data.get(key, {}).items(), key=lambda item: (item[1], item[0]))]
+
+  async def type(self, key):
+    return self.types.get(key, "none").encode()
+
+  async def lrange(self, key, start, stop):
+    values = self.data.get(key, [])
+    return values[start:] if stop == -1 else values[start:stop + 1]
+
+  async def zrange(self, key, start, stop):
+    members = self._zrange_sorted(key)
+    return members[start:] if stop == -1 else members[start:stop + 1]
+
+  async def hgetall(self, key):
+    return dict(self.data.get(key, {}))
+
+  async def hkeys(self, key):
+    return list(self.data.get(key, {}))
+
+  async def rpush(self, key, *values):
+    return self.apply("rpush", key, *values)
+
+  async def lrem(self, key, count, value):
+    values = self.data.get(key, [])
+    values[:] = [item for item in values if item != self._b(value)]
+
+  async def zadd(self, key, mapping):
+    return self.apply("zadd", key, mapping)
+
+  async def zrem(self, key, *members):
+    return self.apply("zrem", key, *members)
+
+  @staticmethod
+  def _lex_bound(bound, lower):
+    if bound in (b"-", b"+"):
+      return lambda member: (bound == b"-") if lower else (bound == b"+")
+    value, inclusive = bound[1:], bound[:1] == b"["
+    if lower:
+      return lambda member: member >= value if inclusive else member > value
+    return lambda member: member <= value if inclusive else member < value
+
+  async def zrangebylex(self, key, min, max, start=None, num=None):
+    self.commands.append("zrangebylex")
+    above, below = self._lex_bound(min, True), self._lex_bound(max, False)
+    members = [member for member in sorted(self.data.get(key, {})) if above(member) and below(member)]
+    return members if num is None else members[start:start + num]
+
+  async def zscan(self, key, cursor=0, match=None, count=None):
+    # Glob Redis: *, ? и экранирование обратной чертой; постранично по count
+    self.commands.append("zscan")
+    pattern = re.compile(b"".join(
+      b".*" if token == b"*" else b"." if token == b"?" else re.escape(token[-1:])
+      for token in re.findall(rb"\\.|.", match or b"*", re.S)
+    ), re.S)
+    members = [member for member in sorted(self.data.get(key, {}))]
+    page = members[cursor:cursor + (count or 10)]
+    next_cursor = cursor + len(page) if cursor + len(page) < len(members) else 0
+    return next_cursor, [(member, 0.0) for member in page if pattern.fullmatch(member)]
+
+  async def ping(self):
+    return True
+
+  async def get(self, key):
+    return self.data.get(key)
+
+  async def set(self, key, value, ex=None):
+    self.data[key] = self._b(value)
+    self.ttls[key] = ex
+
+  async def delete(self, *keys):
+    present = [key for key in keys if key in self.data]
+    self.apply("delete", *keys)
+    return len(present)
+
+  async def incr(self, key):
+    self.data[key] = int(self.data.get(key, 0)) + 1
+    return self.data[key]
+
+  async def eval(self, script, numkeys, *keys_and_args):
+    return self.apply("eval", script, numkeys, *keys_and_args)
+
+  def _eval(self, script, numkeys, *keys_and_args):
+    keys, args = keys_and_args[:numkeys], keys_and_args[numkeys:]
+    if script == redis_server.COMMIT_MAP_LISTS_SCRIPT:
+      # Python-эквивалент COMMIT_MAP_LISTS_SCRIPT
+      pairs = list(zip(keys[1::2], keys[2::2]))
+      if args[0] <= int(self.data.get(keys[0], 0)):
+        for _, staging in pairs:
+          self.data.pop(staging, None)
+          self.types.pop(staging, None)
+        return 0
+      for live, staging in pairs:
+        self.data.pop(live, None)
+        self.types.pop(live, None)
+        if staging in self.data:
+          self.data[live], self.types[live] = self.data.pop(staging), self.types.pop(staging)
+      self.data[keys[0]] = args[0]
+      return 1
+
+    # Python-эквивалент PURGE_EXPIRED_BANS_SCRIPT
+    assert script == redis_server.PURGE_EXPIRED_BANS_SCRIPT
+    (bans, expiry), (now,) = keys, args
+    expired = [member for member in self._zrange_sorted(expiry) if self.data[expiry][member] <= now]
+    for member in expired:
+      self.data[bans].pop(member, None)
+      del self.data[expiry][member]
+    return expired
+
+  # Потоки: записи [(id, поля)], у группы — последний выданный номер и неподтверждённые {id: [потребитель, время выдачи, мс]}
+  def _stream(self, key):
+    return self._container(key, "stream").setdefault("entries", [])
+
+  def _group(self, key, group):
+    groups = self.data.get(key, {}).get("groups", {})
+    if group not in groups:
+      raise ResponseError(f"NOGROUP No such key '{key}' or consumer group '{group}'")
+    return groups[group]
+
+  async def xadd(self, name, fields, maxlen=None, approximate=True):
+    entries = self._stream(name)
+    self.data[name]["seq"] = self.data[name].get("seq", 0) + 1
+    entry_id = f"{self.data[name]['seq']}-0".encode()
+    entries.append((entry_id, {self._b(k): self._b(v) for k, v in fields.items()}))
+    if maxlen is not None:
+      del entries[:max(0, len(entries) - maxlen)]
+    return entry_id
+
+  async def xgroup_create(self, name, groupname, id="$", mkstream=False):
+    groups = self._container(name, "stream").setdefault("groups", {})
+    if groupname in groups:
+      raise ResponseError("BUSYGROUP Consumer Group name already exists")
+    groups[groupname] = {"last": self.data[name].get("seq", 0) if id == "$" else 0, "pending": {}}
+    return True
+
+  def _entry(self, name, entry_id):
+    return next((entry for entry in self._stream(name) if entry[0] == entry_id), (entry_id, None))
+
+  async def xreadgroup(self, groupname, consumername, streams, count=None):
+    (name, start_id), = streams.items()
+    group = self._group(name, groupname)
+    if start_id == ">":
+      entries = [entry for entry in self._stream(name) if int(entry[0].split(b"-")[0]) > group["last"]][:count]
+      for entry_id, _ in entries:
+        group["pending"][entry_id] = [consumername, self.now_ms]
+      if entries:
+        group["last"] = int(entries[-1][0].split(b"-")[0])
+    else:
+      entries = [self._entry(name, entry_id) for entry_id, (owner, _) in group["pending"].items() if owner == consumername][:count]
+    return [[name.encode(), entries]]
+
+  async def xautoclaim(self, name, groupname, consumername, min_idle_time, count=100):
+    group = self._group(name, groupname)
+    claimed = []
+    for entry_id, pending in group["pending"].items():
+      if len(claimed) < count and self.now_ms - pending[1] >= min_idle_time:
+        group["pending"][entry_id] = [consumername, self.now_ms]
+        claimed.append(self._entry(name, entry_id))
+    return [b"0-0", claimed, []]
+
+  async def xack(self, name, groupname, *ids):
+    pending = self._group(name, groupname)["pending"]
+    return sum(1 for entry_id in ids if pending.pop(self._b(entry_id), None))
+
+  async def xrevrange(self, name, max="+", min="-", count=None):
+    return list(reversed(self._stream(name)))[:count]
+
+  def pipeline(self, transaction=True):
+    return _FakePipeline(self)
+
+  def apply(self, name, *args, **kwargs):
+    self.commands.append(name)
+    if name == "eval":
+      return self._eval(*args)
+    if name == "zrange":
+      members = self._zrange_sorted(args[0])
+      start, stop = args[1], args[2]
+      stop = len(members) + stop if stop < 0 else stop
+      return members[start:stop + 1]
+    if name == "delete":
+      for key in args:
+        self.data.pop(key, None)
+        self.types.pop(key, None)
+    elif name == "rpush":
+      self._container(args[0], "list").extend(self._b(value) for value in args[1:])
+    elif name == "hset":
+      mapping = kwargs.get("mapping") or {args[1]: args[2]}
+      self._container(args[0], "hash").update({self._b(k): self._b(v) for k, v in mapping.items()})
+    elif name == "hdel":
+      for field in args[1:]:
+        self.data.get(args[0], {}).pop(self._b(field), None)
+    elif name == "zadd":
+      self._container(args[0], "zset").update({self._b(member): score for member, score in args[1].items()})
+    elif name == "zrem":
+      for member in args[1:]:
+        self.data.get(args[0], {}).pop(self._b(member), None)
+    elif name == "zremrangebyrank":
+      key, start, stop = args
+      members = self._zrange_sorted(key)
+      stop = len(members) + stop if stop < 0 else stop
+      for member in members[start:max(start, stop + 1)]:
+        del self.data[key][member]
+
+
+class _FakePipeline:
+  def __init__(self, redis):
+    self.redis = redis
+    self.queued = []
+
+  async def __aenter__(self):
+    return self
+
+  async def __aexit__(self, *exc):
+    return False
+
+  def __getattr__(self, name):
+    return lambda *args, **kwargs: self.queued.append((name, args, kwargs))
+
+  async def execute(self):
+    return [self.redis.apply(name, *args, **kwargs) for name, args, kwargs in self.queued]
+
+
+def _install(monkeypatch, fake, limit=3):
+  rc = AsyncRedisClient()
+  rc.client = fake
+  rc.connected = True
+  monkeypatch.setattr(redis_server, "rc", rc)
+  monkeypatch.setattr(config_module, "REDIS_LAST_PLAYERS_LIMIT", limit, raising=False)
+
+
+def test_info_push_updates_last_seen_and_trims(monkeypatch):
+  fake = _FakeRedis()
+  _install(monkeypatch, fake)
+  clock = iter(range(100, 200))
+  monkeypatch.setattr(redis_server.time, "time", lambda: next(clock))
+
+  async def scenario():
+    for names in (["a", "b"], ["c"], ["a"], ["d"]):
+      await redis_server.ev_add_players_to_list({"current_players": [{"name": name} for name in names]})
+    return await redis_server.route_get_offline_players()
+
+  # b выпал по лимиту 3; a перемещён в конец повторным появлением; список — от старых к свежим
+  assert asyncio.run(scenario()) == ["c", "a", "d"]
+  assert "lrem" not in fake.commands
+
+
+def test_existing_list_is_migrated_preserving_order(monkeypatch):
+  fake = _FakeRedis()
+  _install(monkeypatch, fake, limit=10)
+  fake.apply("rpush", redis_server.RedisTable.LastPlayers, "old", "dup", "mid", "dup", "new")
+
+  async def scenario():
+    migrated = await redis_server.migrate_last_players()
+    again = await redis_server.migrate_last_players()
+    return migrated, again, await redis_server.route_get_offline_players()
+
+  migrated, again, players = asyncio.run(scenario())
+  assert (migrated, again) == (4, 0)
+  assert players == ["old", "mid", "dup", "new"]
+
+
+def test_bans_registry_expires_timed_bans(monkeypatch):
+  fake = _FakeRedis()
+  _install(monkeypatch, fake)
+  now = [1_000.0]
+  monkeypatch.setattr(redis_server.time, "time", lambda: now[0])
+  admin = types.SimpleNamespace(user=types.SimpleNamespace(display_name="Asura", id=7))
+
+  async def scenario():
+    await redis_server.ev_add_ban({redis_server.Param.Interaction: admin, "target": "perm", "minutes": 0, "reason": "cheat"})
+    now[0] += 1
+    await redis_server.ev_add_ban({redis_server.Param.Interaction: admin, "target": "short", "minutes": 5})
+    now[0] += 1
+    await redis_server.ev_add_ban({redis_server.Param.Interaction: admin, "target": "unbanned", "minutes": 60})
+    await redis_server.ev_unban_ban({"target": "unbanned"})
+    before = await redis_server.route_get_banned_players()
+    now[0] += 5 * 60
+    after = await redis_server.route_get_banned_players()
+    return before, after
+
+  before, after = asyncio.run(scenario())
+  assert before == ["perm", "short"]
+  assert after == ["perm"]
+  assert fake.data[redis_server.RedisTable.BannedExpiry] == {}
+  record = fake.data[redis_server.RedisTable.BannedPlayers][b"perm"]
+  assert b'"admin": "Asura"' in record and b'"expires_at": 0' in record
+
+
+def test_banned_list_is_migrated_to_hash(monkeypatch):
+  fake = _FakeRedis()
+  _install(monkeypatch, fake)
+  fake.apply("rpush", redis_server.RedisTable.BannedPlayers, "a", "b", "a")
+
+  async def scenario():
+    migrated = await redis_server.migrate_banned_players()
+    return migrated, await redis_server.migrate_banned_players(), await redis_server.route_get_banned_players()
+
+  migrated, again, bans = asyncio.run(scenario())
+  assert (migrated, again) == (2, 0)
+  assert sorted(bans) == ["a", "b"]
+
+
+def test_autocomplete_prefix_then_infix_fallback(monkeypatch):
+  fake = _FakeRedis()
+  _install(monkeypatch, fake)
+
+  async def scenario():
+    await redis_server.rebuild_map_lists([(name, 1) for name in ("de_dust2", "de_Dust", "cs_office", "aim_dust*", "de_nuke")])
+    prefix = await redis_server.route_autocomplete("maps_all", "DE_D", 2)
+    mixed = await redis_server.route_autocomplete("maps_active", "dust", 25)
+    glob = await redis_server.route_autocomplete("maps_all", "t*", 25)
+    empty = await redis_server.route_autocomplete("maps_all", "", 3)
+    return prefix, mixed, glob, empty
+
+  prefix, mixed, glob, empty = asyncio.run(scenario())
+  # Префиксная выборка отдаёт исходный регистр и не идёт в ZSCAN, если кандидатов хватило
+  assert prefix == ["de_Dust", "de_dust2"]
+  assert fake.commands.count("zscan") == 2
+  # Префиксом "dust" не начинается ни одна карта — всё найдено подстрокой
+  assert mixed == ["aim_dust*", "de_Dust", "de_dust2"]
+  # Символы glob во вводе экранируются
+  assert glob == ["aim_dust*"]
+  assert empty == ["aim_dust*", "cs_office", "de_Dust"]
+  assert asyncio.run(redis_server.route_autocomplete("unknown", "x")) == []
+
+
+def test_autocomplete_infix_scan_is_capped(monkeypatch):
+  fake = _FakeRedis()
+  _install(monkeypatch, fake)
+  monkeypatch.setattr(redis_server, "AUTOCOMPLETE_SCAN_COUNT", 10)
+  monkeypatch.setattr(config_module, "REDIS_AUTOCOMPLETE_SCAN_PAGES", 2, raising=False)
+  # Префиксу "ru" отвечает одна карта; подстрока "ru" есть ещё в начале и в самом конце большого набора
+  names = ["ru_map", "aa_ru"] + [f"de_{index:03d}" for index in range(100)] + ["zz_ru"]
+
+  async def scenario():
+    await redis_server.rebuild_map_lists([(name, 1) for name in names])
+    return await redis_server.route_autocomplete("maps_all", "ru", 25)
+
+  # Обход остановился после двух запросов ZSCAN: до zz_ru он не дошёл, но найденное отдаётся
+  assert asyncio.run(scenario()) == ["ru_map", "aa_ru"]
+  assert fake.commands.count("zscan") == 2
+
+
+def test_lex_indexes_follow_dataset_mutations(monkeypatch):
+  fake = _FakeRedis()
+  _install(monkeypatch, fake, limit=2)
+  now = [1_000.0]
+  monkeypatch.setattr(redis_server.time, "time", lambda: now[0])
+  admin = types.SimpleNamespace(user=types.SimpleNamespace(display_name="Asura", id=7))
+  table = redis_server.RedisTable
+
+  def names(key):
+    return sorted(redis_server._lex_name(member) for member in fake.data.get(redis_server.lex_key(key), {}))
+
+  async def scenario():
+    for batch in (["Вася"], ["Петя"], ["Коля"]):
+      now[0] += 1
+      await redis_server.ev_add_players_to_list({"current_players": [{"name": name} for name in batch]})
+    await redis_server.route_update_map_list("add", "de_inferno", 1)
+    await redis_server.route_update_map_list("update", "de_inferno", 0)
+    await redis_server.ev_add_ban({redis_server.Param.Interaction: admin, "target": "short", "minutes": 1})
+    await redis_server.ev_add_ban({redis_server.Param.Interaction: admin, "target": "perm", "minutes": 0})
+    now[0] += 120
+    return await redis_server.route_autocomplete("last_players", "в", 25), await redis_server.route_autocomplete("bans", "", 25)
+
+  vasya, bans = asyncio.run(scenario())
+  # Вася обрезан лимитом вместе со своей записью индекса; кириллица приводится к нижнему регистру в Python
+  assert names(table.LastPlayers) == ["Коля", "Петя"] and vasya == []
+  assert names(table.MapListAll) == ["de_inferno"] and names(table.MapListActive) == []
+  assert bans == ["perm"] and names(table.BannedPlayers) == ["perm"]
+
+
+def test_rebuild_lex_index_reads_any_dataset_type(monkeypatch):
+  fake = _FakeRedis()
+  _install(monkeypatch, fake)
+  table = redis_server.RedisTable
+  fake.apply("rpush", table.MapListAll, "b", "A")
+  fake.apply("zadd", table.LastPlayers, {"z": 1, "y": 2})
+  fake.apply("hset", table.BannedPlayers, "x", "{}")
+  fake.apply("zadd", redis_server.lex_key(table.MapListAll), {redis_server.lex_member("stale"): 0})
+
+  async def scenario():
+    return [await redis_server.rebuild_lex_index(key) for key in (table.MapListAll, table.LastPlayers, table.BannedPlayers, table.MapListActive)]
+
+  assert asyncio.run(scenario()) == [2, 2, 1, 0]
+  assert sorted(fake.data[redis_server.lex_key(table.MapListAll)]) == [b"a\x00A", b"b\x00b"]
+
+
+def test_map_lists_swap_in_from_staging_and_reject_stale_rebuild(monkeypatch):
+  fake = _FakeRedis()
+  _install(monkeypatch, fake)
+  table = redis_server.RedisTable
+  snapshots = {}
+
+  async def fake_call_route(path, *args):
+    assert path == "/get_map_list"
+    # Пока первая синхронизация читает SQL, вторая успевает начаться и применить свежий снимок
+    if not snapshots:
+      snapshots["first"] = True
+      await redis_server.ev_sync_maps()
+      return [("de_old", 1)]
+    return [("de_new", 1), ("de_off", 0)]
+
+  monkeypatch.setattr(redis_server.nsroute, "call_route", fake_call_route)
+
+  async def scenario():
+    await redis_server.rebuild_map_lists([("de_seed", 1)])
+    await redis_server.ev_sync_maps()
+    return await redis_server.route_get_map_list_all(), await redis_server.route_get_map_list_active()
+
+  all_maps, active_maps = asyncio.run(scenario())
+  assert (all_maps, active_maps) == (["de_new", "de_off"], ["de_new"])
+  assert fake.data[table.MapListApplied] == 3
+  # Отклонённая пересборка #2 не оставляет staging-ключей
+  assert not [key for key in fake.data if ":staging:" in str(key)]
+  assert sorted(fake.data[redis_server.lex_key(table.MapListActive)]) == [b"de_new\x00de_new"]
+
+
+def test_rebuild_route_keeps_version_taken_before_select(monkeypatch):
+  fake = _FakeRedis()
+  _install(monkeypatch, fake)
+  table = redis_server.RedisTable
+
+  async def scenario():
+    # Импорт взял номер до SELECT, а синхронизация успела примениться, пока он читал карты
+    version = await redis_server.route_next_map_list_version()
+    await redis_server.rebuild_map_lists([("de_new", 1)])
+    applied = await redis_server.route_rebuild_map_lists([("de_old", 1)], version)
+    return applied, await redis_server.route_get_map_list_all()
+
+  assert asyncio.run(scenario()) == (False, ["de_new"])
+  assert fake.data[table.MapListApplied] == 2
+
+
+def test_check_steam_two_tier_cache(monkeypatch):
+  fake = _FakeRedis()
+  _install(monkeypatch, fake)
+  monkeypatch.setattr(config_module, "REDIS_CHECK_STEAM_TTL", 600, raising=False)
+  monkeypatch.setattr(config_module, "REDIS_CHECK_STEAM_NEGATIVE_TTL", 60, raising=False)
+  steam_cache = redis_server.steam_cache
+  steam_cache.clear()
+  registered, unregistered = 76561197960265729, 76561197960265731
+  db_calls = []
+
+  async def fake_call_route(path, steam_id64):
+    assert path == "/check_user"
+    db_calls.append(steam_id64)
+    return "42" if steam_id64 == registered else None
+
+  monkeypatch.setattr(redis_server.nsroute, "call_route", fake_call_route)
+  counter = lambda tier: redis_server.metrics.get_counter("check_steam_lookups_total", tier=tier)
+  before = {tier: counter(tier) for tier in ("local", "redis", "db")}
+
+  async def scenario():
+    # STEAM_0 и STEAM_1 — один ключ на обоих уровнях
+    results = [await redis_server.check_steam("STEAM_0:1:0"), await redis_server.check_steam("STEAM_1:1:0")]
+    results.append(await redis_server.check_steam("STEAM_0:1:1"))
+    steam_cache.clear()  # перезапуск процесса: первый уровень пуст, Redis помнит
+    results += [await redis_server.check_steam("STEAM_0:1:0"), await redis_server.check_steam("STEAM_0:1:1")]
+    await redis_server.ev_user_changed({"steam_id64": unregistered, "discord_id": "43"})
+    return results
+
+  assert asyncio.run(scenario()) == [42, 42, None, 42, None]
+  assert db_calls == [registered, unregistered]
+  assert fake.data[redis_server.steam_cache_key(registered)] == b"42"
+  assert fake.ttls[redis_server.steam_cache_key(registered)] == 600
+  # Регистрация сбросила негативную запись на обоих уровнях
+  assert redis_server.steam_cache_key(unregistered) not in fake.data
+  assert unregistered not in steam_cache
+  assert {tier: counter(tier) - before[tier] for tier in before} == {"local": 1, "redis": 2, "db": 2}
+  steam_cache.clear()
+
+
+def test_check_steam_does_not_store_answer_invalidated_during_lookup(monkeypatch):
+  fake = _FakeRedis()
+  _install(monkeypatch, fake)
+  redis_server.steam_cache.clear()
+  steam_id64 = 76561197960265729
+
+  async def fake_call_route(path, value):
+    # Регистрация закоммичена, пока /check_user читал базу
+    await redis_server.ev_user_changed({"steam_id64": steam_id64, "discord_id": "42"})
+    return None
+
+  monkeypatch.setattr(redis_server.nsroute, "call_route", fake_call_route)
+
+  assert asyncio.run(redis_server.check_steam("STEAM_0:1:0")) is None
+  assert redis_server.steam_cache_key(steam_id64) not in fake.data
+  assert steam_id64 not in redis_server.steam_cache
+
+
+def test_runtime_state_sections_roundtrip(monkeypatch):
+  fake = _FakeRedis()
+  _install(monkeypatch, fake)
+
+  async def scenario():
+    await redis_server.route_save_runtime_state({"status": '{"message_id": 1}', "chat": '{"content": "привет"}'})
+    await redis_server.route_save_runtime_state({"status": '{"message_id": 2}'})
+    return await redis_server.route_load_runtime_state()
+
+  assert asyncio.run(scenario()) == {"status": '{"message_id": 2}', "chat": '{"content": "привет"}'}
+
+
+def test_chat_relay_redelivers_until_ack_and_standby_takes_over(monkeypatch):
+  fake = _FakeRedis()
+  _install(monkeypatch, fake)
+  monkeypatch.setattr(config_module, "CHAT_RELAY_STREAM", "chat:relay", raising=False)
+  monkeypatch.setattr(config_module, "CHAT_RELAY_MAXLEN", 3, raising=False)
+  monkeypatch.setattr(config_module, "CHAT_RELAY_CLAIM_IDLE_SEC", 30, raising=False)
+  monkeypatch.setattr(redis_server, "CHAT_RELAY_CONSUMER", "primary")
+  monkeypatch.setattr(redis_server, "chat_relay_last_claim", redis_server.time.monotonic())
+
+  async def read():
+    return [message for _, message in await redis_server.route_chat_relay_read(100)]
+
+  async def scenario():
+    await redis_server.rc.stream_group_create("chat:relay", redis_server.CHAT_RELAY_GROUP)
+    for message in ("a", "b"):
+      await redis_server.route_chat_relay_append(message)
+
+    first = await read()
+    # Отправка не удалась — подтверждения нет, записи приходят снова
+    again = await redis_server.route_chat_relay_read(100)
+    await redis_server.route_chat_relay_ack([again[0][0]])
+
+    # Основной процесс пропал с неподтверждённой «b»: резервный забирает её после простоя
+    monkeypatch.setattr(redis_server, "CHAT_RELAY_CONSUMER", "standby")
+    await redis_server.route_chat_relay_append("c")
+    fake.now_ms = 31_000
+    monkeypatch.setattr(redis_server, "chat_relay_last_claim", 0.0)
+    claimed = await redis_server.route_chat_relay_read(100)
+    await redis_server.route_chat_relay_ack([entry_id for entry_id, _ in claimed])
+    fresh = await read()
+
+    for message in ("d", "e"):
+      await redis_server.route_chat_relay_append(message)
+    return first, [message for _, message in again], [message for _, message in claimed], fresh, await redis_server.route_chat_relay_history(10)
+
+  first, again, claimed, fresh, history = asyncio.run(scenario())
+  assert first == again == ["a", "b"]
+  assert claimed == ["b"]
+  assert fresh == ["c"]
+  # MAXLEN: в потоке остаются последние записи, история — от старых к новым
+  assert [message for _, message in history] == ["c", "d", "e"]
+
+
+def test_chat_relay_recreates_missing_group_and_is_off_without_stream(monkeypatch):
+  fake = _FakeRedis()
+  _install(monkeypatch, fake)
+  monkeypatch.setattr(config_module, "CHAT_RELAY_STREAM", "chat:relay", raising=False)
+  monkeypatch.setattr(redis_server, "chat_relay_last_claim", redis_server.time.monotonic())
+
+  async def scenario():
+    missing = await redis_server.route_chat_relay_read(100)
+    await redis_server.route_chat_relay_append("a")
+    delivered = await redis_server.route_chat_relay_read(100)
+    monkeypatch.setattr(config_module, "CHAT_RELAY_STREAM", "", raising=False)
+    return missing, delivered, await redis_server.route_chat_relay_append("b")
+
+  missing, delivered, disabled = asyncio.run(scenario())
+  assert missing == [] and [message for _, message in delivered] == ["a"]
+  assert disabled is None
+
+
+def test_restored_connection_reruns_migrations_and_lex_rebuild(monkeypatch):
+  fake = _FakeRedis()
+  _install(monkeypatch, fake, limit=10)
+  table = redis_server.RedisTable
+
+  async def scenario():
+    rc = redis_server.rc
+    rc.connected = False
+    rc.add_restore_hook(redis_server.ev_redis_restored)
+    # Пока Redis лежал, его подняли из старого дампа: список вместо ZSET, :lex-индексов нет
+    fake.apply("rpush", table.LastPlayers, "old", "new")
+    fake.apply("rpush", table.MapListAll, "de_dust2")
+    assert await rc.ping()
+    await asyncio.gather(*rc._restore_tasks)
+    return await redis_server.route_get_offline_players()
+
+  assert asyncio.run(scenario()) == ["old", "new"]
+  assert fake.types[table.LastPlayers] == "zset"
+  assert fake.data[redis_server.lex_key(table.LastPlayers)] == {b"new\x00new": 0, b"old\x00old": 0}
+  assert redis_server.lex_key(table.MapListAll) in fake.data
@@ -0,0 +1,137 @@
+import asyncio
+import pathlib
+import sys
+
+import pytest
+
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+  sys.path.insert(0, str(ROOT))
+
+from observer.circuit_breaker import BreakerState, CircuitBreaker
+from observer.metrics import Metrics
+from observer.observer import NoServerRoute, RouteUnavailableError
+
+
+class _Clock:
+  def __init__(self):
+    self.now = 0.0
+
+  def __call__(self):
+    return self.now
+
+
+def test_circuit_breaker_opens_after_threshold_and_recovers_via_half_open():
+  clock = _Clock()
+  transitions = []
+  breaker = CircuitBreaker(
+    "db",
+    failure_threshold=2,
+    reset_timeout=10,
+    clock=clock,
+    on_transition=lambda _b, old, new: transitions.append((old, new)),
+  )
+
+  breaker.record_failure()
+  assert breaker.allow()
+  breaker.record_failure()
+  assert breaker.state is BreakerState.OPEN
+  assert not breaker.allow()
+
+  clock.now = 10
+  assert breaker.allow()
+  assert not breaker.allow()  # только один пробный вызов в half_open
+  breaker.record_success()
+  assert breaker.state is BreakerState.CLOSED
+  assert transitions == [
+    (BreakerState.CLOSED, BreakerState.OPEN),
+    (BreakerState.OPEN, BreakerState.HALF_OPEN),
+    (BreakerState.HALF_OPEN, BreakerState.CLOSED),
+  ]
+
+
+def test_circuit_breaker_half_open_failure_reopens():
+  clock = _Clock()
+  breaker = CircuitBreaker("db", failure_threshold=1, reset_timeout=5, clock=clock)
+  breaker.record_failure()
+  clock.now = 5
+  assert breaker.allow()
+  breaker.record_failure()
+  assert breaker.state is BreakerState.OPEN
+  assert not breaker.allow()
+
+
+def test_route_without_policy_keeps_plain_behaviour():
+  route = NoServerRoute()
+
+  @route.create_route("/echo")
+  async def echo(value):
+    return value
+
+  async def scenario():
+    assert await route.call_route("/echo", 5) == 5
+    assert await route.call_route("/missing") is None
+
+  asyncio.run(scenario())
+
+
+def test_route_timeout_returns_fallback_and_opens_breaker():
+  metrics = Metrics()
+  route = NoServerRoute(metrics=metrics)
+  calls = []
+
+  @route.create_route("/slow", timeout=0.01, failure_threshold=2, reset_timeout=60, fallback="fallback")
+  async def slow():
+    calls.append(1)
+    await asyncio.sleep(1)
+
+  async def scenario():
+    assert await route.call_route("/slow") == "fallback"
+    assert await route.call_route("/slow") == "fallback"
+    assert route.breaker_state("/slow") is BreakerState.OPEN
+    # Автомат открыт: маршрут больше не вызывается
+    assert await route.call_route("/slow") == "fallback"
+
+  asyncio.run(scenario())
+  assert len(calls) == 2
+  assert metrics.get_gauge("route_breaker_state", route="/slow") == 2
+  assert metrics.get_counter("route_calls_total", route="/slow", outcome="rejected") == 1
+
+
+def test_route_without_fallback_raises_timeout_compatible_error():
+  route = NoServerRoute()
+
+  @route.create_route("/slow", timeout=0.01)
+  async def slow():
+    await asyncio.sleep(1)
+
+  async def scenario():
+    with pytest.raises(asyncio.TimeoutError) as err:
+      await route.call_route("/slow")
+    assert isinstance(err.value, RouteUnavailableError)
+    assert err.value.reason == "timeout"
+
+  asyncio.run(scenario())
+
+
+def test_route_max_concurrency_limits_parallel_calls():
+  route = NoServerRoute()
+  active = 0
+  peak = 0
+
+  @route.create_route("/limited", max_concurrency=2)
+  async def limited():
+    nonlocal active, peak
+    active += 1
+    peak = max(peak, active)
+    await asyncio.sleep(0.01)
+    active -= 1
+    return True
+
+  async def scenario():
+    results = await asyncio.gather(*(route.call_route("/limited") for _ in range(6)))
+    assert all(results)
+
+  asyncio.run(scenario())
+  assert peak == 2
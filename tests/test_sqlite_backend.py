@@ -0,0 +1,130 @@
+import asyncio
+import pathlib
+import sqlite3
+import sys
+
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+  sys.path.insert(0, str(ROOT))
+
+from data_server.asyncsql import MultipleQueryError, QueryError
+from data_server.sqlite_backend import AioSqlite, translate_placeholders
+from data_server.steamid import to_steamid64
+from data_server.user_sync import UserAssociationSync
+
+
+def test_translate_placeholders_skips_string_literals():
+  query = "SELECT * FROM maps WHERE map_name = %s AND note LIKE 'a%s' AND pct = '100%%' OR x = 5 %% 2"
+  assert translate_placeholders(query) == "SELECT * FROM maps WHERE map_name = ? AND note LIKE 'a%s' AND pct = '100%%' OR x = 5 % 2"
+
+
+def _run(scenario):
+  async def wrapper():
+    db = AioSqlite(":memory:")
+    await db.connect()
+    try:
+      return await scenario(db)
+    finally:
+      await db.close()
+
+  return asyncio.run(wrapper())
+
+
+def test_crud_and_exec_many_rollback():
+  async def scenario(db):
+    insert = "INSERT INTO maps (map_name, activated, min_players, max_players, priority) VALUES (%s, %s, %s, %s, %s)"
+    assert await db.execute_change(insert, ("de_dust2", 1, 0, 32, 100)) == 1
+    assert await db.execute_select("SELECT EXISTS(SELECT 1 FROM maps WHERE map_name = %s LIMIT 1)", ("de_dust2",)) == [(1,)]
+
+    # Дубль во второй строке откатывает весь пакет
+    with pytest.raises(MultipleQueryError):
+      await db.exec_many(insert, [("de_inferno", 1, 0, 32, 100), ("de_dust2", 1, 0, 32, 100)])
+    with pytest.raises(QueryError):
+      await db.execute_select("SELECT * FROM missing_table")
+
+    assert await db.execute_change("UPDATE maps SET activated = %s WHERE map_name = %s", (0, "de_dust2")) == 1
+    return await db.execute_select("SELECT map_name, activated FROM maps")
+
+  assert _run(scenario) == [("de_dust2", 0)]
+
+
+def test_transaction_rollback_and_commit():
+  async def scenario(db):
+    transaction = db.transaction()
+    await transaction.begin()
+    await transaction.execute("INSERT INTO users (discord_id, steam_id) VALUES (%s, %s)", ("1", "STEAM_0:0:1"))
+    _, rows = await transaction.execute("SELECT steam_id FROM users WHERE discord_id = %s FOR UPDATE", ("1",))
+    assert rows == [("STEAM_0:0:1",)]
+    await transaction.rollback()
+    await transaction.close()
+    assert await db.execute_select("SELECT COUNT(*) FROM users") == [(0,)]
+
+    transaction = db.transaction()
+    await transaction.begin()
+    await transaction.execute("INSERT INTO users (discord_id, steam_id) VALUES (%s, %s)", ("2", "STEAM_0:0:2"))
+    await transaction.commit()
+    await transaction.close()
+    return await db.execute_select("SELECT discord_id, steam_id FROM users")
+
+  # discord_id хранится строкой, как VARCHAR(32) в MySQL
+  assert _run(scenario) == [("2", "STEAM_0:0:2")]
+
+
+def test_fetch_iter_keyset_and_full_user_sync():
+  async def scenario(db):
+    await db.exec_many(
+      "INSERT INTO users (discord_id, steam_id) VALUES (%s, %s)",
+      [(str(index), f"STEAM_0:0:{index + 1:04d}") for index in range(25)],
+    )
+    streamed = [row async for row in db.fetch_iter("SELECT steam_id FROM users ORDER BY id", batch_size=4)]
+    paged = [row async for row in db.fetch_keyset("SELECT steam_id, discord_id FROM users", "steam_id", batch_size=10)]
+
+    sync = UserAssociationSync(db)
+    steam_discord, discord_steam = await sync.sync({}, {})
+    return streamed, paged, steam_discord, discord_steam, sync
+
+  streamed, paged, steam_discord, discord_steam, sync = _run(scenario)
+  assert len(streamed) == 25
+  assert paged == [(f"STEAM_0:0:{index + 1:04d}", str(index)) for index in range(25)]
+  assert steam_discord[to_steamid64("STEAM_0:0:8")] == "7"
+  assert discord_steam["7"] == to_steamid64("STEAM_0:0:0008")
+  assert not sync.tombstones_enabled
+
+
+def test_fetch_keyset_resumes_after_failed_page_without_gaps():
+  async def scenario(db):
+    await db.exec_many(
+      "INSERT INTO users (discord_id, steam_id) VALUES (%s, %s)",
+      [(str(index), f"STEAM_0:0:{index + 1:04d}") for index in range(25)],
+    )
+    query = "SELECT steam_id, discord_id FROM users"
+    execute_sync = db._execute_sync
+    pages = []
+
+    # Вторая страница падает один раз, как при обрыве соединения
+    def flaky_execute_sync(sql, args):
+      if "keyset_src" in sql:
+        pages.append(args)
+        if len(pages) == 2:
+          raise sqlite3.OperationalError("disk I/O error")
+      return execute_sync(sql, args)
+
+    db._execute_sync = flaky_execute_sync
+    received = []
+    with pytest.raises(QueryError):
+      async for row in db.fetch_keyset(query, "steam_id", batch_size=10):
+        received.append(row)
+    interrupted = len(received)
+
+    # Повтор продолжает с последнего полученного ключа
+    async for row in db.fetch_keyset(query, "steam_id", batch_size=10, start_after=received[-1][0]):
+      received.append(row)
+    return interrupted, received, pages
+
+  interrupted, received, pages = _run(scenario)
+  assert interrupted == 10
+  assert [steam_id for steam_id, _ in received] == [f"STEAM_0:0:{index + 1:04d}" for index in range(25)]
+  # Упавшая и повторённая страницы запрошены с одним и тем же ключом
+  assert pages[1][0] == pages[2][0] == "STEAM_0:0:0010"
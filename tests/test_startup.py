@@ -0,0 +1,79 @@
+import asyncio
+import pathlib
+import sys
+
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+  sys.path.insert(0, str(ROOT))
+
+from observer.metrics import Metrics
+from observer.observer import Event, Observer
+from observer.startup import StartupReport, run_startup
+
+
+def test_startup_subscribers_run_in_parallel_and_are_timed():
+  observer = Observer()
+  metrics = Metrics()
+  now = [0.0]
+  entered = []
+
+  async def enter_together(name):
+    # Каждый шаг ждёт, пока начнётся второй: при последовательном запуске прогрев упрётся в таймаут
+    entered.append(name)
+    while len(entered) < 2:
+      await asyncio.sleep(0)
+
+  @observer.subscribe(Event.BE_STARTUP)
+  async def slow_db(report):
+    async with report.step("db"):
+      await enter_together("db")
+      now[0] += 0.05
+
+  @observer.subscribe(Event.BE_STARTUP)
+  async def broken_redis(report):
+    async with report.step("redis"):
+      await enter_together("redis")
+      raise RuntimeError("refused")
+
+  report = asyncio.run(run_startup(observer, StartupReport(metrics=metrics, clock=lambda: now[0]), timeout=5))
+
+  assert not report.timed_out
+  assert report.failed == {"redis": "refused"}
+  assert report.finished_at - report.started_at == pytest.approx(0.05)
+  assert metrics.get_gauge("startup_step_seconds", step="db") == pytest.approx(0.05)
+  assert "redis" in report.summary() and "refused" in report.summary()
+
+
+def test_startup_timeout_does_not_cancel_subscribers():
+  observer = Observer()
+  finished = []
+
+  @observer.subscribe(Event.BE_STARTUP)
+  async def slow(report):
+    await asyncio.sleep(0.05)
+    finished.append(True)
+
+  async def scenario():
+    report = await run_startup(observer, StartupReport(), timeout=0.01)
+    assert report.timed_out
+    await asyncio.sleep(0.1)
+    return report
+
+  report = asyncio.run(scenario())
+  assert finished == [True]
+  assert "таймауту" in report.summary()
+
+
+def test_step_reraises_errors():
+  async def scenario():
+    report = StartupReport()
+    with pytest.raises(ValueError):
+      await report.run("bad", _fail())
+    return report
+
+  async def _fail():
+    raise ValueError("x")
+
+  assert asyncio.run(scenario()).failed == {"bad": "x"}
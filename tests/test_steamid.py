@@ -0,0 +1,38 @@
+import pathlib
+import sys
+
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+  sys.path.insert(0, str(ROOT))
+
+from data_server.steamid import STEAMID64_BASE, to_steam2, to_steamid64
+
+STEAMID64 = 76561198051639179  # STEAM_0:1:45686725
+
+
+@pytest.mark.parametrize("value", [
+  "STEAM_0:1:45686725",
+  "STEAM_1:1:45686725",
+  "valve_0:1:45686725",
+  "[U:1:91373451]",
+  "U:1:91373451",
+  " 76561198051639179 ",
+  STEAMID64,
+])
+def test_every_accepted_form_maps_to_one_steamid64(value):
+  assert to_steamid64(value) == STEAMID64
+
+
+@pytest.mark.parametrize("value", [
+  "BOT", "STEAM_ID_LAN", "", None, True, "STEAM_0:2:1", "STEAM_0:0:0",
+  "STEAM_0:1:99999999999", "12345678901234567", STEAMID64_BASE + 2 ** 32,
+])
+def test_invalid_values_are_rejected(value):
+  assert to_steamid64(value) is None
+
+
+def test_steam2_round_trip():
+  assert to_steam2(STEAMID64) == "STEAM_0:1:45686725"
+  assert to_steamid64(to_steam2(STEAMID64, universe=1)) == STEAMID64
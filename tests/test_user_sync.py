@@ -0,0 +1,134 @@
+import asyncio
+import pathlib
+import sys
+from datetime import datetime, timedelta
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+  sys.path.insert(0, str(ROOT))
+
+from data_server.steamid import to_steamid64
+from data_server.user_sync import UserAssociationSync, merge_user_changes
+
+T0 = datetime(2026, 1, 1, 12, 0, 0)
+S1, S2, S3 = (to_steamid64(f"STEAM_0:0:{index}") for index in (1, 2, 3))
+
+
+def _at(seconds: int) -> datetime:
+  return T0 + timedelta(seconds=seconds)
+
+
+class _FakeMysql:
+  def __init__(self, users, tombstones, delta_supported=True):
+    self.users = users  # [(steam_id, discord_id, updated_at)]
+    self.tombstones = tombstones  # [(steam_id, discord_id, deleted_at)]
+    self.delta_supported = delta_supported
+    self.queries = []
+
+  async def execute_select(self, query, args=()):
+    self.queries.append(query)
+    if "information_schema" in query:
+      flag = 1 if self.delta_supported else 0
+      return [(flag, flag)]
+    if query.startswith("SELECT MAX(deleted_at)"):
+      return [(max((row[2] for row in self.tombstones), default=None),)]
+    if "FROM users_tombstones WHERE" in query:
+      return [row for row in self.tombstones if row[2] > args[0]]
+    if "FROM users WHERE updated_at" in query:
+      return [row for row in self.users if row[2] > args[0]]
+    if query == "SELECT steam_id, discord_id, updated_at FROM users":
+      return list(self.users)
+    if query == "SELECT steam_id, discord_id FROM users":
+      return [row[:2] for row in self.users]
+    raise AssertionError(query)
+
+  async def fetch_keyset(self, query, key_column, *, args=(), batch_size=500, start_after=None):
+    for row in await self.execute_select(query, args):
+      yield row
+
+  async def execute_change(self, query, args=()):
+    return 0
+
+
+def test_merge_applies_upserts_and_tombstones_in_time_order():
+  s2d = {"STEAM_0:0:1": 10, "STEAM_0:0:2": 20}
+  d2s = {10: "STEAM_0:0:1", 20: "STEAM_0:0:2"}
+
+  new_s2d, new_d2s = merge_user_changes(
+    s2d,
+    d2s,
+    upserts=[("STEAM_0:0:3", 30, _at(2)), ("STEAM_0:0:1", 10, _at(5))],
+    tombstones=[("STEAM_0:0:2", "20", _at(1)), ("STEAM_0:0:1", "10", _at(4))],
+  )
+
+  assert new_s2d == {"STEAM_0:0:1": 10, "STEAM_0:0:3": 30}
+  assert new_d2s == {10: "STEAM_0:0:1", 30: "STEAM_0:0:3"}
+  # Исходные словари не меняются — подмена целиком
+  assert s2d == {"STEAM_0:0:1": 10, "STEAM_0:0:2": 20}
+
+
+def test_sync_uses_full_then_delta_with_overlap():
+  mysql = _FakeMysql(
+    users=[("STEAM_0:0:1", 10, _at(0)), ("STEAM_0:0:2", 20, _at(1))],
+    tombstones=[],
+  )
+  sync = UserAssociationSync(mysql, full_sync_every=100)
+
+  async def scenario():
+    s2d, d2s = await sync.sync({}, {})
+    assert s2d == {S1: 10, S2: 20}
+
+    # Нет изменений — словари не пересобираются
+    assert await sync.sync(s2d, d2s) is None
+
+    mysql.users = [("STEAM_0:0:1", 10, _at(0)), ("STEAM_0:0:3", 30, _at(10))]
+    mysql.tombstones = [("STEAM_0:0:2", "20", _at(9))]
+    return await sync.sync(s2d, d2s)
+
+  s2d, d2s = asyncio.run(scenario())
+  assert s2d == {S1: 10, S3: 30}
+  assert d2s == {10: S1, 30: S3}
+  assert sync.users_watermark == _at(10)
+  assert sum("SELECT steam_id, discord_id, updated_at FROM users" == query for query in mysql.queries) == 1
+
+
+def test_emptied_table_clears_cache_and_enables_delta():
+  mysql = _FakeMysql(users=[], tombstones=[])
+  sync = UserAssociationSync(mysql, full_sync_every=100)
+
+  async def scenario():
+    emptied = await sync.sync({S1: 10}, {10: S1})
+    mysql.users = [("STEAM_0:0:2", 20, _at(3))]
+    return emptied, await sync.sync(*emptied)
+
+  emptied, after_insert = asyncio.run(scenario())
+  assert emptied == ({}, {})
+  assert after_insert == ({S2: 20}, {20: S2})
+  # Вторая синхронизация — уже delta, без полной выгрузки
+  assert sum("SELECT steam_id, discord_id, updated_at FROM users" == query for query in mysql.queries) == 1
+  assert any("updated_at >" in query for query in mysql.queries)
+
+
+def test_sync_without_migration_falls_back_to_full():
+  mysql = _FakeMysql(users=[("STEAM_0:0:1", 10, _at(0))], tombstones=[], delta_supported=False)
+  sync = UserAssociationSync(mysql)
+
+  async def scenario():
+    await sync.sync({}, {})
+    return await sync.sync({}, {})
+
+  s2d, _ = asyncio.run(scenario())
+  assert s2d == {S1: 10}
+  assert not sync.tombstones_enabled
+  assert not any("updated_at >" in query for query in mysql.queries)
+
+
+def test_sync_merges_universes_and_skips_unparsable_rows():
+  mysql = _FakeMysql(
+    users=[("STEAM_1:0:1", 10, _at(0)), ("BOT", 20, _at(1)), ("[U:1:4]", 30, _at(2))],
+    tombstones=[],
+  )
+
+  s2d, d2s = asyncio.run(UserAssociationSync(mysql).sync({}, {}))
+  assert s2d == {S1: 10, to_steamid64("STEAM_0:0:2"): 30}
+  assert d2s[10] == to_steamid64("STEAM_0:0:1")
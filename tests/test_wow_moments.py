@@ -1,4 +1,5 @@
 import asyncio
+import json
 import pathlib
 import sys
 
@@ -295,3 +296,34 @@ def test_normalize_moment_kind():
   assert normalize_moment_kind("lol") == "lol"
   assert normalize_moment_kind(" LOL ") == "lol"
   assert normalize_moment_kind("oops") == "wow"
+
+
+def test_moment_state_snapshot_survives_restart():
+  state = MomentState(window_sec=30, session_idle_sec=900)
+  first = state.process_vote(parse_moment_vote_payload(_vote_payload()))
+  first.cluster.discord_message_id = 123
+  state.process_vote(parse_moment_vote_payload(_vote_payload(target_name="Other", target_steam_id="STEAM_0:1:9", target_slot=9)))
+
+  snapshot = json.loads(json.dumps(state.snapshot()))
+  restored = MomentState(window_sec=30, session_idle_sec=900)
+  assert restored.restore(snapshot) is True
+
+  # Тот же голос после перезапуска — дубль того же кластера, а не новое сообщение
+  again = restored.process_vote(parse_moment_vote_payload(_vote_payload(event_unix=1_700_000_010)))
+  assert again.duplicate_vote is True
+  assert again.cluster.cluster_id == first.cluster.cluster_id
+  assert again.cluster.discord_message_id == 123
+
+  other_voter = restored.process_vote(
+    parse_moment_vote_payload(_vote_payload(voter_name="Petya", voter_steam_id="STEAM_0:1:12", voter_slot=12))
+  )
+  assert other_voter.created is False and other_voter.cluster.stars == 2
+  new_target = restored.process_vote(parse_moment_vote_payload(_vote_payload(target_name="Third", target_steam_id="STEAM_0:1:30")))
+  assert new_target.created is True and new_target.cluster.cluster_id == 3
+
+
+def test_moment_state_restore_rejects_broken_snapshot():
+  state = MomentState()
+  assert state.restore({"map_name": "de_dust2", "clusters": [{"unknown": 1}]}) is False
+  assert state.restore(None) is False
+  assert state.snapshot()["clusters"] == []
@@ -0,0 +1,99 @@
+import asyncio
+import pathlib
+import sys
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+  sys.path.insert(0, str(ROOT))
+
+from data_server.write_behind import WriteBehindBuffer
+from observer.observer_client import metrics
+
+
+def test_updates_are_coalesced_and_flushed_by_timer():
+  batches = []
+
+  async def flush(rows):
+    batches.append(rows)
+
+  async def scenario():
+    buffer = WriteBehindBuffer("test_timer", flush, flush_interval=0.01, max_rows=100)
+    buffer.put("1", ("old", "1"))
+    buffer.put("2", ("bob", "2"))
+    buffer.put("1", ("new", "1"))
+    assert len(buffer) == 2
+    await asyncio.sleep(0.05)
+    return buffer
+
+  buffer = asyncio.run(scenario())
+  assert batches == [[("bob", "2"), ("new", "1")]]
+  assert len(buffer) == 0
+  assert metrics.get_counter("write_behind_coalesced_total", buffer="test_timer") == 1
+  assert metrics.get_histogram("write_behind_flush_seconds", buffer="test_timer").count == 1
+
+
+def test_flush_triggers_immediately_on_max_rows():
+  batches = []
+
+  async def flush(rows):
+    batches.append(len(rows))
+
+  async def scenario():
+    buffer = WriteBehindBuffer("test_rows", flush, flush_interval=60, max_rows=3)
+    for index in range(3):
+      buffer.put(index, (f"name{index}", index))
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+  asyncio.run(scenario())
+  assert batches == [3]
+
+
+def test_failed_flush_keeps_rows_without_overwriting_newer_values():
+  calls = []
+
+  async def flush(rows):
+    calls.append(list(rows))
+    if len(calls) == 1:
+      buffer.put("1", ("newer", "1"))
+      raise RuntimeError("db down")
+
+  buffer = WriteBehindBuffer("test_retry", flush, flush_interval=60, max_rows=100)
+
+  async def scenario():
+    buffer.put("1", ("first", "1"))
+    buffer.put("2", ("second", "2"))
+    assert await buffer.flush() == 0
+    assert len(buffer) == 2
+    await buffer.close()
+
+  asyncio.run(scenario())
+  assert calls[-1] == [("newer", "1"), ("second", "2")]
+  assert len(buffer) == 0
+  assert metrics.get_gauge("write_behind_depth", buffer="test_retry") == 0
+
+
+def test_unavailable_store_holds_rows_quietly(caplog):
+  available = [False]
+  batches = []
+
+  async def flush(rows):
+    if not available[0]:
+      return False
+    batches.append(list(rows))
+
+  async def scenario():
+    buffer = WriteBehindBuffer("test_deferred", flush, flush_interval=60, max_rows=100)
+    buffer.put("status", ("status", "{}"))
+    assert await buffer.flush() == 0
+    held = len(buffer)
+    available[0] = True
+    await buffer.close()
+    return held, buffer
+
+  held, buffer = asyncio.run(scenario())
+  assert held == 1 and len(buffer) == 0
+  assert batches == [[("status", "{}")]]
+  assert metrics.get_counter("write_behind_flush_deferred_total", buffer="test_deferred") == 1
+  assert metrics.get_counter("write_behind_flush_failures_total", buffer="test_deferred") == 0
+  assert not [record for record in caplog.records if record.levelname == "ERROR"]
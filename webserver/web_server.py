@@ -91,6 +91,16 @@ class WebServer:
     """
     self.app.router.add_post(path, handler)
 
+  # -- add_get()
+  def add_get(self, path: str, handler: Callable) -> None:
+    """
+    Добавляет GET-маршрут в приложение.
+
+    :param path: Путь маршрута.
+    :param handler: Функция-обработчик для данного маршрута.
+    """
+    self.app.router.add_get(path, handler)
+
   # -- run_webserver()
   async def run_webserver(self) -> None:
     """
@@ -1,5 +1,5 @@
 from enum import Enum
-from observer.observer_client import logger, observer, Event, nsroute, Color, TextStyle
+from observer.observer_client import logger, observer, Event, nsroute, metrics, Color, TextStyle
 from webserver.webhook_type import normalize_webhook_type, normalize_webhook_type_code
 from webserver.web_server import WebServer, WebServerError
 
@@ -234,18 +234,15 @@ async def handle_message(data: dict):
   
   # Получаем Discord ID с использованием кеша и таймаута
   prefix = ""
+  # Таймауты и автоматы /CheckSteam и /GetMember объявлены на самих маршрутах;
+  # при отказе маршрут поднимает RouteUnavailableError (подкласс asyncio.TimeoutError).
   try:
-    # Таймаут 1 секунда для запроса к базе
-    discord_id = await asyncio.wait_for(nsroute.call_route("/CheckSteam", steam_id=steam_id), timeout=1.0)
+    discord_id = await nsroute.call_route("/CheckSteam", steam_id=steam_id)
     
     if discord_id:
       # Если нашелся Discord ID, получаем данные о пользователе
       try:
-        # Таймаут 1 секунда для получения Member
-        member = await asyncio.wait_for(
-          nsroute.call_route("/GetMember", discord_id=discord_id),
-          timeout=1.0
-        )
+        member = await nsroute.call_route("/GetMember", discord_id=discord_id)
         if member:
           prefix = f"[{member.display_name}] "
       except asyncio.TimeoutError:
@@ -253,8 +250,8 @@ async def handle_message(data: dict):
         prefix = f"[ID:{discord_id}] "
       except Exception as e:
         logger.error(f"Ошибка при получении данных о пользователе Discord: {e}")
-  except asyncio.TimeoutError:
-    logger.error(f"Таймаут при получении Discord ID для Steam ID {steam_id}")
+  except asyncio.TimeoutError as err:
+    logger.error(f"Таймаут при получении Discord ID для Steam ID {steam_id}: {err}")
     # Даже при таймауте пытаемся отправить осмысленное сообщение
     if team is not None:
       label = TEAM_LABELS.get(team_number, TEAM_DEFAULT_LABEL)
@@ -432,8 +429,31 @@ async def handle_webhook(request: web.Request):
 
   return web.Response(text='OK')
 
+# -- handle_metrics
+async def handle_metrics(request: web.Request):
+  if not check_api_key(request, request_url=safe_request_url(request)):
+    return web.Response(text='Unauthorized', status=401)
+
+  if request.query.get("format") == "json":
+    return web.json_response(metrics.snapshot())
+  return web.Response(text=metrics.render_text(), content_type="text/plain")
+
+# -- handle_db_top
+async def handle_db_top(request: web.Request):
+  if not check_api_key(request, request_url=safe_request_url(request)):
+    return web.Response(text='Unauthorized', status=401)
+
+  try:
+    limit = int(request.query.get("n", 10))
+    top = await nsroute.call_route("/db/query_top", limit, request.query.get("sort", "total"))
+  except ValueError as err:
+    return web.json_response({"error": str(err)}, status=400)
+  return web.json_response(top or [])
+
 # -- webhook route
 ws.add_post('/webhook', handle_webhook)
+ws.add_get('/metrics', handle_metrics)
+ws.add_get('/db/top', handle_db_top)
 
 @observer.subscribe(Event.WS_IP_NOT_ALLOWED)
 async def ev_ip_not_allowed(data):